@@ -1,13 +1,15 @@
 from __future__ import absolute_import
 
 import os
+import time
 import logging
+from functools import partial
 
 
 from huskar_sdk_v2.utils import to_legal_filename, lazy_property
 from huskar_sdk_v2.utils.cached_dict import CachedDict
 from huskar_sdk_v2.consts import OVERALL, BASE_PATH, SERVICE_CACHE_FILENAME
-from .client import BaseClient
+from .client import BaseClient, session_pool
 from .components.switch import Switch
 from .components.config import Config
 from .components.service_registry import ServiceRegistry
@@ -43,13 +45,32 @@ class BootstrapHuskar(object):
                     you just leave this alone.
     :arg bool local_mode: only used in testing mode, in this mode no connection
                           to huskar is made.
+    :arg handler: the handler of Kazoo, e.g. ``threading`` for the threaded
+                  applications without gevent, see
+                  :class:`~.client.BaseClient`.
     :arg bool record_version: whether send huskar version for statistic. It's
                               async and won't influence your app.
+    :arg bool fast_accessors: skip the readiness checks of methods such as
+                              ``config.get()`` once the component is started,
+                              until it is stopped.
+    :arg str watch_engine: ``treecache`` to load and watch the configs and
+                           switches with the ``TreeCache`` of Kazoo, or
+                           ``persistent`` to watch them with the persistent
+                           recursive watches of ZooKeeper 3.6+, see
+                           :class:`~.client.BaseClient`.
+    :arg bool share_session: share the ZooKeeper session with the other
+                             instances in this process which connect to the
+                             same servers with the same credentials, see
+                             :class:`~.client.SessionPool`. Each instance
+                             gets its own view of the shared session.
+    :arg int shards: the number of ZooKeeper sessions to spread the watches
+                     over, see :class:`~.client.BaseClient`.
     """
     def __init__(self, service, servers=None, username=None, password=None,
                  cluster=OVERALL, cache_dir="/tmp/huskar",
                  lazy=True, handler=None, local_mode=False,
-                 record_version=True):
+                 record_version=True, fast_accessors=False,
+                 watch_engine='default', share_session=False, shards=1):
         self.base_path = BASE_PATH
         self.service = service
         self.servers = servers
@@ -57,13 +78,44 @@ class BootstrapHuskar(object):
         self.password = password
         self.cluster = cluster
         self.cache_dir = cache_dir
-        self.handler = None
+        self.handler = handler
         self.lazy = lazy
         self.local_mode = local_mode
+        self.fast_accessors = fast_accessors
+        #: The seconds taken by each component to be loaded in
+        #: :meth:`.start`, e.g. ``{'config': 0.02, 'switch': 0.03}``.
+        self.start_timings = {}
+        self.starting = []
         self.logger = logging.getLogger(self.__class__.__module__)
-        self.client = BaseClient(
-            servers, username, password, base_path=BASE_PATH,
-            local_mode=local_mode, lazy=lazy)
+        self.share_session = share_session
+        self.client_options = dict(
+            base_path=BASE_PATH, handler=handler, local_mode=local_mode,
+            lazy=lazy, watch_engine=watch_engine, shards=shards)
+        self._client = self._make_client()
+
+    @property
+    def client(self):
+        """The :class:`~.client.BaseClient`. The shared one is acquired again
+        after :meth:`.stop` released it.
+        """
+        if self._client is None:
+            self._client = self._make_client()
+        return self._client
+
+    def _make_client(self):
+        if self.share_session:
+            return session_pool.acquire(
+                self.servers, self.username, self.password,
+                **self.client_options)
+        return BaseClient(self.servers, self.username, self.password,
+                          **self.client_options)
+
+    @lazy_property
+    def ready(self):
+        """An event which is set once all of the components started by
+        :meth:`.start` are loaded.
+        """
+        return self.client.event_object()
 
     @lazy_property
     def config(self):
@@ -74,7 +126,8 @@ class BootstrapHuskar(object):
                       cluster=self.cluster,
                       cache_cls=self._cache_cls,
                       local_mode=self.local_mode,
-                      lazy=self.lazy)
+                      lazy=self.lazy,
+                      fast_accessors=self.fast_accessors)
 
     @lazy_property
     def switch(self):
@@ -85,7 +138,8 @@ class BootstrapHuskar(object):
                       cluster=self.cluster,
                       cache_cls=self._cache_cls,
                       local_mode=self.local_mode,
-                      lazy=self.lazy)
+                      lazy=self.lazy,
+                      fast_accessors=self.fast_accessors)
 
     @lazy_property
     def service_registry(self):
@@ -124,19 +178,82 @@ class BootstrapHuskar(object):
 
         return {}
 
-    def start(self):
-        """Start internal ZooKeeper client and watching node changes."""
-        if not self.local_mode:
-            self.client.start()
-            self.switch.start()
-            self.config.start()
+    def start(self, service_mappings=None, timeout=10):
+        """Start internal ZooKeeper client and watching node changes.
+
+        The switches, configs and services of ``service_mappings`` are
+        loaded concurrently. The :attr:`ready` is set once all of them are
+        loaded in ``timeout`` seconds, and the seconds taken by each are
+        recorded in :attr:`start_timings`. Calling it again before
+        :meth:`stop` only waits for the first start.
+
+        :arg dict service_mappings: the service names to their clusters which
+                                    will be watched by
+                                    :attr:`service_consumer`.
+        :arg float timeout: the maximum seconds to wait for :attr:`ready`.
+        :returns: ``True`` if all of the components are loaded in time.
+        """
+        if self.local_mode:
+            return
+        if self.starting:
+            return self.ready.wait(timeout)
+        deadline = None if timeout is None else time.time() + timeout
+        self.client.start()
+        tasks = [('switch', self.switch.start, self.switch.ready),
+                 ('config', self.config.start, self.config.ready)]
+        if service_mappings:
+            tasks.append(('service_consumer', partial(
+                self.service_consumer.preprocess_service_mappings,
+                service_mappings, timeout=timeout), None))
+        workers = [self.client.spawn(self._start_component, deadline, *task)
+                   for task in tasks]
+        names = [name for name, _, _ in tasks]
+        self.starting = workers + [
+            self.client.spawn(self._wait_components, names, workers)]
+        return self.ready.wait(timeout)
+
+    def _start_component(self, deadline, name, start, ready):
+        started_at = time.time()
+        try:
+            result = start()
+        except Exception:
+            self.logger.exception('Failed to start %s', name)
+            return
+        if ready is not None and not ready.wait(
+                None if deadline is None else max(deadline - time.time(), 0)):
+            self.logger.warning('Timeout of loading %s', name)
+            return
+        if result is not None and not all(result.values()):
+            self.logger.warning('Failed to load %s: %r', name, result)
+            return
+        self.start_timings[name] = time.time() - started_at
+        self.logger.info('Huskar %s is loaded in %.3fs',
+                         name, self.start_timings[name])
+
+    def _wait_components(self, names, workers):
+        for worker in workers:
+            worker.join()
+        if all(name in self.start_timings for name in names):
+            self.ready.set()
 
     def stop(self):
         """Stop watching nodes changes and internal ZooKeeper client"""
         if not self.local_mode:
+            for worker in self.starting:
+                if getattr(worker, 'kill', None):
+                    worker.kill()
+            self.starting = []
+            self.ready.clear()
+            self.start_timings.clear()
             for name in ("config", "switch", "service_consumer"):
                 component = getattr(self, '_{}'.format(name), None)
                 if component is not None:
                     component.stop()
                     delattr(self, '_{}'.format(name))
-            self.client.stop()
+            if self.share_session:
+                if self._client is not None:
+                    # unwatch and release the view of shared session
+                    self._client.stop()
+                    self._client = None
+            else:
+                self.client.stop()
@@ -2,32 +2,53 @@ from __future__ import absolute_import
 
 import os
 import time
+import posixpath
 import logging
 import random
 import warnings
+import threading
 from contextlib import contextmanager
 from functools import partial
 
 from blinker import Namespace
+try:
+    import gevent  # noqa
+except ImportError:
+    has_gevent = False
+else:
+    has_gevent = True
 try:
     from kazoo.client import KazooClient, KazooState
-    from kazoo.handlers.gevent import SequentialGeventHandler
-    from kazoo.exceptions import KazooException
+    from kazoo.handlers.threading import SequentialThreadingHandler
+    from kazoo.exceptions import KazooException, NoNodeError
     from kazoo.security import make_digest_acl
     from kazoo.protocol.states import EventType
 except ImportError:
     has_kazoo = False
 else:
     has_kazoo = True
+try:
+    from kazoo.recipe.cache import TreeCache, TreeEvent
+except ImportError:
+    has_treecache = False
+else:
+    has_treecache = True
+try:
+    from huskar_sdk_v2.bootstrap.persistent import (
+        PersistentWatches, supported as has_persistent_watch)
+except ImportError:
+    has_persistent_watch = False
+if has_kazoo and has_gevent:
+    from kazoo.handlers.gevent import SequentialGeventHandler
 
+from huskar_sdk_v2.six import unicode
 from huskar_sdk_v2.utils import combine
+from huskar_sdk_v2.utils.hashring import HashRing
 from huskar_sdk_v2.utils.format import char_encoding, char_decoding
 from huskar_sdk_v2.exceptions import OperationFailedException
 
 
 logger = logging.getLogger(__name__)
-# TODO:
-# 1. scoped session with long connections.
 
 
 class ConfigMeta(object):
@@ -40,6 +61,11 @@ class ConfigMeta(object):
         """The number of changes to the data of this znode."""
         return self.__kazoo_state.version
 
+    @property
+    def czxid(self):
+        """The zxid of the change that caused this znode to be created."""
+        return self.__kazoo_state.czxid
+
     @property
     def is_deleted(self):
         return self.__kazoo_state is None
@@ -51,13 +77,64 @@ class BaseClient(object):
     :arg str server: Comma-separated list of hosts to connect to (e.g.
                      127.0.0.1:2181,127.0.0.1:2182,[::1]:2183).
     :arg str base_path: The prefix added to the path for all operation.
+    :arg handler: ``gevent``, ``threading``, or a Kazoo handler class or
+                  instance, e.g. ``SequentialThreadingHandler``. The
+                  ``gevent`` is used by default if it is installed, it
+                  raises ``ValueError`` to ask for ``gevent`` otherwise.
+    :arg str watch_engine: ``treecache`` to watch the children of paths with
+                           the ``TreeCache`` of Kazoo, which loads them with
+                           pipelined asynchronous reads instead of an
+                           ``exists`` and a ``DataWatch`` per child.
+                           ``persistent`` to watch each path with a
+                           persistent recursive watch of ZooKeeper 3.6+,
+                           instead of the one-shot watches per child, which
+                           needs Kazoo 2.8 to 2.11, see
+                           :data:`~.persistent.KAZOO_VERSIONS`. The
+                           default engine is ``default``, which is also the
+                           fallback of the others if they are unavailable.
+    :arg int shards: the number of ZooKeeper sessions to spread the watches
+                     over. The watched paths are assigned to the sessions by
+                     consistent hashing, and a node is watched by the session
+                     of its parent path. The other operations use the first
+                     session.
     """
+    WATCH_ENGINES = ('default', 'treecache', 'persistent')
+    #: The maximum seconds to wait for the initial load of a TreeCache.
+    TREE_INITIALIZE_TIMEOUT = 10
+    #: The number of workers which install the data watches of watch_keys.
+    WATCH_KEYS_CONCURRENCY = 16
+    HANDLERS = ('gevent', 'threading')
+
     def __init__(self, servers=None, username=None, password=None,
                  base_path='/', retry_max_delay=2, max_retries=None,
-                 handler=None, local_mode=False, lazy=True):
+                 handler=None, local_mode=False, lazy=True,
+                 watch_engine='default', shards=1):
+        if shards < 1:
+            raise ValueError('shards should be a positive integer')
+        if handler is None:
+            handler = 'gevent' if has_gevent else 'threading'
+        elif (isinstance(handler, (str, unicode)) and
+                handler not in self.HANDLERS):
+            raise ValueError('Unknown handler: %r' % (handler,))
+        elif handler == 'gevent' and not has_gevent:
+            raise ValueError('The gevent handler requires gevent, which is '
+                             'not installed')
+        if watch_engine not in self.WATCH_ENGINES:
+            raise ValueError('Unknown watch engine: %r' % watch_engine)
+        if watch_engine == 'treecache' and not has_treecache:
+            logger.warning('TreeCache is not available in the installed '
+                           'Kazoo, fall back to the default watch engine')
+            watch_engine = 'default'
+        if watch_engine == 'persistent' and not has_persistent_watch:
+            logger.warning('Persistent watch is not supported by the '
+                           'installed Kazoo, fall back to the default watch '
+                           'engine')
+            watch_engine = 'default'
+        self.watch_engine = watch_engine
+        self.handler = handler
         if has_kazoo:
             self.local_mode = local_mode
-            self.handler_class = SequentialGeventHandler
+            self.handler_class = self._get_handler_class(handler)
         else:
             self.local_mode = True
             self.handler_class = None
@@ -66,6 +143,19 @@ class BaseClient(object):
         self.watched_node = {}
         self.watched_path = {}
         self.watched_path_callback = set()
+        self.watched_tree = {}
+        # the events of trees, which are set once the initial load is sent
+        self.tree_events = {}
+        # the children of paths watched by the persistent recursive watches
+        self.watched_recursive = {}
+        self.recursive_watchers = {}
+        self._persistent_watches = None
+        # the persistent watches are gone with the connection
+        self.disconnected = False
+        # the last delivered (czxid, version) of nodes and children of paths,
+        # to drop the redundant deliveries after reconnecting
+        self.delivered_versions = {}
+        self.delivered_children = {}
         self.servers = servers or '127.0.0.1:2181'
         self.username = username
         self.password = password
@@ -92,6 +182,43 @@ class BaseClient(object):
         # record zk actual connection server
         self.host = None
 
+        #: The other sessions to spread the watches over, their signals are
+        #: emitted in the :attr:`watched_blinker` of this client.
+        self.shards = []
+        self.shard_ring = None
+        if shards > 1:
+            if not isinstance(handler, (str, unicode, type)):
+                handler = type(handler)     # an instance per session
+            self.shards = [
+                BaseClient(servers, username, password, base_path,
+                           retry_max_delay, max_retries, handler, local_mode,
+                           lazy, watch_engine)
+                for _ in range(shards - 1)]
+            for shard in self.shards:
+                shard.watched_blinker = self.watched_blinker
+            self.shard_ring = HashRing()
+            for index in range(shards):
+                self.shard_ring.add(str(index))
+
+    @staticmethod
+    def _get_handler_class(handler):
+        if handler == 'gevent':
+            return SequentialGeventHandler
+        if handler == 'threading':
+            return SequentialThreadingHandler
+        if isinstance(handler, type):
+            return handler
+        # the instance is reused by the recreated Kazoo clients
+        return lambda: handler
+
+    @property
+    def threaded(self):
+        """``True`` if the client works with threads instead of greenlets.
+        """
+        if not has_kazoo:
+            return self.handler == 'threading'
+        return isinstance(self.client.handler, SequentialThreadingHandler)
+
     @property
     def connected(self):
         """``True`` if the session is established."""
@@ -124,6 +251,17 @@ class BaseClient(object):
         self._client._reset()
         self._client = None
         self._client_lock = None
+        self._persistent_watches = None
+
+    @property
+    def persistent_watches(self):
+        """The :class:`~.persistent.PersistentWatches` of the Kazoo client.
+        """
+        watches = self._persistent_watches
+        if watches is None or watches.client is not self.client:
+            watches = self._persistent_watches = PersistentWatches(
+                self.client)
+        return watches
 
     @property
     def client_lock(self):
@@ -133,22 +271,48 @@ class BaseClient(object):
 
     def spawn(self, func, *args, **kwargs):
         if not has_kazoo:
+            if self.threaded or not has_gevent:
+                thread = threading.Thread(
+                    target=func, args=args, kwargs=kwargs)
+                thread.daemon = True
+                thread.start()
+                return thread
             from gevent import spawn
             return spawn(func, *args, **kwargs)
         return self.client.handler.spawn(func, *args, **kwargs)
 
+    def sleep(self, seconds):
+        """Sleep without blocking the other tasks of the handler."""
+        if not has_kazoo:
+            if self.threaded or not has_gevent:
+                return time.sleep(seconds)
+            from gevent import sleep
+            return sleep(seconds)
+        return self.client.handler.sleep_func(seconds)
+
     def lock_object(self):
         if not has_kazoo:
+            if self.threaded or not has_gevent:
+                return threading.Lock()
             from gevent.lock import Semaphore
             return Semaphore()
         return self.client.handler.lock_object()
 
     def event_object(self):
         if not has_kazoo:
+            if self.threaded or not has_gevent:
+                return threading.Event()
             from gevent.event import Event
             return Event()
         return self.client.handler.event_object()
 
+    def semaphore_object(self, value=1):
+        """Create a bounded semaphore which works with the handler."""
+        if self.threaded or not has_gevent:
+            return threading.BoundedSemaphore(value)
+        from gevent.lock import BoundedSemaphore
+        return BoundedSemaphore(value)
+
     def get_full_path(self, node):
         return combine(self.base_path, node)
 
@@ -159,9 +323,11 @@ class BaseClient(object):
                 'Register somewhere that the session was lost with %s',
                 self.host)
             self.host = None
+            self.disconnected = True
         elif state == KazooState.SUSPENDED:
             logger.warning('Zookeeper disconnected with %s', self.host)
             self.host = None
+            self.disconnected = True
         else:
             try:
                 self.host = self.client._connection._socket.getpeername()
@@ -169,6 +335,17 @@ class BaseClient(object):
                 pass
             logger.warning(
                 'Zookeeper connected/reconnected with %s', self.host)
+            if self.disconnected and self.watched_recursive:
+                # the events are missed during the disconnection as well
+                self.spawn(self._rewatch_recursive)
+            self.disconnected = False
+
+    def get_shard(self, path):
+        """Get the client which watches ``path``."""
+        if self.shard_ring is None:
+            return self
+        index = int(self.shard_ring.get_node(path))
+        return self.shards[index - 1] if index else self
 
     def watch_key(self, key):
         """Watch a node for data updates and emits a signal each time it
@@ -183,36 +360,142 @@ class BaseClient(object):
             logger.info('Huskar is in local mode, skip watch_key: %r', key)
             return False
 
+        shard = self.get_shard(posixpath.dirname(key))
+        if shard is not self:
+            return shard.watch_key(key)
+
+        if self._is_pushed(key):
+            # the data is pushed by the tree or watch of parent path
+            self.watched_node[key] = None
+            return True
+
         full_path = self.get_full_path(key)
         if not self.exists(key):
             logger.warn("Node %s doesn't exist, watch failed" % full_path)
             return False
 
         if key not in self.watched_node:
-            data_watch = self.call_client('DataWatch', full_path)
-            self.watched_node[key] = data_watch
-            try:
-                data_watch(partial(self.trigger_watched_key, self.client, key))
-            except Exception:
-                logger.exception('watch failed %s', full_path)
-                return False
+            return self._watch_data(key)
+        return True
+
+    def watch_keys(self, keys):
+        """Watch many nodes like :meth:`BaseClient.watch_key`, in about one
+        round trip instead of one per node.
+
+        The existence of nodes is checked with pipelined asynchronous
+        requests, then the data watches are installed concurrently by at most
+        :attr:`WATCH_KEYS_CONCURRENCY` workers.
+
+        :arg keys: the nodes to be watched.
+        :returns: the set of nodes which are watched.
+        """
+        if self.local_mode:
+            logger.info('Huskar is in local mode, skip watch_keys: %r', keys)
+            return set()
+
+        if self.shard_ring is not None:
+            keys = list(keys)
+            watched = set()
+            for shard in [self] + self.shards:
+                shard_keys = [
+                    key for key in keys
+                    if self.get_shard(posixpath.dirname(key)) is shard]
+                if shard_keys and shard is not self:
+                    watched.update(shard.watch_keys(shard_keys))
+                elif shard_keys:
+                    watched.update(self._watch_keys(shard_keys))
+            return watched
+        return self._watch_keys(keys)
+
+    def _watch_keys(self, keys):
+        watched = set()
+        pending = []
+        for key in keys:
+            if self._is_pushed(key):
+                self.watched_node[key] = None
+                watched.add(key)
+            else:
+                pending.append(key)
+        if not pending:
+            return watched
+
+        if self.lazy and not self.started:
+            self.start()
+        results = []
+        with self.suppress_kazoo_exception('exists_async'):
+            for key in pending:
+                results.append(
+                    (key, self.client.exists_async(self.get_full_path(key))))
+        for key, result in results:
+            stat = None
+            with self.suppress_kazoo_exception('exists_async'):
+                stat = result.get()
+            if stat is None:
+                logger.warn("Node %s doesn't exist, watch failed",
+                            self.get_full_path(key))
+            else:
+                watched.add(key)
+
+        failed = set()
+        unwatched = [key for key in pending
+                     if key in watched and key not in self.watched_node]
+        queue = iter(unwatched)
+
+        def watch_data():
+            for key in queue:
+                if not self._watch_data(key):
+                    failed.add(key)
+        workers = [
+            self.spawn(watch_data) for _ in
+            range(min(len(unwatched), self.WATCH_KEYS_CONCURRENCY))]
+        for worker in workers:
+            worker.join()
+        return watched - failed
+
+    def _is_pushed(self, key):
+        parent = posixpath.dirname(key)
+        return parent in self.watched_tree or parent in self.watched_recursive
+
+    def _watch_data(self, key):
+        full_path = self.get_full_path(key)
+        data_watch = self.call_client('DataWatch', full_path)
+        self.watched_node[key] = data_watch
+        try:
+            data_watch(partial(self.trigger_watched_key, self.client, key))
+        except Exception:
+            logger.exception('watch failed %s', full_path)
+            return False
         return True
 
     def unwatch_key(self, key):
+        shard = self.get_shard(posixpath.dirname(key))
+        if shard is not self:
+            return shard.unwatch_key(key)
         self.watched_node.pop(key, None)
+        self.delivered_versions.pop(key, None)
 
     def watch_path(self, path, callback):
         if self.local_mode:
             logger.info('Huskar is in local mode, skip watch_path: %r', path)
             return False
 
-        full_path = self.get_full_path(path)
+        shard = self.get_shard(path)
+        if shard is not self:
+            return shard.watch_path(path, callback)
 
         if callback not in self.watched_path_callback:
             signal = self.watched_blinker.signal(('children', path))
             signal.connect(callback)
             self.watched_path_callback.add(callback)
 
+        if self.watch_engine == 'treecache':
+            return self._watch_tree(path)
+        if self.watch_engine == 'persistent':
+            return self._watch_recursive(path)
+        self._watch_children(path)
+
+    def _watch_children(self, path):
+        full_path = self.get_full_path(path)
         if path not in self.watched_path:
             data_watch = self.call_client('DataWatch', full_path)
             children_watch = self.call_client('ChildrenWatch', full_path)
@@ -223,7 +506,126 @@ class BaseClient(object):
                 self.trigger_watched_path, self.client, path))
 
     def unwatch_path(self, path):
+        shard = self.get_shard(path)
+        if shard is not self:
+            return shard.unwatch_path(path)
         self.watched_path.pop(path, None)
+        self.delivered_children.pop(path, None)
+        tree = self.watched_tree.pop(path, None)
+        if tree is not None:
+            self.tree_events.pop(tree, None)
+            with self.suppress_kazoo_exception('TreeCache.close'):
+                tree.close()
+        self.watched_recursive.pop(path, None)
+        watcher = self.recursive_watchers.pop(path, None)
+        if watcher is not None:
+            # only the persistent recursive watch of path is removed
+            self.persistent_watches.remove(self.get_full_path(path), watcher)
+
+    def _watch_tree(self, path):
+        if path in self.watched_tree:
+            return
+        if self.lazy and not self.started:
+            self.start()
+        tree = TreeCache(self.client, self.get_full_path(path))
+        tree.listen(partial(self.trigger_watched_tree, self.client, path,
+                            tree))
+        event = self.tree_events[tree] = self.event_object()
+        self.watched_tree[path] = tree
+        with self.suppress_kazoo_exception('TreeCache.start'):
+            tree.start()
+        # the children and their data should be sent like the other engines
+        if self.connected and not event.wait(self.TREE_INITIALIZE_TIMEOUT):
+            logger.warning('Timeout of loading the tree of %s', path)
+
+    def _watch_recursive(self, path):
+        if path in self.watched_recursive:
+            return
+        if self.lazy and not self.started:
+            self.start()
+        full_path = self.get_full_path(path)
+        children = self.watched_recursive[path] = set()
+        watcher = self.recursive_watchers[path] = partial(
+            self.trigger_recursive_watch, self.client, path, children)
+        watches = self.persistent_watches
+        try:
+            watches.add(full_path, watcher).get()
+        except (KazooException, self.client.handler.timeout_exception):
+            logger.warning('Failed to add persistent watch, fall back to the '
+                           'default watch engine: %s', full_path,
+                           exc_info=True)
+            watches.forget(full_path, watcher)
+            del self.watched_recursive[path]
+            del self.recursive_watchers[path]
+            return self._watch_children(path)
+
+        # load the children after the watch is added, to miss no changes
+        client = self.client
+        try:
+            names = client.get_children(full_path)
+        except NoNodeError:
+            return
+        except (KazooException, client.handler.timeout_exception):
+            logger.exception('ZooKeeper Error (get_children)')
+            return
+        children.update(names)
+        self.trigger_watched_path(client, path, sorted(children),
+                                  watched=self.watched_recursive)
+        results = [(name, client.get_async(combine(full_path, name)))
+                   for name in names]
+        for name, result in results:
+            self._deliver_data(client, combine(path, name), result)
+
+    def _rewatch_recursive(self):
+        watches = self.persistent_watches
+        for path in list(self.watched_recursive):
+            self.watched_recursive.pop(path, None)
+            watcher = self.recursive_watchers.pop(path, None)
+            if watcher is not None:
+                watches.forget(self.get_full_path(path), watcher)
+            self._watch_recursive(path)
+
+    def _deliver_data(self, client, key, result):
+        try:
+            value, state = result.get()
+        except NoNodeError:
+            return                          # removed in the meantime
+        except (KazooException, client.handler.timeout_exception):
+            logger.exception('ZooKeeper Error (get_async)')
+            return
+        self.trigger_watched_key(client, key, value, state)
+
+    def trigger_recursive_watch(self, client, path, children, event):
+        if client is not self.client:
+            return False                    # client changed
+        if self.watched_recursive.get(path) is not children:
+            return False                    # path unwatched
+        full_path = self.get_full_path(path)
+        if event.path == full_path:
+            if event.type == EventType.DELETED:
+                children.clear()
+                self.trigger_watched_path(
+                    client, path, [], watched=self.watched_recursive)
+            return
+        if posixpath.dirname(event.path) != full_path:
+            return                          # not a child
+
+        name = posixpath.basename(event.path)
+        key = combine(path, name)
+        if event.type == EventType.DELETED:
+            children.discard(name)
+            self.trigger_watched_key(client, key, None, None)
+            self.trigger_watched_path(client, path, sorted(children),
+                                      watched=self.watched_recursive)
+            return
+        if event.type == EventType.CREATED:
+            # connect the signal of new child before sending the data
+            children.add(name)
+            self.trigger_watched_path(client, path, sorted(children),
+                                      watched=self.watched_recursive)
+        if event.type in (EventType.CREATED, EventType.CHANGED):
+            client.get_async(event.path).rawlink(
+                partial(self._deliver_data, client, key))
 
     def trigger_watched_key(self, client, key, value, state):
         if client is not self.client:
@@ -232,23 +634,85 @@ class BaseClient(object):
             return False                    # node unwatched
         if value is None:
             self.unwatch_key(key)           # node removed
+        else:
+            version = (state.czxid, state.version)
+            if self.delivered_versions.get(key) == version:
+                return False                # not changed
+            self.delivered_versions[key] = version
         signal = self.watched_blinker.signal(key)
         signal.send((char_decoding(value), ConfigMeta(state)))
 
-    def trigger_watched_path(self, client, path, children):
+    def trigger_watched_path(self, client, path, children, watched=None):
         if client is not self.client:
             return False                    # client changed
-        if path not in self.watched_path:
+        if watched is None:
+            watched = self.watched_path
+        if path not in watched:
             return False                    # path unwatched
+        delivered = frozenset(children)
+        if self.delivered_children.get(path) == delivered:
+            return False                    # not changed
+        self.delivered_children[path] = delivered
         signal = self.watched_blinker.signal(('children', path))
         signal.send(children)
 
+    def trigger_watched_tree(self, client, path, tree, event):
+        if client is not self.client:
+            return False                    # client changed
+        initialized = self.tree_events.get(tree)
+        if initialized is None or self.watched_tree.get(path) is not tree:
+            return False                    # path unwatched
+        full_path = self.get_full_path(path)
+        event_type = event.event_type
+
+        if event_type == TreeEvent.INITIALIZED:
+            children = sorted(tree.get_children(full_path, ()))
+            self.trigger_watched_path(client, path, children,
+                                      watched=self.watched_tree)
+            for child in children:
+                node = tree.get_data(combine(full_path, child))
+                if node is not None:
+                    self.trigger_watched_key(
+                        client, combine(path, child), node.data, node.stat)
+            initialized.set()
+            return
+        if event_type not in (TreeEvent.NODE_ADDED, TreeEvent.NODE_UPDATED,
+                              TreeEvent.NODE_REMOVED):
+            return
+        if not initialized.is_set():
+            return                          # the initial load is in progress
+
+        node = event.event_data
+        if node.path == full_path:
+            if event_type == TreeEvent.NODE_REMOVED:
+                self.trigger_watched_path(client, path, [],
+                                          watched=self.watched_tree)
+            return
+        if posixpath.dirname(node.path) != full_path:
+            return                          # not a child
+
+        key = combine(path, posixpath.basename(node.path))
+        children = sorted(tree.get_children(full_path, ()))
+        if event_type == TreeEvent.NODE_ADDED:
+            # connect the signal of new child before sending the data
+            self.trigger_watched_path(client, path, children,
+                                      watched=self.watched_tree)
+            self.trigger_watched_key(client, key, node.data, node.stat)
+        elif event_type == TreeEvent.NODE_UPDATED:
+            self.trigger_watched_key(client, key, node.data, node.stat)
+        else:
+            self.trigger_watched_key(client, key, None, None)
+            self.trigger_watched_path(client, path, children,
+                                      watched=self.watched_tree)
+
     def trigger_watched_path_stat(self, client, path, data, stat, event):
         if client is not self.client:
             return False                    # client changed
         data_watch, children_watch = self.watched_path.get(path, (None, None))
         if children_watch is None:
             return False                    # path unwatched
+        if stat is None:
+            self.delivered_children.pop(path, None)     # path removed
         if (event is not None and
                 event.type == EventType.CREATED and
                 children_watch._stopped):
@@ -265,21 +729,31 @@ class BaseClient(object):
 
         :arg int timeout: The maximun waiting seconds for connection
                           established.
-        :returns: ``True`` if the connection is established.
+        :returns: ``True`` if the connection is established, and so are the
+                  ones of shards.
         """
         if self.local_mode:
             logger.warn("Huskar working in local_mode, won't start")
             return True
 
+        deadline = None if timeout is None else time.time() + timeout
+        # the other sessions connect concurrently
+        for shard in self.shards:
+            shard.start(timeout=0)
+
         if self.connected:
             logger.debug('Huskar already connected, start canceled')
-            return True
-
-        with self.client_lock:
-            if not self.started:
-                self.started = True
-                self.starting = self.spawn(self._start)
-        return self.client._live.wait(timeout)
+        else:
+            with self.client_lock:
+                if not self.started:
+                    self.started = True
+                    self.starting = self.spawn(self._start)
+        for client in [self] + self.shards:
+            if not client.client._live.wait(
+                    None if deadline is None
+                    else max(deadline - time.time(), 0)):
+                return False
+        return True
 
     def _start(self):
         while self.started:
@@ -304,11 +778,20 @@ class BaseClient(object):
 
     def stop(self):
         """Stop client and close the connection."""
+        for path in list(self.watched_tree):
+            self.unwatch_path(path)
         # disconnect signals
         self.watched_blinker = Namespace()
+        for shard in self.shards:
+            shard.stop()
+            shard.watched_blinker = self.watched_blinker
         self.watched_node = {}
         self.watched_path = {}
         self.watched_path_callback = set()
+        self.watched_recursive = {}
+        self.recursive_watchers = {}
+        self.delivered_versions = {}
+        self.delivered_children = {}
 
         if not getattr(self, '_client', None):
             return
@@ -409,6 +892,33 @@ class BaseClient(object):
     def ensure_path(self, path, acl=None):
         return self.call_client('ensure_path', self.get_full_path(path), acl)
 
+    def ensure_paths(self, paths, acl=None):
+        """Ensure many paths exist like :meth:`BaseClient.ensure_path`, with
+        pipelined asynchronous requests.
+
+        :returns: ``True`` if all of the paths exist.
+        """
+        if self.local_mode:
+            logger.info(
+                'Huskar is in local mode, operation failed: ensure_paths')
+            return
+
+        if self.lazy and not self.started:
+            self.start()
+
+        paths = list(paths)
+        results = []
+        with self.suppress_kazoo_exception('ensure_path_async'):
+            for path in paths:
+                results.append(self.client.ensure_path_async(
+                    self.get_full_path(path), acl))
+        ensured = 0
+        for result in results:
+            with self.suppress_kazoo_exception('ensure_path_async'):
+                result.get()
+                ensured += 1
+        return ensured == len(paths)
+
     def set_data(self, path, value):
         return self.call_client('set',
                                 self.get_full_path(path),
@@ -418,3 +928,200 @@ class BaseClient(object):
         return self.call_client('delete',
                                 self.get_full_path(path),
                                 recursive=recursive)
+
+
+class SharedSession(object):
+    """A :class:`BaseClient` shared by the holders of :class:`SessionPool`.
+
+    The signals of shared client are dispatched to the views which watch
+    them, and the watches are reference counted among the views. The last
+    sent value of each signal is kept to be sent to the views which join
+    later.
+    """
+    def __init__(self, client):
+        self.client = client
+        #: The views held by the holders.
+        self.views = set()
+        self.subscribers = {}
+        self.receivers = {}
+        self.last_sent = {}
+
+    def receiver(self, name):
+        """Get the receiver connected to the signal ``name`` of client."""
+        receiver = self.receivers.get(name)
+        if receiver is None:
+            receiver = self.receivers[name] = partial(self.dispatch, name)
+            self.client.watched_blinker.signal(name).connect(
+                receiver, weak=False)
+        return receiver
+
+    def dispatch(self, name, sender):
+        self.last_sent[name] = sender
+        for view in list(self.subscribers.get(name, ())):
+            view.watched_blinker.signal(name).send(sender)
+
+    def subscribe(self, view, name):
+        """Subscribe the signal ``name`` for ``view``.
+
+        :returns: ``True`` if nobody subscribed it before.
+        """
+        subscribers = self.subscribers.setdefault(name, set())
+        first = not subscribers
+        subscribers.add(view)
+        self.receiver(name)
+        return first
+
+    def unsubscribe(self, view, name):
+        """Unsubscribe the signal ``name`` for ``view``.
+
+        :returns: ``True`` if nobody subscribes it any more.
+        """
+        subscribers = self.subscribers.get(name, set())
+        subscribers.discard(view)
+        if subscribers:
+            return False
+        self.subscribers.pop(name, None)
+        self.last_sent.pop(name, None)
+        receiver = self.receivers.pop(name, None)
+        if receiver is not None:
+            self.client.watched_blinker.signal(name).disconnect(receiver)
+            self.client.watched_path_callback.discard(receiver)
+        return True
+
+
+class SharedClient(object):
+    """A view of the :class:`BaseClient` of a :class:`SharedSession`, which
+    is held by one holder of :class:`SessionPool`.
+
+    It has its own :attr:`watched_blinker`. The nodes and paths watched by
+    the other views are sent to it once it watches them as well, and they
+    are unwatched once none of views watches them. The other attributes are
+    the ones of shared client.
+    """
+    def __init__(self, pool, session):
+        self.pool = pool
+        self.session = session
+        self.base_client = session.client
+        self.watched_blinker = Namespace()
+        # the signals subscribed by this view
+        self.subscriptions = set()
+
+    def __getattr__(self, name):
+        return getattr(self.base_client, name)
+
+    def __repr__(self):
+        return '<SharedClient of %r>' % (self.base_client,)
+
+    def _subscribe(self, name):
+        if name in self.subscriptions:
+            return False
+        self.subscriptions.add(name)
+        return not self.session.subscribe(self, name)
+
+    def _catch_up(self, name):
+        if name in self.session.last_sent:
+            self.watched_blinker.signal(name).send(
+                self.session.last_sent[name])
+
+    def watch_key(self, key):
+        joined = self._subscribe(key)
+        result = self.base_client.watch_key(key)
+        if joined:
+            self._catch_up(key)
+        return result
+
+    def watch_keys(self, keys):
+        keys = list(keys)
+        joined = [key for key in keys if self._subscribe(key)]
+        result = self.base_client.watch_keys(keys)
+        for key in joined:
+            self._catch_up(key)
+        return result
+
+    def unwatch_key(self, key):
+        self.subscriptions.discard(key)
+        if self.session.unsubscribe(self, key):
+            self.base_client.unwatch_key(key)
+
+    def watch_path(self, path, callback):
+        name = ('children', path)
+        self.watched_blinker.signal(name).connect(callback)
+        joined = self._subscribe(name)
+        result = self.base_client.watch_path(
+            path, self.session.receiver(name))
+        if joined:
+            self._catch_up(name)
+        return result
+
+    def unwatch_path(self, path):
+        name = ('children', path)
+        self.subscriptions.discard(name)
+        if self.session.unsubscribe(self, name):
+            self.base_client.unwatch_path(path)
+
+    def stop(self):
+        """Unwatch the nodes and paths of this view, and release it from the
+        pool. The shared client is stopped if nobody holds it.
+        """
+        for name in list(self.subscriptions):
+            if isinstance(name, tuple):
+                self.unwatch_path(name[1])
+            else:
+                self.unwatch_key(name)
+        self.watched_blinker = Namespace()
+        self.pool.release(self)
+
+
+class SessionPool(object):
+    """A process-wide registry of :class:`BaseClient`, to share one session
+    among the clients of the same servers and credentials.
+
+    Each holder gets a :class:`SharedClient` as a view of the shared client.
+    The shared clients are reference counted, a client is stopped once all
+    of its holders released it.
+    """
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, servers=None, username=None, password=None, **kwargs):
+        """Get a view of shared client, or create one if there is no such
+        client.
+
+        :arg kwargs: the other arguments of :class:`BaseClient`, the clients
+                     with different arguments are not shared.
+        :returns: the :class:`SharedClient`.
+        """
+        key = (servers, username, password, os.getpid(),
+               tuple(sorted(kwargs.items())))
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is None:
+                session = self.sessions[key] = SharedSession(
+                    BaseClient(servers, username, password, **kwargs))
+            view = SharedClient(self, session)
+            session.views.add(view)
+        return view
+
+    def release(self, view):
+        """Release a view of shared client, the client is stopped if nobody
+        holds it.
+
+        :returns: ``True`` if the client is stopped.
+        """
+        with self.lock:
+            session = view.session
+            if view not in session.views:
+                return False
+            session.views.discard(view)
+            if session.views:
+                return False
+            for key, value in list(self.sessions.items()):
+                if value is session:
+                    del self.sessions[key]
+        session.client.stop()
+        return True
+
+
+#: The default :class:`SessionPool` of process.
+session_pool = SessionPool()
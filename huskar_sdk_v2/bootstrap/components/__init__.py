@@ -8,6 +8,7 @@ import simplejson as json
 from blinker import Namespace
 
 from huskar_sdk_v2.utils import combine
+from huskar_sdk_v2.utils.keytrie import KeyTrie
 from huskar_sdk_v2.consts import COMPONENT_PATH, OVERALL, SIG_CLIENT_RESTART
 
 
@@ -38,6 +39,11 @@ def require_connection(func):
 
 
 class BaseComponent(object):
+    #: Rebind the methods decorated by :func:`require_connection` to their
+    #: ``nowait`` versions once the component is started, see
+    #: :meth:`bind_fast_accessors`. It could be passed as a keyword argument.
+    fast_accessors = False
+
     def __init__(self, client, service, cluster=OVERALL, logger_name=None,
                  local_mode=False, lazy=True, **kwargs):
         self.client = client
@@ -56,6 +62,30 @@ class BaseComponent(object):
     def init(self):
         pass
 
+    def _connection_required_methods(self):
+        cls = type(self)
+        for name in dir(cls):
+            nowait = getattr(getattr(cls, name, None), 'nowait', None)
+            if nowait is not None:
+                yield name, nowait
+
+    def bind_fast_accessors(self):
+        """Bind the methods decorated by :func:`require_connection` to the
+        instance without any readiness check.
+
+        It should be called after the component is started, the checks are
+        no-op until the component is stopped.
+        """
+        for name, nowait in self._connection_required_methods():
+            accessor = functools.partial(nowait, self)
+            accessor.nowait = nowait
+            setattr(self, name, accessor)
+
+    def unbind_fast_accessors(self):
+        """Restore the methods with readiness checks."""
+        for name, _ in self._connection_required_methods():
+            self.__dict__.pop(name, None)
+
     @property
     def base_path(self):
         return COMPONENT_PATH.format(subdomain=self.SUBDOMAIN,
@@ -121,6 +151,7 @@ def try_decode(value):
 class Watchable(object):
     def init(self):
         self.external_watchers = collections.defaultdict(set)
+        self.key_trie = KeyTrie()
 
     @require_connection
     def watch(self, name, callback):
@@ -131,6 +162,31 @@ class Watchable(object):
         """
         self.external_watchers[name].add(callback)
 
+    @require_connection
+    def watch_prefix(self, prefix, callback):
+        """Watch the values of instances whose names start with ``prefix``.
+
+        :arg callable callback: will be invoked with the name and the new
+                                value, when any of instances changes.
+        """
+        self.key_trie.add_prefix(prefix, callback)
+
+    @require_connection
+    def watch_pattern(self, pattern, callback):
+        """Watch the values of instances whose names match a glob
+        ``pattern``, e.g. ``feature.payments.*``.
+
+        :arg callable callback: will be invoked with the name and the new
+                                value, when any of instances changes.
+        """
+        self.key_trie.add_pattern(pattern, callback)
+
+    def unwatch_prefix(self, prefix, callback):
+        self.key_trie.remove_prefix(prefix, callback)
+
+    def unwatch_pattern(self, pattern, callback):
+        self.key_trie.remove_pattern(pattern, callback)
+
     def on_change(self, name):
         """Decorator for watching instance.
 
@@ -171,3 +227,10 @@ class Watchable(object):
             else:
                 self.logger.debug(
                     'callback: %r(%r)=>%r', name, value, callback)
+        for callback in self.key_trie.match(name):
+            try:
+                callback(name, value)
+            except Exception:
+                self.logger.error(
+                    'Failed to call callback: %r=>%r', name, callback,
+                    exc_info=True)
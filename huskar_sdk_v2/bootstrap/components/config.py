@@ -5,6 +5,9 @@ import functools
 from huskar_sdk_v2.utils import combine, encode_key, decode_key
 from huskar_sdk_v2.six import iteritems
 from huskar_sdk_v2.consts import CONFIG_SUBDOMAIN, CACHE_KEYS
+from huskar_sdk_v2.utils.frozen import freeze
+from huskar_sdk_v2.utils.scope import request_cached
+from huskar_sdk_v2.utils.typed import DerivedValue, TypedValue
 from . import SignalComponent, Watchable, try_decode, require_connection
 
 
@@ -19,6 +22,10 @@ class Config(SignalComponent, Watchable):
     def init(self):
         self.configs = self.cache_cls(CACHE_KEYS.CONFIG)
         self.overall_configs = self.cache_cls(CACHE_KEYS.OVERALL_CONFIG)
+        # the decoded values, mapping name to a (raw, decoded) tuple
+        self.decoded_configs = {}
+        self.decoded_overall_configs = {}
+        self.frozen = False
         self.started = False
         self.started_timeout = self.client.event_object()
         self.ready = self.client.event_object()
@@ -44,6 +51,7 @@ class Config(SignalComponent, Watchable):
             self.overall_configs.init()
         except AttributeError:
             pass
+        self._clear_decoded()
 
         if self.started:
             return
@@ -53,11 +61,14 @@ class Config(SignalComponent, Watchable):
             self.started = True
             self.client.spawn(self._provision).join(10)
             self.started_timeout.set()
+            if self.fast_accessors:
+                self.bind_fast_accessors()
 
     def stop(self):
         super(Config, self).stop()
         with self.lock:
             if self.started:
+                self.unbind_fast_accessors()
                 self.started = False
                 self.started_timeout.clear()
                 self.ready.clear()
@@ -82,8 +93,7 @@ class Config(SignalComponent, Watchable):
             return
 
         # ensure the paths exist, or the ChildrenWatch will not work.
-        self.client.ensure_path(self.base_path)
-        self.client.ensure_path(self.overall_base_path)
+        self.client.ensure_paths([self.base_path, self.overall_base_path])
 
         # watch cluster path and overall path
         self.client.watch_path(self.base_path, self.register_config)
@@ -92,15 +102,84 @@ class Config(SignalComponent, Watchable):
 
         self.ready.set()
 
+    def declare(self, name, coerce, default=None):
+        """Declare a typed configuration, which is coerced and validated only
+        once it changes.
+
+        .. code:: python
+
+            timeout = config.declare('TIMEOUT', int, default=3)
+            timeout.get()
+
+        :arg str name: The configuration name.
+        :arg coerce: A callable such as ``int`` or a schema object, see
+                     :class:`~huskar_sdk_v2.utils.typed.TypedValue`.
+        :arg default: This will be used if ``name`` not found or there is no
+                      valid value.
+        :returns: A :class:`~huskar_sdk_v2.utils.typed.TypedValue`.
+        """
+        typed_value = TypedValue(name, coerce, default)
+        self.watch(name, typed_value.update)
+        typed_value.update(self.get(name))
+        return typed_value
+
+    def derived(self, fn, keys):
+        """Declare a value derived from configurations, e.g. a compiled
+        regex, which is computed again only if any of ``keys`` changes.
+
+        .. code:: python
+
+            pattern = config.derived(re.compile, ['PATTERN'])
+            pattern.get().match(path)
+
+        :arg fn: The function which is called with values of ``keys``.
+        :arg keys: The configuration names.
+        :returns: A :class:`~huskar_sdk_v2.utils.typed.DerivedValue`.
+        """
+        derived_value = DerivedValue(fn, keys, self.get)
+        for name in derived_value.keys:
+            self.watch(name, derived_value.invalidate)
+        return derived_value
+
+    def set_frozen(self, frozen=True):
+        """Make the values returned by :meth:`get` read-only.
+
+        The decoded values are cached and shared by all callers of
+        :meth:`get`, so modifying them in place corrupts the cache. The dicts
+        are returned as :class:`~huskar_sdk_v2.utils.frozen.FrozenDict` and
+        the lists are returned as tuples if it is frozen, which prevents that.
+
+        :arg bool frozen: ``True`` to make the values read-only.
+        """
+        self.frozen = frozen
+        self._clear_decoded()
+
+    def _clear_decoded(self):
+        self.decoded_configs.clear()
+        self.decoded_overall_configs.clear()
+
+    def _decode(self, configs, decoded, name):
+        raw = configs[name]
+        entry = decoded.get(name)
+        if entry is not None and entry[0] is raw:
+            return entry[1]
+        value = try_decode(raw)
+        if self.frozen:
+            value = freeze(value)
+        decoded[name] = (raw, value)
+        return value
+
     def register_config(self, nodes):
-        self._register_config(nodes, self.base_path, self.configs)
+        self._register_config(
+            nodes, self.base_path, self.configs, self.decoded_configs)
 
     def register_overall_config(self, nodes):
         self._register_config(
-            nodes, self.overall_base_path, self.overall_configs)
+            nodes, self.overall_base_path, self.overall_configs,
+            self.decoded_overall_configs)
 
-    def _register_config(self, nodes, base_path, configs):
-        callback = functools.partial(self._trigger_config, configs)
+    def _register_config(self, nodes, base_path, configs, decoded):
+        callback = functools.partial(self._trigger_config, configs, decoded)
         for raw_key in nodes:
             self._connect_signal_by_basename_and_nodename(
                 base_path, raw_key, callback)
@@ -113,10 +192,12 @@ class Config(SignalComponent, Watchable):
             self._disconnect_signal(combine(base_path, key))
             self.client.unwatch_key(combine(base_path, key))
             configs.pop(raw_key)
+            decoded.pop(raw_key, None)
 
-    def _trigger_config(self, configs, path, name, value_state):
+    def _trigger_config(self, configs, decoded, path, name, value_state):
         name = decode_key(name)
         value, state = value_state
+        decoded.pop(name, None)
         if state.is_deleted:
             self.logger.info('node: %s removed', combine(path, name))
             configs.pop(name, None)
@@ -132,6 +213,7 @@ class Config(SignalComponent, Watchable):
         return name in self.configs or name in self.overall_configs
 
     @require_connection
+    @request_cached
     def get(self, name, default=None, raises=False, _force_overall=False):
         """Get configuration value by ``name``.
 
@@ -144,14 +226,52 @@ class Config(SignalComponent, Watchable):
                        **cluster configuration** will override
                        **overall configuration** if they share the same name.
         :arg default: This will be returned if ``name`` not found.
+        :returns: The decoded value, it is cached until the configuration
+                  changes, see :meth:`set_frozen`. It is memoized in the
+                  current
+                  :func:`~huskar_sdk_v2.utils.scope.request_scope`.
         :raises RuntimeError: Raised if the filesystem cache is not available
                               and the ZooKeeper connection is lost.
         """
+        return self._get_value(name, default, _force_overall)
+
+    @require_connection
+    def get_many(self, names, defaults=None):
+        """Get many configuration values at once, the readiness is checked
+        only once.
+
+        :arg names: The configuration names.
+        :arg dict defaults: The default values for names, ``None`` for the
+                            absent names.
+        :returns: A dict of name to value.
+        :raises RuntimeError: See :meth:`get`.
+        """
+        defaults = defaults or {}
+        return dict((name, self._get_value(name, defaults.get(name)))
+                    for name in names)
+
+    @require_connection
+    def snapshot(self):
+        """Get all configuration values at once.
+
+        :returns: A dict of name to value.
+        """
+        result = dict(
+            (name, self._decode(
+                self.overall_configs, self.decoded_overall_configs, name))
+            for name in list(self.overall_configs))
+        result.update(
+            (name, self._decode(self.configs, self.decoded_configs, name))
+            for name in list(self.configs))
+        return result
+
+    def _get_value(self, name, default=None, _force_overall=False):
         r = default
         if not _force_overall and name in self.configs:
-            r = try_decode(self.configs[name])
+            r = self._decode(self.configs, self.decoded_configs, name)
         elif name in self.overall_configs:
-            r = try_decode(self.overall_configs[name])
+            r = self._decode(
+                self.overall_configs, self.decoded_overall_configs, name)
         elif (
             not self.client.local_mode and
             not self.ready.is_set() and self.started_timeout.is_set() and
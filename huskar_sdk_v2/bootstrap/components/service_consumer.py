@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 
+import time
 import functools
 import logging
 from collections import defaultdict
@@ -10,6 +11,10 @@ from blinker import Namespace
 from huskar_sdk_v2.utils import combine, no_multiprocess_check
 from huskar_sdk_v2.consts import SERVICE_SUBDOMAIN, COMPONENT_PATH, CACHE_KEYS
 from huskar_sdk_v2.exceptions import OperationFailedException
+from huskar_sdk_v2.utils.instance_index import InstanceIndex, MISSING
+from huskar_sdk_v2.utils.locality import LocalitySelector
+from huskar_sdk_v2.utils.outlier import OutlierDetector
+from huskar_sdk_v2.utils.prewarm import Prewarmer
 from . import SignalComponent
 
 
@@ -28,10 +33,17 @@ class ServiceConsumer(SignalComponent):
         self.service_list_change_signal = {}
         self.min_server_num = min_server_num
         self.linked_cluster = {}
+        # the resolved paths of instances, see service_instance_path
+        self.instance_paths = {}
 
+        # the events of watched clusters, set once the instances are loaded
+        self.loaded_services = {}
         self.watched_service = {}
         self.watched_service_nodes = defaultdict(list)
         self.watched_service_nodes_signals = defaultdict(list)
+        self.indexes = {}
+        self.outlier_detectors = {}
+        self.prewarmers = {}
 
     def set_min_server_num(self, min_server_num):
         self.min_server_num = min_server_num
@@ -41,6 +53,12 @@ class ServiceConsumer(SignalComponent):
             subdomain=self.SUBDOMAIN, service=service, cluster=cluster)
 
     def service_instance_path(self, service, cluster):
+        """Get the path of instances of the cluster, or the cluster linked
+        to. The resolved path is cached until the link info changes.
+        """
+        path = self.instance_paths.get((service, cluster))
+        if path is not None:
+            return path
         # TODO should we use filesystem cache here?
         cluster_path = self.get_service_cluster_node(service, cluster)
         try:
@@ -48,24 +66,31 @@ class ServiceConsumer(SignalComponent):
         except OperationFailedException as e:
             logger.warning(
                 'Failed to get link info, ignore cluster linking: %s', e)
-        else:
-            if cluster_info:
-                try:
-                    cluster_info = json.loads(cluster_info)
-                    clusters_linked_to = cluster_info['link']
-                    # Link to single cluster for now
-                    chosen_cluster = clusters_linked_to[0]
-                except (KeyError, IndexError, ValueError):
-                    logger.warning(
-                        'Linking skiped: {0}/{1}'.format(service, cluster))
-                except Exception:
-                    logger.warning(
-                        'Linking skiped: {0}/{1}'.format(service, cluster),
-                        exc_info=True)
-                else:
-                    self.linked_cluster[(service, cluster)] = chosen_cluster
-                    cluster_path = self.get_service_cluster_node(
-                        service, chosen_cluster)
+            return cluster_path
+        path = self.instance_paths[(service, cluster)] = self._parse_link(
+            service, cluster, cluster_info)
+        return path
+
+    def _parse_link(self, service, cluster, cluster_info):
+        cluster_path = self.get_service_cluster_node(service, cluster)
+        self.linked_cluster.pop((service, cluster), None)
+        if cluster_info:
+            try:
+                cluster_info = json.loads(cluster_info)
+                clusters_linked_to = cluster_info['link']
+                # Link to single cluster for now
+                chosen_cluster = clusters_linked_to[0]
+            except (KeyError, IndexError, ValueError):
+                logger.warning(
+                    'Linking skiped: {0}/{1}'.format(service, cluster))
+            except Exception:
+                logger.warning(
+                    'Linking skiped: {0}/{1}'.format(service, cluster),
+                    exc_info=True)
+            else:
+                self.linked_cluster[(service, cluster)] = chosen_cluster
+                cluster_path = self.get_service_cluster_node(
+                    service, chosen_cluster)
         return cluster_path
 
     def unwatch_service(self, service, cluster):
@@ -85,6 +110,10 @@ class ServiceConsumer(SignalComponent):
             self.watched_service_nodes_signals[(service, cluster)] = []
 
     def cluster_linking_changed_handler(self, service, cluster, meta):
+        # resolve the link from the pushed data instead of reading it again
+        value, _ = meta
+        self.instance_paths[(service, cluster)] = self._parse_link(
+            service, cluster, value)
         self.watch_service(service, cluster)
 
     def watch_cluster_for_link(self, service, cluster):
@@ -97,8 +126,53 @@ class ServiceConsumer(SignalComponent):
             ),
         )
 
-    def preprocess_service_mappings(self, mappings):
-        return
+    def preprocess_service_mappings(self, mappings, timeout=3.0):
+        """Watch the clusters of many services concurrently, instead of one
+        by one on the first call of :meth:`get_service_instance`.
+
+        .. code:: python
+
+            consumer.preprocess_service_mappings({
+                'arch.test1': ['alpha_stable'],
+                'arch.test2': ['alpha_stable', 'alpha_dev'],
+            })
+
+        :arg dict mappings: the service names to their clusters.
+        :arg float timeout: the overall deadline in seconds. The clusters
+                            which are not loaded in time keep loading in the
+                            background. ``None`` to wait for all of them.
+        :returns: a dict of service name to ``True`` if all of its clusters
+                  are loaded in time.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        def load(service, cluster, event):
+            try:
+                self._load_service(service, cluster, event)
+            except Exception:
+                logger.exception(
+                    'Failed to watch service %s@%s', service, cluster)
+
+        # the clusters being loaded by other callers are waited as well
+        events = {}
+        for service, clusters in mappings.items():
+            for cluster in clusters:
+                event = self.loaded_services.get((service, cluster))
+                if event is None:
+                    event = self.loaded_services[(service, cluster)] = \
+                        self.client.event_object()
+                    self.client.spawn(load, service, cluster, event)
+                events[(service, cluster)] = event
+
+        loaded = set()
+        for key, event in events.items():
+            event.wait(
+                None if deadline is None else max(deadline - time.time(), 0))
+            if event.is_set() and self.loaded_services.get(key) is event:
+                loaded.add(key)
+        return dict(
+            (service, all((service, c) in loaded for c in clusters))
+            for service, clusters in mappings.items())
 
     def watch_service(self, service, cluster):
         # If is already watched, let's unwatch it. So that if one cluster is
@@ -130,6 +204,7 @@ class ServiceConsumer(SignalComponent):
 
     def _record_switch(self, service, cluster, nodes):
         path = self.service_instance_path(service, cluster)
+        watch_paths = []
         for n in nodes:
             watch_patch = combine(path, n)
             self.watched_service_nodes[(service, cluster)].append(watch_patch)
@@ -139,7 +214,9 @@ class ServiceConsumer(SignalComponent):
             self._connect_signal_by_basename_and_nodename(
                 path, n, functools.partial(self._trigger_service, service,
                                            cluster,))
-            self.client.watch_key(watch_patch)
+            watch_paths.append(watch_patch)
+        # fetch the instances in parallel instead of one round trip for each
+        self.client.watch_keys(watch_paths)
 
         service_cache = self.get_service_cache(service, cluster)
 
@@ -151,6 +228,7 @@ class ServiceConsumer(SignalComponent):
                     # ensure the services num is no less than min server num # noqa
                     self._disconnect_signal(combine(path, n))
                     service_cache.pop(n)
+                    self._update_index(service, cluster, n, None)
                     changed = True
 
         if changed:
@@ -179,32 +257,195 @@ class ServiceConsumer(SignalComponent):
                     service, cluster, instance_name)
             )
         else:
+            self._update_index(
+                service, cluster, instance_name, service_cache[instance_name])
             self.trigger_service_list_change_signal(service, cluster)
 
-    def get_service_instance(self, service, cluster):
-        key = '{}_{}'.format(service, cluster)
+    def _update_index(self, service, cluster, instance_name, instance):
+        index = self.indexes.get('{}_{}'.format(service, cluster))
+        if index is None:
+            return
+        if instance is None:
+            index.discard(instance_name)
+        else:
+            index.put(instance_name, instance)
 
-        if key not in self.services:
-            self.services[key] = self.get_service_cache(service, cluster)
+    def add_index(self, service, cluster, index_by):
+        """Maintain secondary indexes on the instances of a service.
+
+        :arg index_by: the dotted fields of instance to be indexed, e.g.
+                       ``('state', 'meta.zone', 'port.thrift')``.
+        """
+        key = '{}_{}'.format(service, cluster)
+        index = self.indexes.get(key)
+        fields = tuple(index_by)
+        if index is not None:
+            fields = index.fields + tuple(
+                f for f in fields if f not in index.fields)
+            if fields == index.fields:
+                return
+        index = InstanceIndex(fields)
+        index.sync(self.get_service_cache(service, cluster))
+        self.indexes[key] = index
+
+    def find_instances(self, service, cluster, field, value=MISSING):
+        """Get the instances whose indexed ``field`` equals to ``value``.
+
+        .. code:: python
+
+            consumer.find_instances('arch.test', 'alpha_stable',
+                                    'meta.zone', 'alta1')
+
+        :arg str field: the dotted field declared in ``index_by``.
+        :arg value: the instances which have the ``field`` at all will be
+                    returned if it is omitted.
+        :returns: a dict of instance name to instance. Do not modify it.
+        :raises ValueError: the field is not indexed.
+        """
+        index = self.indexes.get('{}_{}'.format(service, cluster))
+        if index is None:
+            raise ValueError(
+                'service %s@%s is not indexed' % (service, cluster))
+        return index.find(field, value)
+
+    def get_service_instance(self, service, cluster, index_by=None):
+        if index_by:
+            self.add_index(service, cluster, index_by)
+
+        if (service, cluster) not in self.loaded_services:
+            loaded = self.loaded_services[(service, cluster)] = \
+                self.client.event_object()
+            self._load_service(service, cluster, loaded)
+        return self.get_service_cache(service, cluster)
+
+    def _load_service(self, service, cluster, loaded):
+        try:
             self.watch_service(service, cluster)
-        return self.services[key]
+        except Exception:
+            # retry on the next call, and wake the waiters up
+            if self.loaded_services.get((service, cluster)) is loaded:
+                del self.loaded_services[(service, cluster)]
+            loaded.set()
+            raise
+        loaded.set()
 
     def register_hook_function(self, service, cluster, hook_function,
-                               trigger=True):
+                               trigger=True, index_by=None):
         """
         param hook_function: hook_function will be called when instance list
                               changes instance_list will be passed to
                               hook_function as a parameter
         param trigger : if True, the hook_function will be called as soon as
                         register_hook_function is called.
+        param index_by : the dotted fields of instance to be indexed, see
+                         :meth:`add_index`.
         """
+        if index_by:
+            self.add_index(service, cluster, index_by)
+
         def wrapped_function(*args):
             linked_cluster = self.linked_cluster.get((service, cluster),
                                                      cluster)
             instance_list = self.get_service_instance(service, linked_cluster)
+            instance_list = self._filter_instances(
+                service, cluster, instance_list)
             if callable(hook_function):
                 hook_function(instance_list)
         if trigger:
             wrapped_function()
         self.get_service_list_change_signal(service, cluster).\
             connect(wrapped_function, weak=False)
+
+    def _filter_instances(self, service, cluster, instances):
+        # The ejected instances keep being warm, so the prewarmer goes first.
+        prewarmer = self.prewarmers.get((service, cluster))
+        if prewarmer is not None:
+            instances = prewarmer.filter(instances)
+        detector = self.outlier_detectors.get((service, cluster))
+        if detector is not None:
+            instances = detector.filter(instances)
+        return instances
+
+    def enable_prewarm(self, service, cluster, connector, concurrency=10,
+                       **options):
+        """Warm connections up for the new instances before they are passed
+        to hook functions.
+
+        :arg connector: a callable which accepts the instance name and the
+                        instance, and returns a truthy value after a warm
+                        connection is established.
+        :arg int concurrency: the maximum number of connectors running at the
+                              same time.
+        :arg options: the arguments of
+                      :class:`~huskar_sdk_v2.utils.prewarm.Prewarmer`,
+                      ``min_ready`` defaults to ``min_server_num`` of
+                      consumer.
+        :returns: the :class:`~huskar_sdk_v2.utils.prewarm.Prewarmer`.
+        """
+        options.setdefault('min_ready', self.min_server_num)
+        options.setdefault('sleep', self.client.sleep)
+        prewarmer = Prewarmer(
+            connector, concurrency, spawn=self.client.spawn,
+            semaphore=self.client.semaphore_object,
+            on_ready=functools.partial(
+                self.trigger_service_list_change_signal, service, cluster),
+            **options)
+        self.prewarmers[(service, cluster)] = prewarmer
+        return prewarmer
+
+    def enable_outlier_ejection(self, service, cluster, **options):
+        """Eject the outlier instances temporarily from the lists passed to
+        hook functions, by the results reported via :meth:`report_call`.
+
+        :arg options: the arguments of
+                      :class:`~huskar_sdk_v2.utils.outlier.OutlierDetector`.
+        :returns: the :class:`~huskar_sdk_v2.utils.outlier.OutlierDetector`.
+        """
+        detector = OutlierDetector(**options)
+        self.outlier_detectors[(service, cluster)] = detector
+        return detector
+
+    def report_call(self, service, cluster, instance_name, latency,
+                    success=True):
+        """Report the result of a call to an instance.
+
+        :arg str instance_name: the key of instance in Huskar.
+        :arg float latency: the latency of call in seconds.
+        :arg bool success: ``False`` if the call failed.
+
+        The hook functions are called in background once the ejected
+        instances are changed, so the caller is never blocked by them.
+        """
+        detector = self.outlier_detectors.get((service, cluster))
+        if detector is None:
+            return
+        if detector.report(instance_name, latency, success):
+            self.client.spawn(
+                self.trigger_service_list_change_signal, service, cluster)
+
+    def register_locality_hook(self, service, cluster, hook_function, zone,
+                               trigger=True, **options):
+        """Register a hook function which receives the instances in the same
+        zone only, unless the local capacity is too small.
+
+        .. code:: python
+
+            consumer.register_locality_hook(
+                'arch.test', 'alpha_stable', update_pool, zone='alta1',
+                min_local_ratio=0.2)
+
+        :arg str zone: the zone of current process.
+        :arg options: the arguments of
+                      :class:`~huskar_sdk_v2.utils.locality.LocalitySelector`,
+                      ``min_server_num`` defaults to the one of consumer.
+        :returns: the :class:`~huskar_sdk_v2.utils.locality.LocalitySelector`
+                  whose ``instances`` is the latest selection.
+        """
+        options.setdefault('min_server_num', self.min_server_num)
+        selector = LocalitySelector(zone, **options)
+
+        def wrapped_function(instances):
+            hook_function(selector.update(instances))
+        self.register_hook_function(
+            service, cluster, wrapped_function, trigger=trigger)
+        return selector
@@ -7,6 +7,10 @@ import functools
 from huskar_sdk_v2.six import iteritems
 from huskar_sdk_v2.utils import (
     combine, decode_key, encode_key, get_function_name)
+from huskar_sdk_v2.utils.sampling import (
+    SwitchSlot, is_key_sampled, sample_many)
+from huskar_sdk_v2.utils.scope import (
+    make_key, request_cached, scoped_call)
 from huskar_sdk_v2.consts import CACHE_KEYS, SWITCH_SUBDOMAIN
 from . import SignalComponent, Watchable, require_connection
 
@@ -24,6 +28,7 @@ class Switch(SignalComponent, Watchable):
         self.rand = random.Random(time.time())
         self.switches = self.cache_cls(CACHE_KEYS.SWITCH)
         self.overall_switches = self.cache_cls(CACHE_KEYS.OVERALL_SWITCH)
+        self.slots = {}
         self.started = False
         self.started_timeout = self.client.event_object()
         self.ready = self.client.event_object()
@@ -48,6 +53,7 @@ class Switch(SignalComponent, Watchable):
             self.overall_switches.init()
         except AttributeError:
             pass
+        self._invalidate_slots()
 
         if self.started:
             return
@@ -57,11 +63,14 @@ class Switch(SignalComponent, Watchable):
             self.started = True
             self.client.spawn(self._provision).join(10)
             self.started_timeout.set()
+            if self.fast_accessors:
+                self.bind_fast_accessors()
 
     def stop(self):
         super(Switch, self).stop()
         with self.lock:
             if self.started:
+                self.unbind_fast_accessors()
                 self.started = False
                 self.started_timeout.clear()
                 self.ready.clear()
@@ -78,6 +87,8 @@ class Switch(SignalComponent, Watchable):
             self.overall_switches.close()
         except AttributeError:
             pass
+        # resolve again (and start lazily) on next call of bound functions
+        self._invalidate_slots()
 
     def _provision(self):
         # wait for the first established session
@@ -86,8 +97,7 @@ class Switch(SignalComponent, Watchable):
             return
 
         # ensure the paths exist, or the ChildrenWatch will not work.
-        self.client.ensure_path(self.overall_base_path)
-        self.client.ensure_path(self.base_path)
+        self.client.ensure_paths([self.overall_base_path, self.base_path])
 
         # watch cluster path and overall path
         self.client.watch_path(self.base_path, self.register_switch)
@@ -119,6 +129,7 @@ class Switch(SignalComponent, Watchable):
                 self._disconnect_signal(combine(path, encode_key(n)))
                 self.client.unwatch_key(combine(path, encode_key(n)))
                 switches.pop(n)
+                self._refresh_slot(n)
 
     def _trigger_switch(self, switches, path, name, value_state):
         name = decode_key(name)
@@ -134,6 +145,7 @@ class Switch(SignalComponent, Watchable):
             except (TypeError, ValueError):
                 self.logger.warning(
                     "wrong value type for switch %s: %s", name, value)
+        self._refresh_slot(name)
         self.notify_watchers(name, self.is_switched_on)
 
     def set_default_rate(self, rate):
@@ -145,6 +157,7 @@ class Switch(SignalComponent, Watchable):
         if not isinstance(rate, int):
             raise TypeError("Default rate should be int, get: %s" % rate)
         self.default_rate = rate
+        self._invalidate_slots()
 
     def set_default_state(self, state):
         """Set default state of switch. This is equivalent to
@@ -160,37 +173,118 @@ class Switch(SignalComponent, Watchable):
     # TODO: this method name is confusing, the default should be eliminated
     #       otherwise the method name should change to verb
     @require_connection
-    def is_switched_on(self, name, default=None):
+    @request_cached
+    def is_switched_on(self, name, default=None, key=None):
         """Get the current state of switch by ``name``.
 
         The result of this method may be outdated if the ZooKeeper connection
         is lost. If this happened, a warning logging will be recorded.
 
         :param default: This will be returned if the switch is not found.
-        :returns: ``True`` or ``False`` decided by the pass rate of switch.
+        :param key: The sticky key (e.g. user id) of decision. The same key
+                    always gets the same decision in all processes if it is
+                    provided, instead of a random one.
+        :returns: ``True`` or ``False`` decided by the pass rate of switch,
+                  it is memoized in the current
+                  :func:`~huskar_sdk_v2.utils.scope.request_scope`.
         """
-        if (not self.client.local_mode and not self.ready.is_set() and
-                self.started_timeout.is_set()):
-            self.logger.warning(
-                'Switch %r may be outdated caused by lost connection', name)
-
-        if name in self.switches:
-            pass_percent = self.switches[name].get('value')
-        elif name in self.overall_switches:
-            pass_percent = self.overall_switches[name].get('value')
-        elif default is not None:
-            return default
-        else:
+        pass_percent = self._get_pass_percent(name)
+        if pass_percent is None:
+            if default is not None:
+                return default
             pass_percent = self.default_rate
 
         if pass_percent == 100:
             return True
         elif pass_percent == 0:
             return False
+        elif key is not None:
+            return is_key_sampled(name, key, pass_percent)
         else:
             # to support float pass_percent, e.g. 0.01 means 1/10000
             return self.rand.randint(0, 10000) / 100.0 <= pass_percent
 
+    @require_connection
+    def is_switched_on_many(self, name, n_or_keys, default=None):
+        """Get the states of switch by ``name`` for a batch of calls at once.
+
+        The pass rate is resolved only once, so it is much cheaper than
+        calling :meth:`is_switched_on` for each item of bulk jobs.
+
+        :param n_or_keys: The number of random decisions, or an iterable of
+                          sticky keys as the ``key`` of
+                          :meth:`is_switched_on`.
+        :param default: The state of all items if the switch is not found.
+        :returns: A ``numpy.ndarray`` of ``bool`` if NumPy is installed,
+                  otherwise an ``array.array('B')`` of ``0`` and ``1``.
+        """
+        pass_percent = self._get_pass_percent(name)
+        if pass_percent is None:
+            if default is not None:
+                pass_percent = 100 if default else 0
+            else:
+                pass_percent = self.default_rate
+        return sample_many(name, n_or_keys, pass_percent, self.rand)
+
+    @require_connection
+    def get_many(self, names, defaults=None):
+        """Get the current states of many switches at once, the readiness
+        is checked only once.
+
+        :param names: The names of switches.
+        :param dict defaults: The default states for names, see
+                              :meth:`is_switched_on`.
+        :returns: A dict of name to ``True`` or ``False``. Use
+                  :meth:`snapshot` to get the pass rates.
+        """
+        defaults = defaults or {}
+        is_switched_on = self.is_switched_on.nowait
+        return dict((name, is_switched_on(self, name, defaults.get(name)))
+                    for name in names)
+
+    @require_connection
+    def snapshot(self):
+        """Get the pass rates of all switches at once.
+
+        :returns: A dict of name to pass rate.
+        """
+        result = {}
+        for switches in (self.overall_switches, self.switches):
+            for name in list(switches):
+                switch = switches.get(name)
+                if switch is not None:
+                    result[name] = switch['value']
+        return result
+
+    def _get_pass_percent(self, name):
+        if (not self.client.local_mode and not self.ready.is_set() and
+                self.started_timeout.is_set()):
+            self.logger.warning(
+                'Switch %r may be outdated caused by lost connection', name)
+        return self._lookup_pass_percent(name)
+
+    def _lookup_pass_percent(self, name):
+        if name in self.switches:
+            return self.switches[name].get('value')
+        elif name in self.overall_switches:
+            return self.overall_switches[name].get('value')
+
+    @require_connection
+    def _resolve_pass_percent(self, name):
+        pass_percent = self._get_pass_percent(name)
+        return self.default_rate if pass_percent is None else pass_percent
+
+    def _refresh_slot(self, name):
+        slot = self.slots.get(name)
+        if slot is not None:
+            pass_percent = self._lookup_pass_percent(name)
+            slot.update(
+                self.default_rate if pass_percent is None else pass_percent)
+
+    def _invalidate_slots(self):
+        for slot in list(self.slots.values()):
+            slot.invalidate()
+
     @require_connection
     def bind(self, name=None, default=None):
         """Decorator for binding switch.
@@ -206,17 +300,29 @@ class Switch(SignalComponent, Watchable):
         :arg default: will be returned if switch is **OFF** return
                       ``None`` if not provided.
 
+        The bound functions of a switch share a
+        :class:`~huskar_sdk_v2.utils.sampling.SwitchSlot`, which is kept up to
+        date by the changes of switch, so the check on calling is cheap.
         """
         def wrapper(func):
             switch_name = get_function_name(func) if name is None else name
+            slot = self.slots.get(switch_name)
+            if slot is None:
+                # the resolver is never the fast accessor, which could not
+                # start the component again after it stopped
+                resolver = functools.partial(
+                    type(self)._resolve_pass_percent, self)
+                slot = self.slots[switch_name] = SwitchSlot(
+                    switch_name, resolver, self.rand)
+            self.logger.debug(
+                'Switch %s is bound to %r, alternative staff is %r.',
+                switch_name, func, default)
+
+            scope_key = make_key(self, 'is_switched_on', (switch_name,))
 
             @functools.wraps(func)
             def wrapper2(*args, **kwds):
-                is_switched_on = self.is_switched_on(switch_name)
-                self.logger.debug(
-                    'Switch %s => %r on calling %r, alternative staff is %r.',
-                    switch_name, is_switched_on, func, default)
-                if is_switched_on:
+                if scoped_call(scope_key, slot.is_on):
                     return func(*args, **kwds)
                 elif callable(default):
                     return default()
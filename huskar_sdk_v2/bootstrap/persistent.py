@@ -0,0 +1,196 @@
+from __future__ import absolute_import
+
+import posixpath
+from collections import namedtuple
+
+from kazoo.client import KazooClient
+from kazoo.exceptions import EXCEPTIONS
+from kazoo.protocol.connection import (
+    ConnectionHandler, CREATED_EVENT, DELETED_EVENT, CHANGED_EVENT,
+    CHILD_EVENT)
+from kazoo.protocol.paths import _prefix_root
+from kazoo.protocol.serialization import Watch, int_struct, write_string
+from kazoo.protocol.states import Callback, EVENT_TYPE_MAP, WatchedEvent
+from kazoo.version import __version__ as kazoo_version
+
+
+#: The range of Kazoo versions, ``[minimum, maximum)``, whose internals are
+#: known to work with :class:`KazooConnection`.
+KAZOO_VERSIONS = ((2, 8), (2, 12))
+#: The mode of ``AddWatch`` to watch a node and all of its descendants.
+ADD_WATCH_PERSISTENT_RECURSIVE = 1
+#: The watcher type of ``RemoveWatches`` for the persistent recursive ones.
+WATCHER_PERSISTENT_RECURSIVE = 5
+#: The error code of removing absent watches, unknown to Kazoo before 2.11.
+NO_WATCHER = -121
+NODE_EVENTS = (CREATED_EVENT, DELETED_EVENT, CHANGED_EVENT, CHILD_EVENT)
+
+
+def _parse_version(version):
+    try:
+        return tuple(int(part) for part in version.split('.')[:2])
+    except ValueError:
+        return ()
+
+
+#: ``True`` if the installed Kazoo is able to work with persistent watches.
+supported = (
+    KAZOO_VERSIONS[0] <= _parse_version(kazoo_version) < KAZOO_VERSIONS[1] and
+    hasattr(KazooClient, '_call') and
+    hasattr(ConnectionHandler, '_read_watch_event'))
+
+
+class AddWatch(namedtuple('AddWatch', 'path mode')):
+    type = 106
+
+    def serialize(self):
+        b = bytearray()
+        b.extend(write_string(self.path))
+        b.extend(int_struct.pack(self.mode))
+        return b
+
+    @classmethod
+    def deserialize(cls, bytes, offset):
+        return True
+
+
+class RemoveWatches(namedtuple('RemoveWatches', 'path watcher_type')):
+    type = 18
+
+    def serialize(self):
+        b = bytearray()
+        b.extend(write_string(self.path))
+        b.extend(int_struct.pack(self.watcher_type))
+        return b
+
+    @classmethod
+    def deserialize(cls, bytes, offset):
+        return True
+
+
+class KazooConnection(object):
+    """The adapter of the Kazoo internals used by persistent watches, which
+    are the only way to send the requests and read the events of them with
+    the released Kazoo. It is only used if the Kazoo is :data:`supported`.
+
+    The watch events read by the connection of client are passed to
+    ``on_event`` after the one-shot watchers of Kazoo, with the event type
+    code, the chrooted path and the state of client.
+
+    :arg client: the ``KazooClient``.
+    :arg on_event: a callable which accepts the event.
+    """
+    def __init__(self, client, on_event):
+        self.client = client
+        self.on_event = on_event
+        connection = client._connection
+        self._read_watch_event = connection._read_watch_event
+        connection._read_watch_event = self.read_watch_event
+
+    def read_watch_event(self, buffer, offset):
+        self._read_watch_event(buffer, offset)
+        watch, _ = Watch.deserialize(buffer, offset)
+        if not self.client._stopped.is_set():
+            self.on_event(watch.type, watch.path, self.client._state)
+
+    def full_path(self, path):
+        """Get the chrooted path of ``path``."""
+        return _prefix_root(self.client.chroot, path)
+
+    def send(self, request):
+        """Send ``request`` and return an ``IAsyncResult`` of it."""
+        async_result = self.client.handler.async_result()
+        self.client._call(request, async_result)
+        return async_result
+
+    def dispatch(self, watcher, event):
+        """Call ``watcher`` with ``event`` in the callback thread."""
+        self.client.handler.dispatch_callback(
+            Callback('watch', watcher, (event,)))
+
+
+class PersistentWatches(object):
+    """Adds the persistent recursive watches of ZooKeeper 3.6+ with a Kazoo
+    client, which the released Kazoo does not provide yet.
+
+    The watch events are dispatched to the watchers of the changed node and
+    its ancestors, after the one-shot watchers of Kazoo. The servers before
+    3.6 reply ``AddWatch`` with an ``UnimplementedError``.
+
+    The watches are lost with the connection, the owner should add them
+    again after reconnecting.
+
+    :arg client: the ``KazooClient``.
+    :raises RuntimeError: if the installed Kazoo is not :data:`supported`.
+    """
+    def __init__(self, client):
+        if not supported:
+            raise RuntimeError(
+                'Persistent watches need Kazoo %s to %s, not %s' % (
+                    '.'.join(map(str, KAZOO_VERSIONS[0])),
+                    '.'.join(map(str, KAZOO_VERSIONS[1])), kazoo_version))
+        self.client = client
+        #: The watchers of the chrooted paths.
+        self.watchers = {}
+        self.connection = KazooConnection(client, self.dispatch)
+
+    def add(self, path, watcher):
+        """Add a persistent recursive watch on ``path``.
+
+        :arg watcher: a callable which accepts a ``WatchedEvent``, it is
+                      registered before the watch is added.
+        :returns: an ``IAsyncResult`` of the request.
+        """
+        full_path = self.connection.full_path(path)
+        self.watchers.setdefault(full_path, set()).add(watcher)
+        return self.connection.send(
+            AddWatch(full_path, ADD_WATCH_PERSISTENT_RECURSIVE))
+
+    def remove(self, path, watcher):
+        """Remove ``watcher`` of ``path``. The persistent recursive watch is
+        removed from the server once ``path`` has no watcher.
+
+        :returns: an ``IAsyncResult`` of the request, or ``None`` if the
+                  request is not sent.
+        """
+        full_path = self.connection.full_path(path)
+        watchers = self.watchers.get(full_path)
+        if watchers is None:
+            return
+        watchers.discard(watcher)
+        if watchers:
+            return
+        del self.watchers[full_path]
+        if NO_WATCHER not in EXCEPTIONS:
+            # the old Kazoo would break the connection on the error of an
+            # absent watch, which is left to the session instead
+            return
+        return self.connection.send(
+            RemoveWatches(full_path, WATCHER_PERSISTENT_RECURSIVE))
+
+    def forget(self, path, watcher):
+        """Remove ``watcher`` of ``path`` without any request."""
+        full_path = self.connection.full_path(path)
+        watchers = self.watchers.get(full_path)
+        if watchers is not None:
+            watchers.discard(watcher)
+            if not watchers:
+                del self.watchers[full_path]
+
+    def dispatch(self, event_type, path, state):
+        if not self.watchers or event_type not in NODE_EVENTS:
+            return
+        watchers = []
+        full_path = path
+        while True:
+            watchers.extend(self.watchers.get(full_path, ()))
+            if full_path == '/':
+                break
+            full_path = posixpath.dirname(full_path)
+        if not watchers:
+            return
+
+        event = WatchedEvent(EVENT_TYPE_MAP[event_type], state,
+                             self.client.unchroot(path))
+        for watcher in watchers:
+            self.connection.dispatch(watcher, event)
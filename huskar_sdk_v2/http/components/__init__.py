@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import logging
+
 from ..statsd import record_update_event
 from ..patterns import HookMixIn
 from ..ioloops.events import WatchEvent
-from ...six import iteritems
+from ...six import iteritems, unicode
+from ...utils.keytrie import KeyTrie
+
 
+logger = logging.getLogger(__name__)
 
 OVERALL_CLUSTER_NAME = 'overall'
 
@@ -15,6 +20,20 @@ class BaseComponent(HookMixIn):
         self.app_id = app_id
         self.cluster = cluster
 
+    def init(self):
+        super(BaseComponent, self).init()
+        self.key_trie = KeyTrie()
+
+    def notify(self, key, value):
+        super(BaseComponent, self).notify(key, value)
+        if not isinstance(key, (str, unicode)):
+            return                          # e.g. (app_id, cluster) of Service
+        for method in self.key_trie.match(key):
+            try:
+                method(key, value)
+            except:  # noqa
+                logger.exception('notify listerners got:')
+
     def add_current_app_to_watchlist(self):
         self.add_watch(self.app_id, self.cluster)
 
@@ -40,6 +59,32 @@ class BaseComponent(HookMixIn):
     def watch(self, name, callback):
         self.add_listener(name, callback)
 
+    def watch_prefix(self, prefix, callback):
+        """Registers a callback function to listen changes of keys which
+        start with ``prefix``.
+
+        :param prefix: The prefix of keys in Huskar.
+        :param callback: The function which is called with the key and the
+            new value.
+        """
+        self.key_trie.add_prefix(prefix, callback)
+
+    def watch_pattern(self, pattern, callback):
+        """Registers a callback function to listen changes of keys which
+        match a glob ``pattern``, e.g. ``feature.payments.*``.
+
+        :param pattern: The glob pattern of keys in Huskar.
+        :param callback: The function which is called with the key and the
+            new value.
+        """
+        self.key_trie.add_pattern(pattern, callback)
+
+    def unwatch_prefix(self, prefix, callback):
+        self.key_trie.remove_prefix(prefix, callback)
+
+    def unwatch_pattern(self, pattern, callback):
+        self.key_trie.remove_pattern(pattern, callback)
+
     def on_change(self, name):
         """Registers a callback function to listen changes of specified key.
 
@@ -93,6 +138,38 @@ class OverAllOverlayMixin(BaseComponent):
                                     key, raises=raises)
         return value['value'] if value else default
 
+    def get_many(self, keys, defaults=None):
+        """Gets many instances from Huskar at once, the readiness is checked
+        only once.
+
+        :param keys: The keys of instances in Huskar.
+        :param defaults: Optional. A dict of the default values for keys.
+            Default: ``None`` for all keys.
+        :returns: A dict of key to value.
+        """
+        defaults = defaults or {}
+        self.client.ensure_ready()
+        cluster_values = self.client.get_values_by_app_id_cluster(
+            self.app_id, self.cluster)
+        overall_values = self.client.get_values_by_app_id_cluster(
+            self.app_id, OVERALL_CLUSTER_NAME)
+        result = {}
+        for key in keys:
+            if key in cluster_values:
+                value = cluster_values[key]
+            else:
+                value = overall_values.get(key)
+            result[key] = value['value'] if value else defaults.get(key)
+        return result
+
+    def snapshot(self):
+        """Gets all instances from Huskar at once.
+
+        :returns: A dict of key to value.
+        """
+        self.client.ensure_ready()
+        return dict(self.iteritems())
+
     def exists(self, key):
         """Checks the instance with specified key does exist or not in Huskar.
 
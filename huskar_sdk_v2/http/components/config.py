@@ -4,6 +4,8 @@ import simplejson as json
 
 from . import OverAllOverlayMixin
 from ..ioloops import IOLoop
+from ...utils.scope import request_cached
+from ...utils.typed import DerivedValue, TypedValue
 
 
 def try_decode(value):
@@ -22,6 +24,56 @@ class Config(OverAllOverlayMixin):
     def client(self):
         return IOLoop.current().watched_configs
 
+    @request_cached
+    def get(self, key, default=None, raises=False, _force_overall=False):
+        """Gets a config from Huskar, it is memoized in the current
+        :func:`~huskar_sdk_v2.utils.scope.request_scope`.
+
+        See :meth:`OverAllOverlayMixin.get` for the parameters.
+        """
+        return super(Config, self).get(
+            key, default=default, raises=raises,
+            _force_overall=_force_overall)
+
+    def declare(self, name, coerce, default=None):
+        """Declares a typed config, which is coerced and validated only
+        once it changes.
+
+        Example::
+
+            timeout = huskar.config.declare('TIMEOUT', int, default=3)
+            timeout.get()
+
+        :param name: The key of config in Huskar.
+        :param coerce: A callable such as ``int`` or a schema object, see
+            :class:`~huskar_sdk_v2.utils.typed.TypedValue`.
+        :param default: Optional. This will be used if the config is not found
+            or there is no valid value. Default: ``None``
+        :returns: A :class:`~huskar_sdk_v2.utils.typed.TypedValue`.
+        """
+        typed_value = TypedValue(name, coerce, default)
+        self.watch(name, typed_value.update)
+        typed_value.update(self.get(name))
+        return typed_value
+
+    def derived(self, fn, keys):
+        """Declares a value derived from configs, e.g. a compiled regex,
+        which is computed again only if any of ``keys`` changes.
+
+        Example::
+
+            pattern = huskar.config.derived(re.compile, ['PATTERN'])
+            pattern.get().match(path)
+
+        :param fn: The function which is called with values of ``keys``.
+        :param keys: The keys of config in Huskar.
+        :returns: A :class:`~huskar_sdk_v2.utils.typed.DerivedValue`.
+        """
+        derived_value = DerivedValue(fn, keys, self.get)
+        for name in derived_value.keys:
+            self.watch(name, derived_value.invalidate)
+        return derived_value
+
     @classmethod
     def value_processor(cls, value):
         value['value'] = try_decode(value['value'])
@@ -2,16 +2,24 @@
 
 import json
 
+import gevent
+
 from . import BaseComponent
 from ..ioloops import IOLoop
 from ..ioloops.events import WatchEvent
+from ...utils.instance_index import InstanceIndex, MISSING
+from ...utils.locality import LocalitySelector
+from ...utils.outlier import OutlierDetector
+from ...utils.prewarm import Prewarmer
 
 
 class Service(BaseComponent):
-    add_service = BaseComponent.add_watch
-
     def __init__(self, app_id, cluster):
         super(Service, self).__init__(app_id, cluster)
+        self.indexes = {}
+        self.min_server_num = 1
+        self.outlier_detectors = {}
+        self.prewarmers = {}
 
     @property
     def client(self):
@@ -20,13 +28,70 @@ class Service(BaseComponent):
     def notify_listeners_of_node_changes(self, app_id, cluster):
         self.notify(
             (app_id, cluster),
-            self.get_service_node_list(app_id,
-                                       cluster)
+            self.get_available_node_list(app_id,
+                                         cluster)
             )
 
+    def add_service(self, app_id, cluster, timeout=None, index_by=None):
+        if index_by:
+            self.add_index(app_id, cluster, index_by)
+        return self.add_watch(app_id, cluster, timeout=timeout)
+
+    def add_index(self, app_id, cluster, index_by):
+        """Maintains secondary indexes on the instances of a service.
+
+        :param index_by: The dotted fields of instance to be indexed, e.g.
+            ``('state', 'meta.zone', 'port.thrift')``.
+        """
+        index = self.indexes.get((app_id, cluster))
+        fields = tuple(index_by)
+        if index is not None:
+            fields = index.fields + tuple(
+                f for f in fields if f not in index.fields)
+            if fields == index.fields:
+                return
+        index = InstanceIndex(fields)
+        index.sync(self.get_service_node_list(app_id, cluster))
+        self.indexes[(app_id, cluster)] = index
+
+    def find_instances(self, app_id, cluster, field, value=MISSING):
+        """Gets the instances whose indexed ``field`` equals to ``value``.
+
+        Example::
+
+            huskar.service_consumer.find_instances(
+                'arch.test', 'alpha-stable', 'meta.zone', 'alta1')
+
+        :param field: The dotted field declared in ``index_by``.
+        :param value: Optional. The instances which have the ``field`` at all
+            will be returned if it is omitted.
+        :returns: A dict of instance name to instance. Do not modify it.
+        :raises ValueError: The field is not indexed.
+        """
+        index = self.indexes.get((app_id, cluster))
+        if index is None:
+            raise ValueError(
+                'service %s@%s is not indexed' % (app_id, cluster))
+        return index.find(field, value)
+
+    def update_index(self, watch_event):
+        index = self.indexes.get((watch_event.app_id, watch_event.cluster))
+        if index is None:
+            return
+        if watch_event.kind == WatchEvent.KIND_DELETE:
+            index.discard(watch_event.key)
+            return
+        try:
+            instance = json.loads(watch_event.value['value'])
+        except (TypeError, ValueError):
+            index.discard(watch_event.key)
+        else:
+            index.put(watch_event.key, instance)
+
     def handle_changes(self, watch_event):
         if watch_event.kind in (WatchEvent.KIND_UPDATE,
                                 WatchEvent.KIND_DELETE):
+            self.update_index(watch_event)
             self.notify_listeners_of_node_changes(
                 watch_event.app_id, watch_event.cluster
                 )
@@ -38,22 +103,138 @@ class Service(BaseComponent):
                 app_id, cluster).items()
             }
 
+    def get_available_node_list(self, app_id, cluster):
+        """Gets the instances of service without the ejected outliers and
+        the instances not warmed up, see :meth:`enable_outlier_ejection` and
+        :meth:`enable_prewarm`.
+        """
+        instances = self.get_service_node_list(app_id, cluster)
+        # The ejected instances keep being warm, so the prewarmer goes first.
+        prewarmer = self.prewarmers.get((app_id, cluster))
+        if prewarmer is not None:
+            instances = prewarmer.filter(instances)
+        detector = self.outlier_detectors.get((app_id, cluster))
+        if detector is not None:
+            instances = detector.filter(instances)
+        return instances
+
+    def enable_prewarm(self, app_id, cluster, connector, concurrency=10,
+                       **options):
+        """Warms connections up for the new instances before they are passed
+        to hook functions.
+
+        Example::
+
+            def connect(instance_name, instance):
+                return pool.connect(instance['ip'], instance['port']['main'])
+
+            huskar.service_consumer.enable_prewarm(
+                'arch.test', 'alpha-stable', connect)
+
+        :param connector: A callable which accepts the instance name and the
+            instance, and returns a truthy value after a warm connection is
+            established.
+        :param concurrency: Optional. The maximum number of connectors running
+            at the same time.
+        :param options: Optional. The arguments of
+            :class:`~huskar_sdk_v2.utils.prewarm.Prewarmer`, ``min_ready``
+            defaults to ``min_server_num``.
+        :returns: The :class:`~huskar_sdk_v2.utils.prewarm.Prewarmer`.
+        """
+        options.setdefault('min_ready', self.min_server_num)
+        prewarmer = Prewarmer(
+            connector, concurrency, on_ready=lambda: (
+                self.notify_listeners_of_node_changes(app_id, cluster)),
+            **options)
+        self.prewarmers[(app_id, cluster)] = prewarmer
+        return prewarmer
+
+    def enable_outlier_ejection(self, app_id, cluster, **options):
+        """Ejects the outlier instances temporarily from the lists passed to
+        hook functions, by the results reported via :meth:`report_call`.
+
+        :param options: Optional. The arguments of
+            :class:`~huskar_sdk_v2.utils.outlier.OutlierDetector`.
+        :returns: The :class:`~huskar_sdk_v2.utils.outlier.OutlierDetector`.
+        """
+        detector = OutlierDetector(**options)
+        self.outlier_detectors[(app_id, cluster)] = detector
+        return detector
+
+    def report_call(self, app_id, cluster, instance_name, latency,
+                    success=True):
+        """Reports the result of a call to an instance.
+
+        Example::
+
+            started_at = time.time()
+            try:
+                call(instance)
+            except Exception:
+                success = False
+            else:
+                success = True
+            finally:
+                huskar.service_consumer.report_call(
+                    'arch.test', 'alpha-stable', instance_name,
+                    time.time() - started_at, success)
+
+        :param instance_name: The key of instance in Huskar.
+        :param latency: The latency of call in seconds.
+        :param success: Optional. ``False`` if the call failed.
+
+        The hook functions are called in background once an instance is
+        ejected or restored.
+        """
+        detector = self.outlier_detectors.get((app_id, cluster))
+        if detector is None:
+            return
+        if detector.report(instance_name, latency, success):
+            gevent.spawn(
+                self.notify_listeners_of_node_changes, app_id, cluster)
+
     def register_hook_function(self, app_id, cluster, hook_function,
-                               trigger=True):
+                               trigger=True, index_by=None):
         if trigger:
-            self.add_service(app_id, cluster, timeout=3.0)
+            self.add_service(app_id, cluster, timeout=3.0, index_by=index_by)
         else:
-            self.add_service(app_id, cluster)
+            self.add_service(app_id, cluster, index_by=index_by)
 
         self.add_listener((app_id, cluster), hook_function)
         if trigger is True:
             self.notify_listeners_of_node_changes(app_id, cluster)
 
+    def register_locality_hook(self, app_id, cluster, hook_function, zone,
+                               trigger=True, **options):
+        """Registers a hook function which receives the instances in the
+        same zone only, unless the local capacity is too small.
+
+        Example::
+
+            huskar.service_consumer.register_locality_hook(
+                'arch.test', 'alpha-stable', update_pool, zone='alta1',
+                min_local_ratio=0.2)
+
+        :param zone: The zone of current process.
+        :param options: Optional. The arguments of
+            :class:`~huskar_sdk_v2.utils.locality.LocalitySelector`.
+        :returns: The :class:`~huskar_sdk_v2.utils.locality.LocalitySelector`
+            whose ``instances`` is the latest selection.
+        """
+        options.setdefault('min_server_num', self.min_server_num)
+        selector = LocalitySelector(zone, **options)
+
+        def wrapped_function(instances):
+            hook_function(selector.update(instances))
+        self.register_hook_function(
+            app_id, cluster, wrapped_function, trigger=trigger)
+        return selector
+
     def preprocess_service_mappings(self, mappings):
         return self.client.batch_add_watch(mappings=mappings, timeout=3.0)
 
     def set_min_server_num(self, min_server_num):
-        pass
+        self.min_server_num = min_server_num
 
     def unwatch_service(self, app_id, cluster, timeout=None):
         return self.client.remove_watch(app_id, cluster, timeout=timeout)
@@ -6,6 +6,9 @@ import functools
 import logging
 
 from ..ioloops import IOLoop, ProcessorException
+from ...utils.sampling import (
+    SwitchSlot, is_key_sampled, sample_many)
+from ...utils.scope import make_key, request_cached, scoped_call
 from . import OverAllOverlayMixin
 
 logger = logging.getLogger(__name__)
@@ -23,6 +26,7 @@ class Switch(OverAllOverlayMixin):
         super(Switch, self).__init__(app_id, cluster)
         self.rand = random.Random(time.time())
         self.default_state = True
+        self.slots = {}
         self.client.add_value_processor(self.value_processor)
 
     @property
@@ -37,26 +41,92 @@ class Switch(OverAllOverlayMixin):
         except Exception:
             raise ProcessorException
 
+    def handle_changes(self, watch_event):
+        super(Switch, self).handle_changes(watch_event)
+        slot = self.slots.get(watch_event.key)
+        if slot is not None:
+            slot.invalidate()
+
     def set_default_state(self, state):
         self.default_state = state
+        for slot in list(self.slots.values()):
+            slot.invalidate()
 
-    def is_switched_on(self, name, default=None):
-        value = self.get(name)
+    @request_cached
+    def is_switched_on(self, name, default=None, key=None):
+        """Checks the switch is on or not, by its pass rate.
+
+        :param name: The name of switch.
+        :param default: Optional. This will be returned if the switch is not
+            found. Default: the value of :meth:`set_default_state`.
+        :param key: Optional. The sticky key (e.g. user id) of decision. The
+            same key always gets the same decision in all processes if it is
+            provided, instead of a random one.
+        :returns: ``True`` or ``False``, it is memoized in the current
+            :func:`~huskar_sdk_v2.utils.scope.request_scope`.
+        """
+        return self._decide(name, self.get(name), default, key)
+
+    def _decide(self, name, value, default=None, key=None):
         if isinstance(value, (int, float)):
+            if key is not None:
+                return is_key_sampled(name, key, value)
             return self.rand.randint(1, 10000) / 100.0 <= value
         return default if default is not None else self.default_state
 
+    def get_many(self, names, defaults=None):
+        """Checks many switches at once, the readiness is checked only once.
+
+        :param names: The names of switches.
+        :param defaults: Optional. A dict of the default states for names,
+            see :meth:`is_switched_on`.
+        :returns: A dict of name to ``True`` or ``False``. Use
+            :meth:`snapshot` to get the pass rates.
+        """
+        defaults = defaults or {}
+        rates = super(Switch, self).get_many(names)
+        return dict((name, self._decide(name, rates[name], defaults.get(name)))
+                    for name in rates)
+
+    def is_switched_on_many(self, name, n_or_keys, default=None):
+        """Checks the switch for a batch of calls at once, the pass rate is
+        resolved only once.
+
+        :param name: The name of switch.
+        :param n_or_keys: The number of random decisions, or an iterable of
+            sticky keys as the ``key`` of :meth:`is_switched_on`.
+        :param default: Optional. The state of all items if the switch is not
+            found. Default: the value of :meth:`set_default_state`.
+        :returns: A ``numpy.ndarray`` of ``bool`` if NumPy is installed,
+            otherwise an ``array.array('B')`` of ``0`` and ``1``.
+        """
+        value = self.get(name)
+        if not isinstance(value, (int, float)):
+            state = default if default is not None else self.default_state
+            value = 100 if state else 0
+        return sample_many(name, n_or_keys, value, self.rand)
+
+    def _resolve_pass_percent(self, name):
+        value = self.get(name)
+        if isinstance(value, (int, float)):
+            return value
+        return 100 if self.default_state else 0
+
     def bind(self, name, default=None):
         def wrapper(func):
             switch_name = func.func_name if name is None else name
+            slot = self.slots.get(switch_name)
+            if slot is None:
+                slot = self.slots[switch_name] = SwitchSlot(
+                    switch_name, self._resolve_pass_percent, self.rand)
+            logger.debug('Switch %s is bound to %r, alternative staff is %r.',
+                         switch_name, func, default)
+
+            scope_key = make_key(self, 'is_switched_on', (switch_name,))
 
             @functools.wraps(func)
             def wrapper2(*args, **kwds):
-                is_switched_on = self.is_switched_on(switch_name)
-                logger.debug(
-                    'Switch %s => %r on calling %r, alternative staff is %r.',
-                    switch_name, is_switched_on, func, default)
-                if is_switched_on:
+                if scoped_call(scope_key, slot.is_on):
                     return func(*args, **kwds)
                 elif callable(default):
                     return default()
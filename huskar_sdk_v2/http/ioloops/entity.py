@@ -139,7 +139,10 @@ class Component(HookMixIn):
             self.fail_mode = False
         return self.fail_mode
 
-    def get(self, app_id, cluster, key, nowait=False, raises=None):
+    def ensure_ready(self, nowait=False, raises=None):
+        """Waits for the connection to huskar, or enters the fail mode if
+        it is failed. The values are ready to read after calling it.
+        """
         if not nowait and not self.fail_mode and self.client.wait() is False:
             if not self.is_data_loaded() and raises:
                 raise RuntimeError("Startup failed when waiting for huskar")
@@ -150,6 +153,9 @@ class Component(HookMixIn):
                 raise RuntimeError("Startup failed when "
                                    "waiting for huskar connection")
 
+    def get(self, app_id, cluster, key, nowait=False, raises=None):
+        self.ensure_ready(nowait=nowait, raises=raises)
+
         self.__prepare_cluster_map(app_id, cluster)
         if key in self.values[app_id][cluster]:
             return self.values[app_id][cluster][key]
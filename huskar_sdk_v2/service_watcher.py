@@ -22,14 +22,30 @@ def launch_master_controller(
         huskar_options, ip, master_pid, instances=None,
         unregister_on_exit=False, service_checker=None, boot_wait_time=0,
         use_http=False):
-    import gevent
     from .utils import setproctitle
 
     # Init Loggers
     init_loggers()
 
+    if use_http:
+        from .http.service_registry import ServiceRegistry
+        import gevent
+        import gevent.event
+        huskar = None
+        registry = ServiceRegistry(**huskar_options)
+        sleep, event_object, spawn = (
+            gevent.sleep, gevent.event.Event, gevent.spawn)
+    else:
+        from .bootstrap import BootstrapHuskar
+        huskar = BootstrapHuskar(**huskar_options)
+        registry = huskar.service_registry
+        # works with the handler of client, e.g. the threading one
+        sleep, event_object, spawn = (
+            huskar.client.sleep, huskar.client.event_object,
+            huskar.client.spawn)
+
     # Wait 5 seconds for parent to fully boot.
-    gevent.sleep(boot_wait_time)
+    sleep(boot_wait_time)
 
     # Set process name
     name = "{}@{}".format(huskar_options['service'], huskar_options['cluster'])
@@ -39,15 +55,6 @@ def launch_master_controller(
     instances = instances or []
     instance_ids = []
 
-    if use_http:
-        from .http.service_registry import ServiceRegistry
-        huskar = None
-        registry = ServiceRegistry(**huskar_options)
-    else:
-        from .bootstrap import BootstrapHuskar
-        huskar = BootstrapHuskar(**huskar_options)
-        registry = huskar.service_registry
-
     for ins in instances:
         if service_checker is not None:
             try:
@@ -67,8 +74,7 @@ def launch_master_controller(
             logger.info("Service node %r registered to huskar", ins)
             instance_ids.append(instance_id)
 
-    import gevent.event
-    quiting_signal = gevent.event.Event()
+    quiting_signal = event_object()
 
     def exit(sig, frame):
         quiting_signal.set()
@@ -79,9 +85,9 @@ def launch_master_controller(
     while True:
         if os.getppid() != master_pid or quiting_signal.is_set():
             break
-        gevent.sleep(1)
+        sleep(1)
 
-    cleaned_up = gevent.event.Event()
+    cleaned_up = event_object()
 
     def on_quit():
         if unregister_on_exit:
@@ -104,7 +110,7 @@ def launch_master_controller(
                 logger.warn("Error to stop Huskar.", exc_info=True)
         cleaned_up.set()
 
-    gevent.spawn(on_quit)
+    spawn(on_quit)
     cleaned_up.wait(3)
     return sys.exit()
 
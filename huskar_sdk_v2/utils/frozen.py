@@ -0,0 +1,32 @@
+from __future__ import absolute_import
+
+from huskar_sdk_v2.six import iteritems
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError('%r object is immutable' % type(self).__name__)
+
+
+class FrozenDict(dict):
+    """A read-only dict. It could be used as a dict everywhere, e.g. dumped
+    as JSON, but raises :exc:`TypeError` on modification. Use ``dict(d)`` or
+    ``d.copy()`` to get a mutable copy.
+    """
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = __ior__ = _immutable
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+def freeze(value):
+    """Convert a decoded JSON value into read-only recursively. The dicts
+    become :class:`FrozenDict` and the lists become tuples.
+    """
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in iteritems(value))
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
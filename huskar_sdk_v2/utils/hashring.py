@@ -0,0 +1,177 @@
+from __future__ import absolute_import
+
+import math
+import heapq
+import struct
+import hashlib
+import threading
+from array import array
+from bisect import bisect
+
+from huskar_sdk_v2.six import iteritems
+from .format import char_encoding
+
+
+def ketama_hash(key):
+    """Hash ``key`` into a 32-bit unsigned integer, compatible with the
+    ``libketama`` implementation.
+    """
+    digest = hashlib.md5(char_encoding(key)).digest()
+    return struct.unpack_from('<I', digest)[0]
+
+
+class HashRing(object):
+    """A ketama-compatible consistent hash ring.
+
+    The ring is stored as a compact sorted ``array`` of points with a parallel
+    list of node names, lookups use :func:`bisect.bisect` over it. Changes are
+    applied incrementally: only the added nodes are hashed, and the new ring is
+    merged from the old one and swapped in atomically, so lookups never block
+    on updates.
+
+    The instance map passed to the hook functions of service components could
+    be fed to :meth:`update` directly::
+
+        ring = HashRing()
+        huskar.service_consumer.register_hook_function(
+            'arch.cache', 'alpha_stable', ring.update)
+        instance_name = ring.get_node('user:42')
+
+    :arg int vnodes: the number of virtual nodes for each node of weight 1.
+    :arg float load_factor: enables the bounded-load variant if provided,
+                            each node would never serve more than
+                            ``ceil(load_factor * average_load)`` keys which
+                            are acquired by :meth:`acquire`. It should be
+                            greater than ``1``.
+    """
+    def __init__(self, vnodes=160, load_factor=None):
+        if load_factor is not None and load_factor <= 1:
+            raise ValueError('load_factor should be greater than 1')
+        self.vnodes = vnodes
+        self.load_factor = load_factor
+        self.weights = {}
+        self.loads = {}
+        self.total_load = 0
+        self._ring = (array('L'), [])
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.weights)
+
+    def __contains__(self, node):
+        return node in self.weights
+
+    @property
+    def nodes(self):
+        return list(self.weights)
+
+    def _hash_node(self, node, weight):
+        num_points = self.vnodes * weight
+        for i in range(int(math.ceil(num_points / 4.0))):
+            digest = hashlib.md5(char_encoding(
+                '{}-{}'.format(node, i))).digest()
+            for point in struct.unpack('<4I', digest)[:num_points - i * 4]:
+                yield point, node
+
+    def _apply(self, added, removed):
+        with self._lock:
+            points, nodes = self._ring
+            removed = frozenset(removed)
+            kept = ((p, n) for p, n in zip(points, nodes) if n not in removed)
+            new = sorted(pair for node, weight in iteritems(added)
+                         for pair in self._hash_node(node, weight))
+            merged = list(heapq.merge(kept, new))
+            self._ring = (array('L', [p for p, _ in merged]),
+                          [n for _, n in merged])
+            for node in removed:
+                self.weights.pop(node, None)
+                self.total_load -= self.loads.pop(node, 0)
+            for node, weight in iteritems(added):
+                self.weights[node] = weight
+                self.loads.setdefault(node, 0)
+
+    def add(self, node, weight=1):
+        """Add a node, or change its weight if it exists already."""
+        if self.weights.get(node) == weight:
+            return
+        removed = [node] if node in self.weights else []
+        self._apply({node: weight}, removed)
+
+    def remove(self, node):
+        if node in self.weights:
+            self._apply({}, [node])
+
+    def update(self, instances):
+        """Synchronize the ring with a map of service instances.
+
+        Only the difference to the current nodes is applied. Instances whose
+        ``state`` is ``down`` are excluded, the ``weight`` in ``meta`` is
+        respected if it could be converted to a positive integer, e.g.
+        ``"3"`` from the JSON meta.
+
+        :arg instances: a mapping of instance name to instance dict, e.g. the
+                        argument of hook functions of service components.
+        """
+        target = {}
+        for name, instance in iteritems(instances):
+            if not isinstance(instance, dict):
+                continue
+            if instance.get('state', 'up') == 'down':
+                continue
+            try:
+                weight = int((instance.get('meta') or {}).get('weight', 1))
+            except (TypeError, ValueError):
+                weight = 1
+            if weight < 1:
+                weight = 1
+            target[name] = weight
+
+        removed = [n for n, w in iteritems(self.weights)
+                   if target.get(n) != w]
+        added = {n: w for n, w in iteritems(target)
+                 if self.weights.get(n) != w}
+        if added or removed:
+            self._apply(added, removed)
+
+    def _capacity(self):
+        return math.ceil(
+            self.load_factor * (self.total_load + 1) / len(self.weights))
+
+    def get_node(self, key):
+        """Return the node which ``key`` belongs to, ``None`` if the ring is
+        empty.
+
+        The saturated nodes are skipped if ``load_factor`` is provided.
+        """
+        points, nodes = self._ring
+        if not nodes:
+            return None
+        index = bisect(points, ketama_hash(key))
+        if self.load_factor is None:
+            return nodes[index % len(nodes)]
+
+        capacity = self._capacity()
+        loads = self.loads
+        for i in range(index, index + len(nodes)):
+            node = nodes[i % len(nodes)]
+            if loads.get(node, 0) < capacity:
+                return node
+        return nodes[index % len(nodes)]
+
+    def acquire(self, key):
+        """Like :meth:`get_node` but count a load for the chosen node, which
+        should be released by :meth:`release` later.
+        """
+        node = self.get_node(key)
+        if node is not None:
+            with self._lock:
+                if node in self.loads:
+                    self.loads[node] += 1
+                    self.total_load += 1
+        return node
+
+    def release(self, node):
+        with self._lock:
+            if self.loads.get(node, 0) > 0:
+                self.loads[node] -= 1
+                self.total_load -= 1
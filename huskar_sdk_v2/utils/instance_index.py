@@ -0,0 +1,151 @@
+from __future__ import absolute_import
+
+import threading
+
+from huskar_sdk_v2.six import iteritems
+
+
+MISSING = object()
+_ABSENT = object()
+
+
+def resolve_field(instance, field):
+    """Resolve a dotted ``field`` such as ``meta.zone`` or ``port.main`` in
+    an instance dict. Return :data:`MISSING` if it could not be found.
+    """
+    value = instance
+    for part in field.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+class InstanceIndex(object):
+    """Secondary indexes over a map of service instances.
+
+    Each indexed field maps a value to the subset of instances which have
+    the value, the subset of instances which have the field at all, and the
+    subset of instances which do not have it.
+    The subsets are copied on write, so the dicts returned by :meth:`find`
+    are never mutated and could be iterated without any lock. Each subset
+    is copied once per update, and the copies are swapped in together once
+    the update is done.
+
+    :arg fields: the dotted fields to be indexed, e.g.
+                 ``('state', 'meta.zone', 'port.thrift')``.
+    """
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.instances = {}
+        self._values = dict((field, {}) for field in self.fields)
+        self._present = {}
+        self._absent = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.instances)
+
+    def _stage(self, staged, buckets, key):
+        token = (id(buckets), key)
+        if token not in staged:
+            staged[token] = (buckets, key, dict(buckets.get(key, ())))
+        return staged[token][2]
+
+    def _publish(self, staged):
+        for buckets, key, bucket in staged.values():
+            if bucket:
+                buckets[key] = bucket
+            else:
+                buckets.pop(key, None)
+
+    def _discard(self, staged, name):
+        self.instances.pop(name, None)
+        for field, value in self._entries.pop(name, ()):
+            if value is _ABSENT:
+                self._stage(staged, self._absent, field).pop(name, None)
+                continue
+            self._stage(staged, self._present, field).pop(name, None)
+            if value is not MISSING:
+                self._stage(staged, self._values[field], value).pop(name, None)
+
+    def _put(self, staged, name, instance):
+        self._discard(staged, name)
+        entries = []
+        for field in self.fields:
+            value = resolve_field(instance, field)
+            if value is MISSING:
+                self._stage(staged, self._absent, field)[name] = instance
+                entries.append((field, _ABSENT))
+                continue
+            self._stage(staged, self._present, field)[name] = instance
+            try:
+                bucket = self._stage(staged, self._values[field], value)
+            except TypeError:  # unhashable value
+                value = MISSING
+            else:
+                bucket[name] = instance
+            entries.append((field, value))
+        self.instances[name] = instance
+        self._entries[name] = entries
+
+    def put(self, name, instance):
+        """Index or re-index an instance."""
+        with self._lock:
+            staged = {}
+            self._put(staged, name, instance)
+            self._publish(staged)
+
+    def discard(self, name):
+        """Remove an instance from indexes, if it exists."""
+        with self._lock:
+            staged = {}
+            self._discard(staged, name)
+            self._publish(staged)
+
+    def sync(self, instances):
+        """Synchronize indexes with a whole instance map, only the changed
+        instances are re-indexed.
+        """
+        with self._lock:
+            staged = {}
+            for name in set(self.instances).difference(instances):
+                self._discard(staged, name)
+            for name, instance in iteritems(instances):
+                if self.instances.get(name, MISSING) != instance:
+                    self._put(staged, name, instance)
+            self._publish(staged)
+
+    def partition(self, field):
+        """Get the instances grouped by the value of ``field``.
+
+        :returns: a dict of value to the dict returned by :meth:`find`.
+        :raises ValueError: if the ``field`` is not indexed.
+        """
+        if field not in self._values:
+            raise ValueError('field %r is not indexed' % field)
+        return dict(self._values[field])
+
+    def find(self, field, value=MISSING):
+        """Get the instances whose ``field`` equals to ``value``, or have the
+        ``field`` at all if the ``value`` is omitted.
+
+        :returns: a dict of instance name to instance.
+        :raises ValueError: if the ``field`` is not indexed.
+        """
+        if field not in self._values:
+            raise ValueError('field %r is not indexed' % field)
+        if value is MISSING:
+            return self._present.get(field, {})
+        return self._values[field].get(value, {})
+
+    def find_absent(self, field):
+        """Get the instances which do not have the ``field``.
+
+        :returns: a dict of instance name to instance.
+        :raises ValueError: if the ``field`` is not indexed.
+        """
+        if field not in self._values:
+            raise ValueError('field %r is not indexed' % field)
+        return self._absent.get(field, {})
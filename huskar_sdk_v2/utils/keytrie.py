@@ -0,0 +1,126 @@
+from __future__ import absolute_import
+
+import re
+import fnmatch
+import threading
+
+
+WILDCARD_RE = re.compile(r'[*?\[]')
+
+
+class _Node(object):
+    __slots__ = ('children', 'prefixes', 'patterns')
+
+    def __init__(self):
+        self.children = {}
+        #: The items subscribed to the prefix which ends at this node.
+        self.prefixes = frozenset()
+        #: The (pattern, match function, item) tuples whose literal prefix
+        #: ends at this node.
+        self.patterns = frozenset()
+
+    def is_empty(self):
+        return not (self.children or self.prefixes or self.patterns)
+
+
+class KeyTrie(object):
+    """A character trie of key prefixes and glob patterns, to find the items
+    subscribed to a key without scanning all subscriptions.
+
+    A prefix matches the keys which start with it. A glob pattern, such as
+    ``feature.payments.*``, is stored at the node of its literal part before
+    the first wildcard, so only the patterns along the path of key are
+    tested. The matching is case-sensitive, see :func:`fnmatch.fnmatchcase`.
+
+    The subscriptions of nodes are copied on write, so :meth:`match` needs no
+    lock.
+    """
+    def __init__(self):
+        self.root = _Node()
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return not self.root.is_empty()
+
+    __nonzero__ = __bool__
+
+    def _walk(self, literal, create=False):
+        path = [self.root]
+        node = self.root
+        for char in literal:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[char] = _Node()
+            path.append(child)
+            node = child
+        return path
+
+    def _prune(self, literal, path):
+        for char, node, parent in zip(
+                reversed(literal), reversed(path[1:]), reversed(path[:-1])):
+            if not node.is_empty():
+                break
+            del parent.children[char]
+
+    def add_prefix(self, prefix, item):
+        """Subscribe ``item`` to the keys starting with ``prefix``."""
+        with self._lock:
+            node = self._walk(prefix, create=True)[-1]
+            node.prefixes = node.prefixes.union([item])
+
+    def remove_prefix(self, prefix, item):
+        """Unsubscribe ``item`` from ``prefix``, if it is subscribed."""
+        with self._lock:
+            path = self._walk(prefix)
+            if path is not None:
+                path[-1].prefixes = path[-1].prefixes.difference([item])
+                self._prune(prefix, path)
+
+    @staticmethod
+    def _split_pattern(pattern):
+        match = WILDCARD_RE.search(pattern)
+        literal = pattern[:match.start()] if match else pattern
+        regex = re.compile(fnmatch.translate(pattern))
+        return literal, (pattern, regex.match)
+
+    def add_pattern(self, pattern, item):
+        """Subscribe ``item`` to the keys matching a glob ``pattern``."""
+        literal, (pattern, match) = self._split_pattern(pattern)
+        with self._lock:
+            node = self._walk(literal, create=True)[-1]
+            node.patterns = node.patterns.union([(pattern, match, item)])
+
+    def remove_pattern(self, pattern, item):
+        """Unsubscribe ``item`` from ``pattern``, if it is subscribed."""
+        literal, _ = self._split_pattern(pattern)
+        with self._lock:
+            path = self._walk(literal)
+            if path is None:
+                return
+            node = path[-1]
+            node.patterns = frozenset(
+                entry for entry in node.patterns
+                if entry[0] != pattern or entry[2] != item)
+            self._prune(literal, path)
+
+    def match(self, key):
+        """Find the items subscribed to ``key``.
+
+        :returns: a set of items.
+        """
+        items = set()
+        node = self.root
+        index = 0
+        while node is not None:
+            if node.prefixes:
+                items.update(node.prefixes)
+            for _, match, item in node.patterns:
+                if match(key):
+                    items.add(item)
+            if index == len(key):
+                break
+            node = node.children.get(key[index])
+            index += 1
+        return items
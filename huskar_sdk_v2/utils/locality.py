@@ -0,0 +1,79 @@
+from __future__ import absolute_import
+
+import math
+
+from huskar_sdk_v2.six import iteritems
+from .instance_index import InstanceIndex
+
+
+class LocalitySelector(object):
+    """Prefers the service instances in the same zone.
+
+    The instances are partitioned by zone incrementally as the instance list
+    changes, and the selection is precomputed in :meth:`update`. The local
+    zone is selected alone if it has enough capacity, otherwise the other
+    zones spill over in the order of ``fallback_zones`` and then by size,
+    until the capacity requirement is satisfied. Instances whose ``state`` is
+    ``down`` are never selected.
+
+    :arg str zone: the zone of current process.
+    :arg str zone_field: the dotted field of instance which records the zone.
+    :arg int min_server_num: the minimum number of selected instances.
+    :arg float min_local_ratio: the minimum ratio of selected instances to all
+                                available instances, e.g. ``0.2`` spills over
+                                if the local zone has less than 20% of
+                                instances.
+    :arg fallback_zones: the preferred zones to spill over in order.
+    """
+    def __init__(self, zone, zone_field='meta.zone', min_server_num=1,
+                 min_local_ratio=0.0, fallback_zones=()):
+        self.zone = zone
+        self.zone_field = zone_field
+        self.min_server_num = min_server_num
+        self.min_local_ratio = min_local_ratio
+        self.fallback_zones = tuple(fallback_zones)
+        self.index = InstanceIndex((zone_field, 'state'))
+        #: The selected instances.
+        self.instances = {}
+        #: ``True`` if instances of other zones are selected.
+        self.spilled_over = False
+
+    def _available(self, instances):
+        return dict((name, instance) for name, instance in iteritems(instances)
+                    if instance.get('state', 'up') != 'down')
+
+    def _required_num(self, total):
+        return max(self.min_server_num,
+                   int(math.ceil(self.min_local_ratio * total)))
+
+    def update(self, instances):
+        """Synchronize with the map of all instances.
+
+        :returns: the selected instances.
+        """
+        self.index.sync(instances)
+        available = len(self.index) - len(self.index.find('state', 'down'))
+        required = min(self._required_num(available), available)
+
+        selected = self._available(self.index.find(self.zone_field, self.zone))
+        spilled_over = False
+        if len(selected) < required:
+            spilled_over = True
+            zones = self.index.partition(self.zone_field)
+            zones.pop(self.zone, None)
+            zones[None] = self.index.find_absent(self.zone_field)
+            for zone in self._spill_order(zones):
+                bucket = self._available(zones[zone])
+                selected.update(bucket)
+                if len(selected) >= required:
+                    break
+
+        self.instances = selected
+        self.spilled_over = spilled_over
+        return selected
+
+    def _spill_order(self, zones):
+        ordered = [z for z in self.fallback_zones if z in zones]
+        rest = sorted((z for z in zones if z not in self.fallback_zones),
+                      key=lambda z: (z is None, -len(zones[z]), str(z)))
+        return ordered + rest
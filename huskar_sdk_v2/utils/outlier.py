@@ -0,0 +1,168 @@
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+from array import array
+
+from huskar_sdk_v2.six import iteritems
+
+
+logger = logging.getLogger(__name__)
+
+
+class CallStats(object):
+    """Rolling statistics of the latest calls in fixed-size ring buffers."""
+
+    __slots__ = ('size', 'latencies', 'failures', 'cursor', 'count',
+                 'latency_sum', 'failure_sum')
+
+    def __init__(self, size):
+        self.size = size
+        self.latencies = array('d', [0.0]) * size
+        self.failures = array('B', [0]) * size
+        self.reset()
+
+    def reset(self):
+        self.cursor = 0
+        self.count = 0
+        self.latency_sum = 0.0
+        self.failure_sum = 0
+
+    def add(self, latency, success):
+        cursor = self.cursor
+        if self.count == self.size:
+            self.latency_sum -= self.latencies[cursor]
+            self.failure_sum -= self.failures[cursor]
+        else:
+            self.count += 1
+        failure = 0 if success else 1
+        self.latencies[cursor] = latency
+        self.failures[cursor] = failure
+        self.latency_sum += latency
+        self.failure_sum += failure
+        self.cursor = (cursor + 1) % self.size
+
+    @property
+    def mean_latency(self):
+        return self.latency_sum / self.count if self.count else 0.0
+
+    @property
+    def failure_rate(self):
+        return float(self.failure_sum) / self.count if self.count else 0.0
+
+
+class OutlierDetector(object):
+    """Ejects the outlier instances temporarily by the call results reported
+    by callers.
+
+    An instance is ejected once its failure rate reaches
+    ``failure_rate_threshold``, or its mean latency exceeds
+    ``latency_factor`` times the median of all instances, which is evaluated
+    every ``interval`` seconds. The statistics of an instance only count
+    after it served ``min_requests`` calls, and never more than
+    ``max_ejection_ratio`` of instances are ejected at the same time.
+
+    :arg int window: the number of latest calls to keep for each instance.
+    :arg float ejection_time: the seconds of an ejection.
+    """
+    def __init__(self, window=100, min_requests=20,
+                 failure_rate_threshold=0.5, latency_factor=3.0,
+                 interval=10.0, ejection_time=30.0, max_ejection_ratio=0.5,
+                 timer=time.time):
+        self.window = window
+        self.min_requests = min_requests
+        self.failure_rate_threshold = failure_rate_threshold
+        self.latency_factor = latency_factor
+        self.interval = interval
+        self.ejection_time = ejection_time
+        self.max_ejection_ratio = max_ejection_ratio
+        self.timer = timer
+
+        self.stats = {}
+        #: The ejected instances, mapping name to the time to be readmitted.
+        self.ejected = {}
+        self.next_evaluation = timer() + interval
+        self.next_readmission = None
+        self._lock = threading.Lock()
+
+    def _eject(self, name, now):
+        if name in self.ejected:
+            return False
+        total = len(self.stats)
+        if len(self.ejected) + 1 > self.max_ejection_ratio * total:
+            return False
+        until = now + self.ejection_time
+        self.ejected[name] = until
+        if self.next_readmission is None or until < self.next_readmission:
+            self.next_readmission = until
+        self.stats[name].reset()
+        logger.info('Instance %s is ejected until %s', name, until)
+        return True
+
+    def _readmit(self, now):
+        if self.next_readmission is None or now < self.next_readmission:
+            return False
+        for name, until in list(iteritems(self.ejected)):
+            if until <= now:
+                del self.ejected[name]
+                logger.info('Instance %s is readmitted', name)
+        self.next_readmission = min(self.ejected.values()) \
+            if self.ejected else None
+        return True
+
+    def _evaluate(self, now):
+        self.next_evaluation = now + self.interval
+        means = sorted(
+            (stats.mean_latency, name) for name, stats in iteritems(self.stats)
+            if stats.count >= self.min_requests and name not in self.ejected)
+        if len(means) < 3:
+            return False
+        median = means[len(means) // 2][0]
+        changed = False
+        for mean, name in reversed(means):
+            if mean <= median * self.latency_factor:
+                break
+            changed = self._eject(name, now) or changed
+        return changed
+
+    def report(self, name, latency, success=True):
+        """Report the result of a call.
+
+        :arg str name: the instance name.
+        :arg float latency: the latency of call in seconds.
+        :arg bool success: ``False`` if the call failed.
+        :returns: ``True`` if the ejected instances are changed.
+        """
+        now = self.timer()
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = CallStats(self.window)
+            stats.add(latency, success)
+            changed = self._readmit(now)
+            if (name not in self.ejected and
+                    stats.count >= self.min_requests and
+                    stats.failure_rate >= self.failure_rate_threshold):
+                changed = self._eject(name, now) or changed
+            if now >= self.next_evaluation:
+                changed = self._evaluate(now) or changed
+        return changed
+
+    def filter(self, instances):
+        """Forget the removed instances and exclude the ejected ones.
+
+        :arg instances: a mapping of instance name to instance.
+        :returns: a new dict without ejected instances.
+        """
+        with self._lock:
+            self._readmit(self.timer())
+            for name in set(self.stats).difference(instances):
+                del self.stats[name]
+                self.ejected.pop(name, None)
+            for name in instances:
+                if name not in self.stats:
+                    self.stats[name] = CallStats(self.window)
+            ejected = self.ejected
+            return dict((name, instance) for name, instance
+                        in iteritems(instances) if name not in ejected)
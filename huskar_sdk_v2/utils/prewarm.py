@@ -0,0 +1,149 @@
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from huskar_sdk_v2.six import iteritems
+
+
+logger = logging.getLogger(__name__)
+
+
+def _address(instance):
+    port = instance.get('port')
+    if isinstance(port, dict):
+        port = tuple(sorted(iteritems(port)))
+    return instance.get('ip'), port
+
+
+class Prewarmer(object):
+    """Warms connections up for newly added instances before they are handed
+    to the hook functions.
+
+    The ``connector`` is called in background with the instance name and the
+    instance dict, at most ``concurrency`` at the same time. The instance is
+    marked ready if it returns a truthy value, or retried after
+    ``retry_delay`` seconds if it fails, the delay is doubled on each failure
+    up to ``max_retry_delay``. An instance would be warmed again if its
+    address changes.
+
+    All instances are handed over while fewer than ``min_ready`` of them are
+    ready, so the hook functions never starve on the first registration.
+
+    The state is guarded by a lock, so it works with the threading handler
+    of bootstrap client too.
+
+    :arg connector: a callable which establishes a warm connection.
+    :arg int concurrency: the maximum number of concurrent connectors.
+    :arg on_ready: a callable which is invoked after some instances become
+                   ready, it is coalesced for the instances which are ready
+                   at the same time.
+    :arg int min_ready: the minimum number of ready instances to exclude the
+                        others.
+    :arg spawn: the function to spawn background tasks, the ``gevent.spawn``
+                is used by default.
+    :arg semaphore: the factory of bounded semaphore, the
+                    ``gevent.lock.BoundedSemaphore`` is used by default.
+    :arg sleep: the function to wait before retrying, the ``gevent.sleep`` is
+                used by default.
+    """
+    def __init__(self, connector, concurrency=10, on_ready=None, spawn=None,
+                 semaphore=None, min_ready=1, retry_delay=1.0,
+                 max_retry_delay=60.0, sleep=None):
+        if spawn is None:
+            from gevent import spawn
+        if semaphore is None:
+            from gevent.lock import BoundedSemaphore as semaphore
+        if sleep is None:
+            from gevent import sleep
+        self.connector = connector
+        self.on_ready = on_ready
+        self.spawn = spawn
+        self.semaphore = semaphore(concurrency)
+        self.sleep = sleep
+        self.min_ready = min_ready
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        #: The ready instances, mapping name to the address.
+        self.ready = {}
+        self.pending = {}
+        #: The number of successive failures of pending instances.
+        self.failures = {}
+        self._notify_scheduled = False
+        self._lock = threading.Lock()
+
+    def filter(self, instances):
+        """Start warming up the new instances, and exclude them until they
+        are ready.
+
+        :arg instances: a mapping of instance name to instance.
+        :returns: a new dict of ready instances, or all instances if fewer
+                  than ``min_ready`` of them are ready.
+        """
+        result = {}
+        added = []
+        with self._lock:
+            for name in set(self.ready).difference(instances):
+                del self.ready[name]
+            for name in set(self.pending).difference(instances):
+                del self.pending[name]
+                self.failures.pop(name, None)
+
+            for name, instance in iteritems(instances):
+                address = _address(instance)
+                if self.ready.get(name) == address:
+                    result[name] = instance
+                    continue
+                self.ready.pop(name, None)
+                if self.pending.get(name) != address:
+                    self.pending[name] = address
+                    self.failures.pop(name, None)
+                    added.append((name, instance, address))
+        for name, instance, address in added:
+            self.spawn(self._warm, name, instance, address)
+        if len(result) < self.min_ready:
+            return dict(instances)
+        return result
+
+    def _warm(self, name, instance, address):
+        with self.semaphore:
+            if self.pending.get(name) != address:
+                return                      # removed or changed
+            try:
+                warmed = self.connector(name, instance)
+            except Exception:
+                logger.warning('Failed to warm up %s', name, exc_info=True)
+                warmed = False
+        with self._lock:
+            if self.pending.get(name) != address:
+                return
+            if not warmed:
+                failures = self.failures.get(name, 0) + 1
+                self.failures[name] = failures
+                delay = min(self.retry_delay * 2 ** (failures - 1),
+                            self.max_retry_delay)
+            else:
+                del self.pending[name]
+                self.failures.pop(name, None)
+                self.ready[name] = address
+                notify = (self.on_ready is not None and
+                          not self._notify_scheduled)
+                if notify:
+                    self._notify_scheduled = True
+        if not warmed:
+            self.spawn(self._retry, name, instance, address, delay)
+        elif notify:
+            self.spawn(self._notify)
+
+    def _retry(self, name, instance, address, delay):
+        self.sleep(delay)
+        if self.pending.get(name) == address:
+            self._warm(name, instance, address)
+
+    def _notify(self):
+        with self._lock:
+            self._notify_scheduled = False
+        try:
+            self.on_ready()
+        except Exception:
+            logger.exception('Failed to notify the ready instances')
@@ -0,0 +1,132 @@
+from __future__ import absolute_import
+
+import zlib
+import random
+import binascii
+import numbers
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    has_numpy = False
+else:
+    has_numpy = True
+
+from huskar_sdk_v2.six import unicode
+from .format import char_encoding
+
+
+#: The number of buckets, which is the resolution of pass rates, e.g. the
+#: ``0.01`` percent means 1 bucket of 10000.
+BUCKETS = 10000
+
+
+def key_bucket(name, key):
+    """Hash the switch ``name`` and a sticky ``key`` (e.g. user id) into a
+    bucket in ``[0, BUCKETS)``. It is stable across processes and machines.
+    """
+    if not isinstance(key, (bytes, unicode)):
+        key = unicode(key)
+    data = char_encoding(name) + b'\0' + char_encoding(key)
+    return (zlib.crc32(data) & 0xffffffff) % BUCKETS
+
+
+def is_key_sampled(name, key, pass_percent):
+    """Decide whether the ``key`` passes the switch ``name`` with the pass
+    rate ``pass_percent`` (``0-100``). The same key always gets the same
+    decision, and the keys passing a lower rate also pass any higher rate.
+    """
+    return key_bucket(name, key) < pass_percent * BUCKETS / 100.0
+
+
+def _filled(size, value):
+    if has_numpy:
+        return numpy.full(size, value, dtype=bool)
+    return array('B', [1 if value else 0]) * size
+
+
+def _random_words(rand, size):
+    # getrandbits(32 * size) is made of the same words as ``size`` calls of
+    # getrandbits(32), the first one is the lowest.
+    data = binascii.unhexlify(
+        '%0*x' % (8 * size, rand.getrandbits(32 * size)))
+    return numpy.frombuffer(data, dtype='>u4')[::-1]
+
+
+def sample_many(name, n_or_keys, pass_percent, rand=random):
+    """Decide a batch of passing with the pass rate ``pass_percent``
+    (``0-100``) at once.
+
+    The result is a ``numpy.ndarray`` of ``bool`` if NumPy is installed,
+    otherwise an ``array.array('B')`` of ``0`` and ``1``. Both of them could
+    be indexed, iterated and summed as a sequence of booleans.
+
+    :arg str name: the name of switch.
+    :arg n_or_keys: an ``int`` for the number of random decisions, or an
+                    iterable of sticky keys, see :func:`is_key_sampled`.
+    :arg float pass_percent: the pass rate.
+    :arg rand: the random generator, the random decisions are the same
+               with or without NumPy for the same state of it.
+    """
+    if isinstance(n_or_keys, numbers.Integral):
+        size, keys = n_or_keys, None
+    else:
+        keys = list(n_or_keys)
+        size = len(keys)
+    if pass_percent >= 100:
+        return _filled(size, True)
+    if pass_percent <= 0:
+        return _filled(size, False)
+
+    if keys is not None:
+        threshold = pass_percent * BUCKETS / 100.0
+        buckets = [key_bucket(name, key) for key in keys]
+        if has_numpy:
+            return numpy.array(buckets, dtype=numpy.uint32) < threshold
+        return array('B', [bucket < threshold for bucket in buckets])
+
+    threshold = pass_percent / 100.0 * (1 << 32)
+    if has_numpy:
+        if not size:
+            return _filled(0, False)
+        return _random_words(rand, size) < threshold
+    getrandbits = rand.getrandbits
+    return array('B', [getrandbits(32) < threshold for _ in range(size)])
+
+
+class SwitchSlot(object):
+    """The precompiled state of a switch for the functions bound to it.
+
+    It holds the current pass rate as a threshold of ``random()``, which is
+    updated by the change callbacks of switch, so the check on calling is
+    an attribute read and a comparison only. The ``threshold`` is ``None``
+    if the pass rate is unresolved or invalidated, the ``resolver`` is
+    called with the name of switch to resolve it lazily.
+
+    :arg str name: the name of switch.
+    :arg resolver: a callable which returns the current pass rate.
+    :arg rand: the random generator.
+    """
+    __slots__ = ('name', 'resolver', 'rand', 'threshold')
+
+    def __init__(self, name, resolver, rand=random):
+        self.name = name
+        self.resolver = resolver
+        self.rand = rand
+        self.threshold = None
+
+    def update(self, pass_percent):
+        """Set the current pass rate (``0-100``)."""
+        self.threshold = pass_percent / 100.0
+
+    def invalidate(self):
+        """Drop the current pass rate to resolve it again on next check."""
+        self.threshold = None
+
+    def is_on(self):
+        threshold = self.threshold
+        if threshold is None:
+            self.update(self.resolver(self.name))
+            threshold = self.threshold
+        return self.rand.random() < threshold
@@ -0,0 +1,137 @@
+from __future__ import absolute_import
+
+import functools
+from contextlib import contextmanager
+
+try:
+    from contextvars import ContextVar
+except ImportError:
+    has_contextvars = False
+else:
+    # The context variables are greenlet-local since greenlet 0.4.17 only
+    try:
+        import greenlet
+    except ImportError:
+        has_contextvars = True
+    else:
+        has_contextvars = hasattr(greenlet.getcurrent(), 'gr_context')
+
+
+if has_contextvars:
+    _current = ContextVar('huskar_request_scope', default=None)
+
+    def current_scope():
+        """Get the cache dict of current request scope, or ``None`` if it is
+        out of any scope.
+        """
+        return _current.get()
+
+    def _enter(cache):
+        return _current.set(cache)
+
+    def _exit(token):
+        _current.reset(token)
+else:
+    # The gevent.local is too slow to be checked on each call, the scopes are
+    # kept in a dict keyed by the current greenlet (or thread) instead.
+    try:
+        from greenlet import getcurrent as _get_ident
+    except ImportError:
+        try:
+            from threading import get_ident as _get_ident
+        except ImportError:
+            from thread import get_ident as _get_ident
+    _scopes = {}
+
+    def current_scope():
+        """Get the cache dict of current request scope, or ``None`` if it is
+        out of any scope.
+        """
+        return _scopes.get(_get_ident()) if _scopes else None
+
+    def _enter(cache):
+        ident = _get_ident()
+        _scopes[ident] = cache
+        return ident
+
+    def _exit(ident):
+        _scopes.pop(ident, None)
+
+
+@contextmanager
+def request_scope():
+    """Memoize the results of :func:`request_cached` methods, e.g.
+    ``Switch.is_switched_on`` and ``Config.get``, in a request.
+
+    A switch gives the same decision and a config gives the same value
+    within the scope, even if they changed in the meantime::
+
+        with request_scope():
+            handle_request()
+
+    The nested scopes share the cache of the outermost one.
+    """
+    cache = current_scope()
+    if cache is not None:
+        yield cache
+        return
+    cache = {}
+    token = _enter(cache)
+    try:
+        yield cache
+    finally:
+        _exit(token)
+
+
+def make_key(obj, name, args=(), kwargs=None):
+    """Make the key of a method call in the request scope."""
+    return (obj, name, args,
+            tuple(sorted(kwargs.items())) if kwargs else ())
+
+
+def scoped_call(key, func, *args, **kwargs):
+    """Call ``func`` or get its result of ``key`` in current request scope.
+    It is equivalent to call ``func`` out of any scope.
+    """
+    cache = current_scope()
+    if cache is None:
+        return func(*args, **kwargs)
+    try:
+        return cache[key]
+    except KeyError:
+        result = cache[key] = func(*args, **kwargs)
+        return result
+    except TypeError:  # unhashable arguments
+        return func(*args, **kwargs)
+
+
+def request_cached(func):
+    """A decorator for component methods to memoize their results in the
+    current request scope. See :func:`request_scope`.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if current_scope() is None:
+            return func(self, *args, **kwargs)
+        key = make_key(self, name, args, kwargs)
+        return scoped_call(key, func, self, *args, **kwargs)
+    return wrapper
+
+
+class RequestScopeMiddleware(object):
+    """The WSGI middleware which wraps each request in a
+    :func:`request_scope`.
+
+    The scope covers the calling of application only, the switches and
+    configs used in a lazy response iterable are not memoized.
+
+    :arg app: the WSGI application.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        with request_scope():
+            return self.app(environ, start_response)
@@ -0,0 +1,119 @@
+from __future__ import absolute_import
+
+import logging
+
+from huskar_sdk_v2.six import unicode
+
+
+logger = logging.getLogger(__name__)
+
+TRUE_STRINGS = frozenset(['1', 'true', 'yes', 'on', 'y', 't'])
+FALSE_STRINGS = frozenset(['0', 'false', 'no', 'off', 'n', 'f', ''])
+
+
+def parse_bool(value):
+    """Parse a boolean from JSON values such as ``true``, ``1`` and
+    ``"off"``.
+
+    :raises ValueError: if the value could not be recognized.
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, (bytes, unicode)):
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        value = value.strip().lower()
+        if value in TRUE_STRINGS:
+            return True
+        if value in FALSE_STRINGS:
+            return False
+    raise ValueError('%r is not a boolean' % (value,))
+
+
+class TypedValue(object):
+    """A config value which is coerced and validated once it changes.
+
+    The ``coerce`` is a callable which returns the typed value or raises an
+    exception for invalid values, e.g. ``int`` or ``float``. The ``bool`` is
+    replaced by :func:`parse_bool`, because ``bool("false")`` is ``True``. A
+    schema object which has a ``validate`` method, e.g. ``schema.Schema``, is
+    also accepted.
+
+    An invalid update is rejected with a warning logging, and the last good
+    value is kept. The ``default`` is used if the config is absent or has no
+    good value yet.
+
+    :arg str name: the name of config.
+    :arg coerce: the callable or schema object.
+    :arg default: the default value.
+    """
+    def __init__(self, name, coerce, default=None):
+        self.name = name
+        if coerce is bool:
+            coerce = parse_bool
+        elif callable(getattr(coerce, 'validate', None)):
+            coerce = coerce.validate
+        self.coerce = coerce
+        self.default = default
+        self.value = default
+
+    def update(self, raw_value):
+        """Coerce a new raw value, it is used as the watching callback.
+
+        :returns: ``False`` if the value is rejected.
+        """
+        if raw_value is None:
+            self.value = self.default
+            return True
+        try:
+            self.value = self.coerce(raw_value)
+        except Exception as e:
+            logger.warning('Rejected invalid value of %s: %r (%s)',
+                           self.name, raw_value, e)
+            return False
+        return True
+
+    def get(self):
+        """Get the typed value."""
+        return self.value
+
+
+class DerivedValue(object):
+    """A value computed from some configs, which is memoized until any of the
+    configs changes.
+
+    The ``fn`` is called with the current values of ``keys`` in order on the
+    first :meth:`get` after the configs changed. If it raises an exception,
+    the exception is propagated and it would be called again on the next
+    :meth:`get`.
+
+    :arg fn: the function which computes the derived value.
+    :arg keys: the names of configs.
+    :arg getter: a callable to get the value of config by name.
+    """
+    def __init__(self, fn, keys, getter):
+        self.fn = fn
+        self.keys = tuple(keys)
+        self.getter = getter
+        self.value = None
+        self.dirty = True
+
+    def invalidate(self, _value=None):
+        """Mark the derived value outdated, it is used as the watching
+        callback of the configs.
+        """
+        self.dirty = True
+
+    def get(self):
+        """Get the derived value, it is computed again if outdated."""
+        if self.dirty:
+            # an invalidation during computing marks it dirty again
+            self.dirty = False
+            try:
+                self.value = self.fn(*[self.getter(k) for k in self.keys])
+            except Exception:
+                self.dirty = True
+                raise
+        return self.value
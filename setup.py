@@ -75,6 +75,7 @@ setup(
     cmdclass={'test': PyTest},
     extras_require={'test': tests_require,
                     'bootstrap': ['kazoo'],
+                    'numpy': ['numpy'],
                     'doc': ['Sphinx==1.3.1',
                             'sphinx-rtd-theme==0.1.8']},
     license=LICENSE,
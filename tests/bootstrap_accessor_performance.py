@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function
+
+import timeit
+
+NUMBER = 100000
+
+# The components are marked as started without connecting to ZooKeeper, the
+# readiness checks pass as they do after a real start.
+SETUP = ';'.join([
+    "from huskar_sdk_v2.bootstrap import BootstrapHuskar",
+    "huskar = BootstrapHuskar(service='arch.test', servers='127.0.0.1:2181',"
+    " cache_dir=None, fast_accessors={fast})",
+    "config, switch = huskar.config, huskar.switch",
+    "config.configs['a'] = '{{\"b\": 1}}'",
+    "switch.switches['a'] = {{'value': 50.0, 'path': ''}}",
+    "[(c.started_timeout.set(), c.ready.set()) for c in (config, switch)]",
+    "config.started = switch.started = True",
+    "{fast} and [c.bind_fast_accessors() for c in (config, switch)]",
+])
+
+STATEMENTS = [
+    ('config.get', "config.get('a')"),
+    ('config.exists', "config.exists('a')"),
+    ('switch.is_switched_on', "switch.is_switched_on('a')"),
+]
+
+
+def time_accessor(statement, fast):
+    return timeit.timeit(
+        statement, SETUP.format(fast=fast), number=NUMBER)
+
+
+if __name__ == '__main__':
+    print("Number: {}\n".format(NUMBER))
+    print("{:<25}{:>15}{:>15}{:>15}".format(
+        'accessor', 'checked (us)', 'fast (us)', 'saved (us)'))
+    for name, statement in STATEMENTS:
+        checked = time_accessor(statement, False) / NUMBER * 1e6
+        fast = time_accessor(statement, True) / NUMBER * 1e6
+        print("{:<25}{:>15.3f}{:>15.3f}{:>15.3f}".format(
+            name, checked, fast, checked - fast))
@@ -1,6 +1,36 @@
 import logging
 
+import pytest
+
 
 logging.basicConfig(level=logging.INFO,
                     format="%(asctime)s %(name)s %(process)d %(message)s")
 logging.getLogger("huskar_sdk_v2").setLevel(logging.DEBUG)
+
+
+def _make_instance(ip, zone=None, state='up', meta=None, **ports):
+    meta = dict(meta or {})
+    if zone:
+        meta['zone'] = zone
+    ports.setdefault('main', 8080)
+    return {'ip': ip, 'port': ports, 'state': state, 'meta': meta}
+
+
+def _make_instances(*names, **kwargs):
+    return {name: _make_instance(name, **kwargs) for name in names}
+
+
+@pytest.fixture
+def make_instance():
+    """The factory of a service instance, e.g.
+    ``make_instance('1.1.1.1', zone='alta', state='down', thrift=8081)``.
+    """
+    return _make_instance
+
+
+@pytest.fixture
+def make_instances():
+    """The factory of a map of service instances named by their IPs, which
+    accepts the same keyword arguments as ``make_instance``.
+    """
+    return _make_instances
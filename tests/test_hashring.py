@@ -0,0 +1,97 @@
+from __future__ import absolute_import
+
+import pytest
+
+from huskar_sdk_v2.utils.hashring import HashRing
+
+
+def test_empty_ring():
+    ring = HashRing()
+    assert ring.get_node('foo') is None
+    assert ring.acquire('foo') is None
+    assert len(ring) == 0
+
+
+def test_ring_is_sorted_and_sized():
+    ring = HashRing(vnodes=10)
+    ring.add('a')
+    ring.add('b', weight=2)
+    points, nodes = ring._ring
+    assert list(points) == sorted(points)
+    assert nodes.count('a') == 10
+    assert nodes.count('b') == 20
+
+
+def test_get_node_is_stable(make_instances):
+    ring = HashRing()
+    ring.update(make_instances('a', 'b', 'c'))
+    other = HashRing()
+    for name in ('c', 'a', 'b'):
+        other.add(name)
+    keys = ['key-%d' % i for i in range(1000)]
+    assert ([ring.get_node(k) for k in keys] ==
+            [other.get_node(k) for k in keys])
+    assert set(ring.get_node(k) for k in keys) == {'a', 'b', 'c'}
+
+
+def test_update_moves_few_keys(make_instances):
+    ring = HashRing()
+    ring.update(make_instances('a', 'b', 'c', 'd'))
+    keys = ['key-%d' % i for i in range(2000)]
+    before = {k: ring.get_node(k) for k in keys}
+
+    ring.update(make_instances('a', 'b', 'c', 'd', 'e'))
+    after = {k: ring.get_node(k) for k in keys}
+    moved = [k for k in keys if before[k] != after[k]]
+    assert all(after[k] == 'e' for k in moved)
+    assert len(moved) < len(keys) * 0.35
+
+    ring.update(make_instances('a', 'b', 'c', 'd'))
+    assert {k: ring.get_node(k) for k in keys} == before
+
+
+def test_update_skips_down_instances_and_respects_weight(make_instances):
+    ring = HashRing(vnodes=8)
+    instances = make_instances('a', 'b')
+    instances.update(make_instances('c', state='down'))
+    instances.update(make_instances('d', meta={'weight': 3}))
+    ring.update(instances)
+    assert sorted(ring.nodes) == ['a', 'b', 'd']
+    assert ring._ring[1].count('d') == 24
+
+    instances['d']['meta']['weight'] = 1
+    ring.update(instances)
+    assert ring._ring[1].count('d') == 8
+
+
+def test_update_converts_weight(make_instances):
+    ring = HashRing(vnodes=8)
+    instances = make_instances('a', meta={'weight': '3'})
+    instances.update(make_instances('b', meta={'weight': 'heavy'}))
+    instances.update(make_instances('c', meta={'weight': '0'}))
+    instances.update(make_instances('d', meta={'weight': None}))
+    ring.update(instances)
+    assert sorted(ring.nodes) == ['a', 'b', 'c', 'd']
+    assert ring.weights == {'a': 3, 'b': 1, 'c': 1, 'd': 1}
+    assert ring._ring[1].count('a') == 24
+
+
+def test_bounded_load(make_instances):
+    with pytest.raises(ValueError):
+        HashRing(load_factor=1)
+
+    ring = HashRing(load_factor=1.25)
+    ring.update(make_instances('a', 'b', 'c', 'd'))
+    acquired = [ring.acquire('same-key') for _ in range(100)]
+    assert set(acquired) == {'a', 'b', 'c', 'd'}
+    assert max(ring.loads.values()) <= 1.25 * 100 / 4 + 1
+    assert ring.total_load == 100
+
+    for node in acquired:
+        ring.release(node)
+    assert ring.total_load == 0
+    assert set(ring.loads.values()) == {0}
+
+    node = ring.acquire('key')
+    ring.remove(node)
+    assert ring.total_load == 0
@@ -5,6 +5,7 @@ from mock import Mock
 import socket
 import pytest
 from huskar_sdk_v2.http.components.config import Config
+from huskar_sdk_v2.utils.scope import request_scope
 
 
 @pytest.fixture
@@ -237,3 +238,101 @@ def test_critical_component_should_recover_if_connection_reestablished(
 
     config.get("test")
     assert not config_component.fail_mode
+
+
+def test_config_in_request_scope(
+        config_component, requests_mock, no_cache_client,
+        wait_huskar_api_ioloop_connected):
+    wait_huskar_api_ioloop_connected(3.0)
+    with request_scope():
+        assert config_component.get('test_config') == 'test_value'
+        requests_mock.set_result_file('test_data_changed.txt')
+        assert requests_mock.wait_processed()
+        assert config_component.get('test_config') == 'test_value'
+    assert config_component.get('test_config') == 'new_value'
+
+
+def test_declare_typed_config(
+        config_component, requests_mock, no_cache_client,
+        wait_huskar_api_ioloop_connected):
+    wait_huskar_api_ioloop_connected(3.0)
+    timeout = config_component.declare('test_timeout', int, default=3)
+    assert timeout.get() == 3
+
+    requests_mock.add_response(
+        '{"body": {"config": {"arch.test": {"overall": '
+        '{"test_timeout": {"value": "5"}}}}}, "message": "update"}')
+    assert requests_mock.wait_processed()
+    assert timeout.get() == 5
+
+    requests_mock.add_response(
+        '{"body": {"config": {"arch.test": {"overall": '
+        '{"test_timeout": {"value": "five"}}}}}, "message": "update"}')
+    assert requests_mock.wait_processed()
+    assert config_component.get('test_timeout') == 'five'
+    assert timeout.get() == 5
+
+
+def test_derived_config(
+        config_component, requests_mock, no_cache_client,
+        wait_huskar_api_ioloop_connected):
+    wait_huskar_api_ioloop_connected(3.0)
+    fn = Mock(side_effect=lambda a, b: (a, b))
+    derived = config_component.derived(fn, ['test_config', 'test_derived'])
+    assert derived.get() == ('test_value', None)
+    assert derived.get() == ('test_value', None)
+    assert fn.call_count == 1
+
+    requests_mock.add_response(
+        '{"body": {"config": {"arch.test": {"overall": '
+        '{"test_derived": {"value": "1"}}}}}, "message": "update"}')
+    assert requests_mock.wait_processed()
+    assert derived.get() == ('test_value', 1)
+    assert derived.get() == ('test_value', 1)
+    assert fn.call_count == 2
+
+
+def test_watch_prefix_and_pattern(
+        config_component, requests_mock, no_cache_client,
+        wait_huskar_api_ioloop_connected):
+    wait_huskar_api_ioloop_connected(3.0)
+    prefix_handler = Mock()
+    pattern_handler = Mock()
+    config_component.watch_prefix('feature.', prefix_handler)
+    config_component.watch_pattern('feature.*.enabled', pattern_handler)
+
+    requests_mock.add_response(
+        '{"body": {"config": {"arch.test": {"overall": '
+        '{"feature.pay.enabled": {"value": "true"}, '
+        '"feature.pay.limit": {"value": "1"}, '
+        '"other": {"value": "1"}}}}}, "message": "update"}')
+    assert requests_mock.wait_processed()
+    assert sorted(c[0] for c in prefix_handler.call_args_list) == [
+        ('feature.pay.enabled', True), ('feature.pay.limit', 1)]
+    pattern_handler.assert_called_once_with('feature.pay.enabled', True)
+
+    config_component.unwatch_pattern('feature.*.enabled', pattern_handler)
+    requests_mock.add_response(
+        '{"body": {"config": {"arch.test": {"overall": '
+        '{"feature.pay.enabled": {"value": "false"}}}}}, '
+        '"message": "update"}')
+    assert requests_mock.wait_processed()
+    prefix_handler.assert_called_with('feature.pay.enabled', False)
+    assert pattern_handler.call_count == 1
+
+
+def test_get_many_and_snapshot(
+        requests_mock, no_cache_client, wait_huskar_api_ioloop_connected):
+    config = Config('arch.test', 'some-cluster-not-exists')
+    wait_huskar_api_ioloop_connected(3.0)
+    requests_mock.add_response(
+        '{"body": {"config": {"arch.test": {"some-cluster-not-exists": '
+        '{"test_config": {"value": "new_value"}}}}}, "message": "update"}'
+    )
+    assert requests_mock.wait_processed()
+    assert config.get_many(
+        ['test_config', 'test_unknown'], {'test_unknown': 1}) == {
+        'test_config': 'new_value', 'test_unknown': 1}
+    snapshot = config.snapshot()
+    assert snapshot['test_config'] == 'new_value'
+    assert snapshot == dict(config.iteritems())
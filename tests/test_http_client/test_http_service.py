@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import time
+
 from mock import Mock
 
 import pytest
@@ -124,6 +126,135 @@ def test_service_node_changed_should_notify_listeners(
     fake_listener.assert_any_call(new_service_data)
 
 
+def test_service_indexes_should_follow_changes(
+        requests_mock, service_component, started_client):
+    assert started_client.connected.wait(1)
+    listener = Mock()
+    service_component.register_hook_function(
+        'arch.test', 'alpha-stable', listener,
+        index_by=('state', 'meta.protocol'))
+    assert service_component.find_instances(
+        'arch.test', 'alpha-stable', 'meta.protocol',
+        'thrift') == initial_service_data
+    with pytest.raises(ValueError):
+        service_component.find_instances(
+            'arch.test', 'alpha-stable', 'meta.zone', 'alta1')
+    with pytest.raises(ValueError):
+        service_component.find_instances(
+            'arch.test', 'beta-stable', 'state', 'up')
+
+    requests_mock.set_result_file('test_data_changed.txt')
+    assert requests_mock.wait_processed()
+    new_service_data = dict(initial_service_data)
+    new_service_data.update(added_service_data)
+    assert service_component.find_instances(
+        'arch.test', 'alpha-stable', 'state', 'up') == new_service_data
+
+    requests_mock.set_result_file('test_data_deleted.txt')
+    assert requests_mock.wait_processed()
+    assert service_component.find_instances(
+        'arch.test', 'alpha-stable', 'state', 'up') == added_service_data
+    assert service_component.find_instances(
+        'arch.test', 'alpha-stable', 'meta.protocol') == added_service_data
+
+
+def test_locality_hook(requests_mock, service_component, started_client):
+    assert started_client.connected.wait(1)
+    listener = Mock()
+    service_component.set_min_server_num(2)
+    selector = service_component.register_locality_hook(
+        'arch.test', 'alpha-stable', listener, zone='alta1')
+    listener.assert_called_once_with(initial_service_data)
+    assert selector.spilled_over
+
+    requests_mock.set_result_file('test_data_changed.txt')
+    assert requests_mock.wait_processed()
+    new_service_data = dict(initial_service_data)
+    new_service_data.update(added_service_data)
+    listener.assert_called_with(new_service_data)
+    assert selector.instances == new_service_data
+
+
+def test_outlier_ejection(requests_mock, service_component, started_client):
+    assert started_client.connected.wait(1)
+    requests_mock.set_result_file('test_data_changed.txt')
+    assert requests_mock.wait_processed()
+    new_service_data = dict(initial_service_data)
+    new_service_data.update(added_service_data)
+
+    service_component.report_call(
+        'arch.test', 'alpha-stable', '192.168.1.1_17400', 0.1)
+    service_component.enable_outlier_ejection(
+        'arch.test', 'alpha-stable', min_requests=3)
+    listener = Mock()
+    service_component.register_hook_function(
+        'arch.test', 'alpha-stable', listener)
+    listener.assert_called_once_with(new_service_data)
+
+    for _ in range(3):
+        service_component.report_call(
+            'arch.test', 'alpha-stable', '192.168.1.1_17400', 0.1,
+            success=False)
+    gevent.sleep(0.01)
+    listener.assert_called_with(added_service_data)
+    assert listener.call_count == 2
+    assert service_component.get_available_node_list(
+        'arch.test', 'alpha-stable') == added_service_data
+    assert service_component.get_service_node_list(
+        'arch.test', 'alpha-stable') == new_service_data
+
+
+def test_report_call_in_background(requests_mock, service_component,
+                                   started_client):
+    assert started_client.connected.wait(1)
+    requests_mock.set_result_file('test_data_changed.txt')
+    assert requests_mock.wait_processed()
+    service_component.enable_outlier_ejection(
+        'arch.test', 'alpha-stable', min_requests=1)
+    called = []
+
+    def slow_listener(instances):
+        called.append(instances)
+        time.sleep(0.5)
+    service_component.register_hook_function(
+        'arch.test', 'alpha-stable', slow_listener, trigger=False)
+    service_component.report_call(
+        'arch.test', 'alpha-stable', '192.168.1.1_23471', 0.1)
+
+    started_at = time.time()
+    service_component.report_call(
+        'arch.test', 'alpha-stable', '192.168.1.1_17400', 0.1, success=False)
+    assert time.time() - started_at < 0.1
+    assert called == []
+    gevent.sleep(0.01)
+    assert called == [added_service_data]
+
+
+def test_prewarm(requests_mock, service_component, started_client):
+    assert started_client.connected.wait(1)
+    connector = Mock(return_value=True)
+    listener = Mock()
+    service_component.enable_prewarm('arch.test', 'alpha-stable', connector)
+    service_component.register_hook_function(
+        'arch.test', 'alpha-stable', listener)
+    # falls back to the unwarmed instances until min_server_num are ready
+    listener.assert_called_once_with(initial_service_data)
+
+    gevent.sleep(0.1)
+    connector.assert_called_once_with(
+        '192.168.1.1_17400', initial_service_data['192.168.1.1_17400'])
+    listener.assert_called_with(initial_service_data)
+
+    requests_mock.set_result_file('test_data_changed.txt')
+    assert requests_mock.wait_processed()
+    gevent.sleep(0.1)
+    new_service_data = dict(initial_service_data)
+    new_service_data.update(added_service_data)
+    listener.assert_any_call(initial_service_data)
+    listener.assert_called_with(new_service_data)
+    assert connector.call_count == 2
+
+
 def test_file_client_add_watch_after_data_already_processed(
         requests_mock, service_component, started_client,
         fake_service_component):
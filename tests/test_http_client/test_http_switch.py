@@ -4,6 +4,7 @@ import pytest
 from mock import Mock
 import gevent
 from huskar_sdk_v2.http.components.switch import Switch
+from huskar_sdk_v2.utils.scope import request_scope
 
 
 @pytest.fixture
@@ -181,3 +182,100 @@ def test_switch_value_100_should_pass(requests_mock, monkeypatch,
 
     monkeypatch.setattr(switch_component.rand, 'randint', lambda l, h: 1)
     assert switch_component.is_switched_on('test-deleted-switch')
+
+
+def test_switch_with_sticky_key(requests_mock, monkeypatch,
+                                switch_component):
+    requests_mock.add_response(
+        '{"body": {"switch": {"arch.test": {"overall": '
+        '{"test-sticky-switch": {"value": "30"}}}}}, "message": "update"}')
+    assert requests_mock.wait_processed()
+    monkeypatch.setattr(switch_component.rand, 'randint', None)
+
+    decisions = [switch_component.is_switched_on('test-sticky-switch', key=i)
+                 for i in range(1000)]
+    assert 200 < sum(decisions) < 400
+    assert decisions == [
+        switch_component.is_switched_on('test-sticky-switch', key=i)
+        for i in range(1000)]
+    assert switch_component.is_switched_on('switch-name', key=1)
+    assert switch_component.is_switched_on('unknown-switch', key=1)
+
+
+def test_switch_many(requests_mock, switch_component):
+    requests_mock.add_response(
+        '{"body": {"switch": {"arch.test": {"overall": '
+        '{"test-many-switch": {"value": "30"}}}}}, "message": "update"}')
+    assert requests_mock.wait_processed()
+
+    decisions = switch_component.is_switched_on_many('test-many-switch', 1000)
+    assert len(decisions) == 1000
+    assert 200 < sum(decisions) < 400
+
+    keys = range(100)
+    assert [bool(d) for d in switch_component.is_switched_on_many(
+        'test-many-switch', keys)] == [
+        switch_component.is_switched_on('test-many-switch', key=k)
+        for k in keys]
+    assert sum(switch_component.is_switched_on_many('switch-name', 10)) == 10
+    assert sum(switch_component.is_switched_on_many(
+        'unknown-switch', 10, default=False)) == 0
+
+
+def test_switch_bind_slot(requests_mock, switch_component):
+    origin_fn = Mock(return_value='value')
+    origin_fn.__name__ = 'origin_fn'
+    decorated = switch_component.bind('test-slot-switch')(origin_fn)
+    another = switch_component.bind('test-slot-switch')(origin_fn)
+    slot = switch_component.slots['test-slot-switch']
+    assert slot.threshold is None
+
+    assert decorated() == 'value'
+    assert slot.threshold == 1.0
+    switch_component.set_default_state(False)
+    assert slot.threshold is None
+    assert decorated() is None
+    assert another() is None
+
+    requests_mock.add_response(
+        '{"body": {"switch": {"arch.test": {"overall": '
+        '{"test-slot-switch": {"value": "100"}}}}}, "message": "update"}')
+    assert requests_mock.wait_processed()
+    assert slot.threshold is None
+    assert decorated() == 'value'
+    assert origin_fn.call_count == 2
+
+
+def test_switch_in_request_scope(requests_mock, switch_component):
+    requests_mock.add_response(
+        '{"body": {"switch": {"arch.test": {"overall": '
+        '{"test-scope-switch": {"value": "50"}}}}}, "message": "update"}')
+    assert requests_mock.wait_processed()
+
+    origin_fn = Mock(return_value=True)
+    origin_fn.__name__ = 'origin_fn'
+    decorated = switch_component.bind('test-scope-switch')(origin_fn)
+
+    for _ in range(20):
+        with request_scope():
+            decision = switch_component.is_switched_on('test-scope-switch')
+            assert all(
+                switch_component.is_switched_on('test-scope-switch') is
+                decision for _ in range(10))
+            assert all(bool(decorated()) is decision for _ in range(10))
+
+
+def test_switch_get_many_and_snapshot(requests_mock, switch_component):
+    requests_mock.add_response(
+        '{"body": {"switch": {"arch.test": {"overall": '
+        '{"test-off-switch": {"value": "0"}}}}}, "message": "update"}')
+    assert requests_mock.wait_processed()
+
+    assert switch_component.get_many(
+        ['switch-name', 'test-off-switch', 'unknown-switch'],
+        {'unknown-switch': False}) == {
+        'switch-name': True, 'test-off-switch': False,
+        'unknown-switch': False}
+    snapshot = switch_component.snapshot()
+    assert snapshot['switch-name'] == 100.0
+    assert snapshot['test-off-switch'] == 0.0
@@ -0,0 +1,88 @@
+from __future__ import absolute_import
+
+import pytest
+
+from huskar_sdk_v2.utils.instance_index import InstanceIndex, resolve_field
+
+
+def test_resolve_field(make_instance):
+    instance = make_instance('1.1.1.1', zone='alta', thrift=8081)
+    assert resolve_field(instance, 'meta.zone') == 'alta'
+    assert resolve_field(instance, 'port.thrift') == 8081
+    assert resolve_field(instance, 'port.http') is resolve_field({}, 'a')
+    assert resolve_field(instance, 'ip.foo') is resolve_field({}, 'a')
+
+
+def test_index_find(make_instance):
+    index = InstanceIndex(('state', 'meta.zone', 'port.thrift'))
+    index.sync({
+        'a': make_instance('a', zone='alta', thrift=1),
+        'b': make_instance('b', zone='altb', state='down'),
+        'c': make_instance('c', zone='alta'),
+    })
+    assert set(index.find('meta.zone', 'alta')) == {'a', 'c'}
+    assert set(index.find('state', 'up')) == {'a', 'c'}
+    assert set(index.find('state', 'down')) == {'b'}
+    assert set(index.find('port.thrift')) == {'a'}
+    assert index.find('meta.zone', 'unknown') == {}
+    assert set(index.find_absent('port.thrift')) == {'b', 'c'}
+    assert index.find_absent('meta.zone') == {}
+    with pytest.raises(ValueError):
+        index.find('meta.idc', 'alta')
+    with pytest.raises(ValueError):
+        index.find_absent('meta.idc')
+
+    index.put('c', make_instance('c', zone='alta', thrift=2))
+    index.discard('b')
+    assert set(index.find_absent('port.thrift')) == set()
+
+
+def test_index_update_is_copy_on_write(make_instance):
+    index = InstanceIndex(('meta.zone',))
+    index.put('a', make_instance('a', zone='alta'))
+    bucket = index.find('meta.zone', 'alta')
+
+    index.put('b', make_instance('b', zone='alta'))
+    index.put('a', make_instance('a', zone='altb'))
+    assert set(bucket) == {'a'}
+    assert set(index.find('meta.zone', 'alta')) == {'b'}
+    assert set(index.find('meta.zone', 'altb')) == {'a'}
+
+    index.discard('b')
+    index.discard('unknown')
+    assert index.find('meta.zone', 'alta') == {}
+    assert set(index.find('meta.zone')) == {'a'}
+    assert len(index) == 1
+
+
+def test_index_sync_and_unhashable_values(make_instance):
+    index = InstanceIndex(('meta.zone', 'meta.tags'))
+    instance = make_instance('a', zone='alta')
+    instance['meta']['tags'] = ['x', 'y']
+    index.sync({'a': instance, 'b': make_instance('b', zone='altb')})
+    assert set(index.find('meta.tags')) == {'a'}
+
+    index.sync({'b': make_instance('b', zone='alta')})
+    assert set(index.find('meta.zone', 'alta')) == {'b'}
+    assert index.find('meta.tags') == {}
+    assert index.find('meta.zone', 'altb') == {}
+
+
+def test_index_sync_copies_bucket_once(make_instances):
+    index = InstanceIndex(('meta.zone',))
+    index.sync(make_instances('a', zone='alta'))
+    bucket = index.find('meta.zone', 'alta')
+
+    staged = []
+    stage = index._stage
+
+    def record(staged_buckets, buckets, key):
+        result = stage(staged_buckets, buckets, key)
+        staged.append(id(result))
+        return result
+
+    index._stage = record
+    index.sync(make_instances('a', 'b', 'c', 'd', zone='alta'))
+    assert len(set(staged)) == 2  # present and zone=alta
+    assert list(bucket) == ['a']
+    assert set(index.find('meta.zone', 'alta')) == {'a', 'b', 'c', 'd'}
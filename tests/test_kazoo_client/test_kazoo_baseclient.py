@@ -1,9 +1,20 @@
 # -*- coding: utf-8 -*-
 
+import time
+import threading
+
 import gevent
+import mock
+import pytest
 from pytest import fixture
-
-from huskar_sdk_v2.bootstrap.client import BaseClient
+from kazoo.exceptions import UnimplementedError
+from kazoo.handlers.threading import SequentialThreadingHandler
+from kazoo.protocol.states import EventType
+from kazoo.recipe.cache import TreeEvent
+
+from huskar_sdk_v2.bootstrap import client as client_module
+from huskar_sdk_v2.bootstrap.client import BaseClient, SessionPool
+from huskar_sdk_v2.bootstrap.persistent import PersistentWatches
 from huskar_sdk_v2.utils import combine
 
 
@@ -144,3 +155,455 @@ def test_watch_path(huskar_client, test_key, test_full_path):
     assert handler.children == ['bar']
     assert not data_watch._stopped
     assert not children_watch._stopped
+
+
+def test_watch_path_with_treecache(servers, base_path, test_key):
+    c = BaseClient(servers, '', '', base_path, watch_engine='treecache')
+    c.start()
+    try:
+        c.ensure_path(test_key)
+        c.create(combine(test_key, 'a'), '1')
+        children = []
+        c.watch_path(test_key, children.append)
+        assert children[-1] == ['a']
+        assert c.watch_key(combine(test_key, 'a'))
+        assert test_key not in c.watched_path
+
+        c.create(combine(test_key, 'b'), '2')
+        gevent.sleep(1)
+        assert children[-1] == ['a', 'b']
+    finally:
+        c.stop()
+    assert not c.watched_tree
+
+
+def test_watch_tree_waits_initialized(test_key):
+    c = BaseClient(lazy=False, watch_engine='treecache')
+    full_path = c.get_full_path(test_key)
+
+    class FakeTreeCache(object):
+        def __init__(self, client, path):
+            self.listeners = []
+
+        def listen(self, listener):
+            self.listeners.append(listener)
+
+        def start(self):
+            gevent.spawn_later(0.1, self.initialize)
+
+        def initialize(self):
+            for listener in self.listeners:
+                listener(TreeEvent.make(TreeEvent.INITIALIZED, None))
+
+        def get_children(self, path, default=None):
+            return ['a'] if path == full_path else default
+
+        def get_data(self, path):
+            return mock.Mock(data=b'1', stat=mock.Mock(czxid=1, version=0))
+
+        def close(self):
+            pass
+
+    children = []
+
+    def callback(value):
+        children.append(value)
+
+    with mock.patch('huskar_sdk_v2.bootstrap.client.TreeCache',
+                    FakeTreeCache), \
+            mock.patch.object(BaseClient, 'connected', True):
+        c.watch_path(test_key, callback)
+        assert children == [['a']]
+
+        c.unwatch_path(test_key)
+        assert not c.tree_events
+
+
+def test_watch_keys(huskar_client, test_key, test_full_path):
+    for name in ('a', 'b', 'c'):
+        huskar_client.client.create(
+            combine(test_full_path, name), name.encode(), makepath=True)
+    keys = [combine(test_key, name) for name in ('a', 'b', 'c', 'd')]
+
+    values = []
+    for key in keys:
+        huskar_client.watched_blinker.signal(key).connect(
+            lambda value_meta: values.append(value_meta[0]), weak=False)
+    assert huskar_client.watch_keys(keys) == set(keys[:3])
+    assert sorted(values) == ['a', 'b', 'c']
+    assert set(huskar_client.watched_node) == set(keys[:3])
+
+    huskar_client.client.set(combine(test_full_path, 'b'), b'changed')
+    gevent.sleep(1)
+    assert values[-1] == 'changed'
+
+
+def test_watch_keys_concurrency(test_key):
+    c = BaseClient(lazy=False)
+    c.WATCH_KEYS_CONCURRENCY = 2
+    keys = [combine(test_key, str(i)) for i in range(10)]
+    exists = mock.Mock()
+    exists.return_value.get.return_value = mock.Mock()
+    running, peaks = [], []
+
+    def watch_data(key):
+        running.append(key)
+        peaks.append(len(running))
+        gevent.sleep(0.01)
+        running.remove(key)
+        return key != keys[0]
+
+    with mock.patch.object(c.client, 'exists_async', exists), \
+            mock.patch.object(c, '_watch_data', watch_data), \
+            mock.patch.object(c, 'spawn', wraps=c.spawn) as spawn:
+        assert c.watch_keys(keys) == set(keys[1:])
+    assert exists.call_count == 10
+    assert spawn.call_count == 2
+    assert len(peaks) == 10
+    assert max(peaks) == 2
+
+
+def test_redundant_deliveries_dropped(test_key):
+    c = BaseClient(lazy=False)
+    stat = mock.Mock(czxid=1, version=0)
+    c.watched_node[test_key] = None
+    c.watched_path[test_key] = (None, None)
+
+    values, children = [], []
+    c.watched_blinker.signal(test_key).connect(
+        lambda value_meta: values.append(value_meta[0]), weak=False)
+    c.watched_blinker.signal(('children', test_key)).connect(
+        children.append, weak=False)
+
+    c.trigger_watched_key(c.client, test_key, b'1', stat)
+    c.trigger_watched_key(c.client, test_key, b'1', stat)
+    assert values == ['1']
+    c.trigger_watched_key(c.client, test_key, b'2', mock.Mock(
+        czxid=1, version=1))
+    assert values == ['1', '2']
+
+    c.trigger_watched_path(c.client, test_key, ['a', 'b'])
+    c.trigger_watched_path(c.client, test_key, ['b', 'a'])
+    assert children == [['a', 'b']]
+
+    # delivered again after being watched again
+    c.unwatch_key(test_key)
+    c.watched_node[test_key] = None
+    c.trigger_watched_key(c.client, test_key, b'2', mock.Mock(
+        czxid=1, version=1))
+    assert values == ['1', '2', '2']
+
+
+def test_session_pool(servers, base_path):
+    pool = SessionPool()
+    c = pool.acquire(servers, base_path=base_path)
+    c2 = pool.acquire(servers, base_path=base_path)
+    assert c2 is not c
+    assert c2.base_client is c.base_client
+    assert pool.acquire(servers, 'user', 'pass', base_path=base_path) \
+        .base_client is not c.base_client
+    assert pool.acquire(servers, base_path='/other') \
+        .base_client is not c.base_client
+
+    c.start()
+    assert not pool.release(c)
+    assert c.connected
+    assert not pool.release(c)
+    assert pool.release(c2)
+    assert not c.connected
+    assert not pool.release(c2)
+    assert pool.acquire(servers, base_path=base_path) \
+        .base_client is not c.base_client
+
+
+def test_shared_client_watches(test_key):
+    pool = SessionPool()
+    v1, v2 = pool.acquire(lazy=False), pool.acquire(lazy=False)
+    client = v1.base_client
+    path = 'test_path'
+    delivered = []
+    for name, view in (('v1', v1), ('v2', v2)):
+        view.watched_blinker.signal(test_key).connect(
+            lambda value_meta, name=name: delivered.append(
+                (name, value_meta[0])), weak=False)
+
+    def children_callback(children):
+        delivered.append(('children', children))
+
+    def send(value, version):
+        client.trigger_watched_key(client.client, test_key, value, mock.Mock(
+            czxid=1, version=version))
+
+    with mock.patch.object(client, 'watch_key', return_value=True), \
+            mock.patch.object(client, 'unwatch_key') as unwatch_key, \
+            mock.patch.object(client, 'watch_path'), \
+            mock.patch.object(client, 'unwatch_path') as unwatch_path:
+        client.watched_node[test_key] = None
+        assert v1.watch_key(test_key)
+        send(b'1', 0)
+        assert delivered == [('v1', '1')]
+
+        # the last value is sent to the view which watches it later
+        assert v2.watch_key(test_key)
+        assert delivered == [('v1', '1'), ('v2', '1')]
+        send(b'2', 1)
+        assert sorted(delivered[2:]) == [('v1', '2'), ('v2', '2')]
+
+        v1.unwatch_key(test_key)
+        assert not unwatch_key.called
+        send(b'3', 2)
+        assert delivered[4:] == [('v2', '3')]
+
+        client.watched_path[path] = None
+        v1.watch_path(path, children_callback)
+        client.trigger_watched_path(client.client, path, ['a'])
+        v2.watch_path(path, children_callback)
+        assert delivered[5:] == [('children', ['a']), ('children', ['a'])]
+        v1.unwatch_path(path)
+        assert not unwatch_path.called
+
+        v2.stop()
+        unwatch_key.assert_called_once_with(test_key)
+        unwatch_path.assert_called_once_with(path)
+    assert pool.sessions
+    assert pool.release(v1)
+    assert not pool.sessions
+
+
+def test_threading_handler(servers, base_path, test_key):
+    c = BaseClient(servers, '', '', base_path, handler='threading')
+    assert c.threaded
+    assert isinstance(c.client.handler, SequentialThreadingHandler)
+    assert isinstance(c.spawn(lambda: None), threading.Thread)
+    try:
+        assert c.start()
+        c.create(test_key, '1')
+        values = []
+        c.watched_blinker.signal(test_key).connect(
+            lambda value_meta: values.append(value_meta[0]), weak=False)
+        assert c.watch_key(test_key)
+        c.set_data(test_key, '2')
+        time.sleep(1)
+        assert values == ['1', '2']
+    finally:
+        c.delete(test_key)
+        c.stop()
+
+    with pytest.raises(ValueError):
+        BaseClient(servers, handler='eventlet')
+
+
+def test_handler_without_gevent():
+    with mock.patch.object(client_module, 'has_gevent', False):
+        with pytest.raises(ValueError):
+            BaseClient(handler='gevent')
+        c = BaseClient()
+        assert c.handler == 'threading'
+        assert c.threaded
+        with mock.patch.object(c.client.handler, 'sleep_func') as sleep:
+            c.sleep(0.1)
+        sleep.assert_called_once_with(0.1)
+        semaphore = c.semaphore_object(1)
+        assert semaphore.acquire()
+        semaphore.release()
+        with pytest.raises(ValueError):
+            semaphore.release()             # bounded
+
+
+def test_sharded_watches(servers, base_path):
+    c = BaseClient(servers, '', '', base_path, shards=3)
+    paths = ['service_%d' % i for i in range(30)]
+    assert len(set(id(c.get_shard(path)) for path in paths)) == 3
+    try:
+        c.start()
+        children = []
+        for path in paths:
+            c.ensure_path(path)
+            c.create(combine(path, 'a'), '1')
+            c.watch_path(path, children.append)
+            assert c.watch_key(combine(path, 'a'))
+        assert children == [['a']] * len(paths)
+        for shard in c.shards:
+            assert shard.watched_path
+            assert shard.connected
+
+        path = next(p for p in paths if c.get_shard(p) is not c)
+        values = []
+        c.watched_blinker.signal(combine(path, 'a')).connect(
+            lambda value_meta: values.append(value_meta[0]), weak=False)
+        c.set_data(combine(path, 'a'), '2')
+        gevent.sleep(1)
+        assert values == ['2']
+    finally:
+        for path in paths:
+            c.delete(path, recursive=True)
+        c.stop()
+    assert not any(shard.connected for shard in c.shards)
+
+
+def test_sharded_start_waits_shards(servers, base_path):
+    c = BaseClient(servers, '', '', base_path, shards=2)
+    shard = c.shards[0]
+    path = next('service_%d' % i for i in range(100)
+                if c.get_shard('service_%d' % i) is shard)
+    start = shard._start
+
+    def slow_start():
+        gevent.sleep(1)
+        start()
+
+    try:
+        with mock.patch.object(shard, '_start', slow_start):
+            assert c.start(timeout=5)
+        assert shard.connected
+        c.ensure_path(path)
+        c.create(combine(path, 'a'), '1')
+        children = []
+        c.watch_path(path, children.append)
+        assert children == [['a']]
+    finally:
+        c.delete(path, recursive=True)
+        c.stop()
+
+
+def test_recursive_watch_events(test_key):
+    c = BaseClient(lazy=False)
+    children = c.watched_recursive[test_key] = {'a'}
+    full_path = c.get_full_path(test_key)
+    stats = iter(mock.Mock(czxid=1, version=v) for v in range(10))
+
+    def get_async(path):
+        result = mock.Mock()
+        result.get.return_value = (b'data', next(stats))
+        result.rawlink.side_effect = lambda callback: callback(result)
+        return result
+
+    delivered = []
+    c.watched_blinker.signal(('children', test_key)).connect(
+        lambda children: delivered.append(('children', children)),
+        weak=False)
+    for name in ('a', 'b'):
+        key = combine(test_key, name)
+        c.watched_node[key] = None
+        c.watched_blinker.signal(key).connect(
+            lambda value_meta, key=key: delivered.append(
+                (key, value_meta[0])), weak=False)
+
+    def fire(event_type, name=None):
+        path = combine(full_path, name) if name else full_path
+        event = mock.Mock(type=event_type, path=path)
+        c.trigger_recursive_watch(c.client, test_key, children, event)
+
+    with mock.patch.object(c.client, 'get_async', side_effect=get_async):
+        fire(EventType.CREATED, 'b')
+        fire(EventType.CHANGED, 'a')
+        fire(EventType.CHANGED, 'b/deeper')
+        fire(EventType.DELETED, 'a')
+        fire(EventType.DELETED)
+    assert delivered == [
+        ('children', ['a', 'b']),
+        (combine(test_key, 'b'), 'data'),
+        (combine(test_key, 'a'), 'data'),
+        (combine(test_key, 'a'), None),
+        ('children', ['b']),
+        ('children', []),
+    ]
+
+    # the events of unwatched paths are ignored
+    c.watched_recursive.pop(test_key)
+    del delivered[:]
+    fire(EventType.CREATED, 'c')
+    assert not delivered
+
+
+def test_recursive_watch_added_and_removed(test_key):
+    c = BaseClient(lazy=False, watch_engine='persistent')
+    full_path = c.get_full_path(test_key)
+    watches = c.persistent_watches
+    with mock.patch.object(watches, 'add') as add, \
+            mock.patch.object(watches, 'remove') as remove, \
+            mock.patch.object(c.client, 'get_children', return_value=[]), \
+            mock.patch.object(c, '_watch_children') as watch_children:
+        c.watch_path(test_key, lambda children: None)
+        watcher = c.recursive_watchers[test_key]
+        add.assert_called_once_with(full_path, watcher)
+        c.unwatch_path(test_key)
+        remove.assert_called_once_with(full_path, watcher)
+        assert not c.watched_recursive
+
+        # the servers before 3.6 reply the request as unimplemented
+        add.return_value.get.side_effect = UnimplementedError()
+        c.watch_path(test_key, lambda children: None)
+        watch_children.assert_called_once_with(test_key)
+        assert not c.watched_recursive
+        assert not c.recursive_watchers
+
+
+def test_persistent_watch_request(servers, base_path, test_key):
+    c = BaseClient(servers, '', '', base_path)
+    c.start()
+    try:
+        c.ensure_path(test_key)
+        full_path = c.get_full_path(test_key)
+        watches = PersistentWatches(c.client)
+        events = []
+        result = watches.add(full_path, events.append)
+        if c.client.server_version() < (3, 6):
+            # the servers before 3.6 reply it as unimplemented
+            with pytest.raises(UnimplementedError):
+                result.get(timeout=5)
+            assert c.connected
+            assert c.exists(test_key)
+            return
+
+        result.get(timeout=5)
+        c.create(combine(test_key, 'a/b'), '1', makepath=True)
+        c.set_data(combine(test_key, 'a/b'), '2')
+        gevent.sleep(1)
+        assert [(e.type, e.path) for e in events] == [
+            (EventType.CREATED, combine(full_path, 'a')),
+            (EventType.CREATED, combine(full_path, 'a/b')),
+            (EventType.CHANGED, combine(full_path, 'a/b')),
+        ]
+    finally:
+        c.delete(test_key, recursive=True)
+        c.stop()
+
+
+def test_watch_path_with_persistent_watch(servers, base_path, test_key):
+    c = BaseClient(servers, '', '', base_path, watch_engine='persistent')
+    assert c.watch_engine == 'persistent'
+    c.start()
+    try:
+        # the servers before 3.6 reject the watch and it falls back
+        recursive = c.client.server_version() >= (3, 6)
+        c.ensure_path(test_key)
+        c.create(combine(test_key, 'a'), '1')
+        children = []
+        c.watch_path(test_key, children.append)
+        assert children[-1] == ['a']
+        assert c.watch_key(combine(test_key, 'a'))
+        assert (test_key in c.watched_recursive) is recursive
+        assert (test_key in c.watched_path) is not recursive
+        assert bool(c.persistent_watches.watchers) is recursive
+
+        values = []
+        c.watched_blinker.signal(combine(test_key, 'a')).connect(
+            lambda value_meta: values.append(value_meta[0]), weak=False)
+        c.create(combine(test_key, 'b'), '2')
+        c.set_data(combine(test_key, 'a'), '3')
+        gevent.sleep(1)
+        assert children[-1] == ['a', 'b']
+        assert values == ['3']
+
+        c.unwatch_path(test_key)
+        assert not c.persistent_watches.watchers
+    finally:
+        c.delete(test_key, recursive=True)
+        c.stop()
+
+
+def test_persistent_watch_unsupported():
+    with mock.patch.object(client_module, 'has_persistent_watch', False):
+        c = BaseClient(watch_engine='persistent')
+    assert c.watch_engine == 'default'
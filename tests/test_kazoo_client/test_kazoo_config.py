@@ -1,10 +1,11 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import re
 import logging
 import mock
 import gevent
-from pytest import fixture
+from pytest import fixture, raises
 from huskar_sdk_v2.utils import combine
 
 logging.basicConfig()
@@ -251,3 +252,122 @@ def test_iteritems(huskar, full_path, overall_full_path):
         'test_config': 'a',
         'test_config_2': 'a'
         }.items())
+
+
+def test_decoded_config_cache(huskar, config, full_path):
+    huskar.client.call_client(
+        'create', full_path, b'{"a": [1, 2]}', ephemeral=True)
+    gevent.sleep(SLEEP_TIME)
+    value = config.get(TEST_CONFIG)
+    assert value == {'a': [1, 2]}
+    assert config.get(TEST_CONFIG) is value
+
+    huskar.client.call_client('set', full_path, b'{"a": [3]}')
+    gevent.sleep(SLEEP_TIME)
+    assert config.get(TEST_CONFIG) == {'a': [3]}
+
+    config.set_frozen()
+    frozen_value = config.get(TEST_CONFIG)
+    assert frozen_value == {'a': (3,)}
+    with raises(TypeError):
+        frozen_value['a'] = []
+
+
+def test_fast_accessors(huskar, config, full_path):
+    huskar.client.call_client('create', full_path, b'a', ephemeral=True)
+    config.fast_accessors = True
+    assert 'get' not in vars(config)
+    assert config.get(TEST_CONFIG) == 'a'
+    assert 'get' in vars(config)
+    assert config.exists(TEST_CONFIG)
+
+    huskar.client.call_client('set', full_path, b'b')
+    gevent.sleep(SLEEP_TIME)
+    assert config.get(TEST_CONFIG) == 'b'
+
+    config.stop()
+    assert 'get' not in vars(config)
+    assert config.get(TEST_CONFIG) == 'b'
+    assert config.started
+
+
+def test_declare_typed_config(huskar, config, full_path):
+    huskar.client.call_client('create', full_path, b'5', ephemeral=True)
+    gevent.sleep(SLEEP_TIME)
+    timeout = config.declare(TEST_CONFIG, int, default=3)
+    assert timeout.get() == 5
+
+    huskar.client.call_client('set', full_path, b'"five"')
+    gevent.sleep(SLEEP_TIME)
+    assert timeout.get() == 5
+
+    huskar.client.call_client('delete', full_path)
+    gevent.sleep(SLEEP_TIME)
+    assert timeout.get() == 3
+
+
+def test_derived_config(huskar, config, full_path):
+    huskar.client.call_client('create', full_path, b'a+', ephemeral=True)
+    gevent.sleep(SLEEP_TIME)
+    compile_ = mock.Mock(side_effect=re.compile)
+    pattern = config.derived(compile_, [TEST_CONFIG])
+    assert pattern.get().match('aaa')
+    assert pattern.get().match('aaa')
+    assert compile_.call_count == 1
+
+    huskar.client.call_client('set', full_path, b'b+')
+    gevent.sleep(SLEEP_TIME)
+    assert not pattern.get().match('aaa')
+    assert compile_.call_count == 2
+
+
+def test_watch_prefix_and_pattern(huskar, config, full_path):
+    prefix_handler = mock.Mock()
+    pattern_handler = mock.Mock()
+    config.watch_prefix('test_', prefix_handler)
+    config.watch_pattern('*_config', pattern_handler)
+    config.watch_pattern('other_*', pattern_handler)
+
+    huskar.client.call_client('create', full_path, b'a', ephemeral=True)
+    gevent.sleep(SLEEP_TIME)
+    prefix_handler.assert_called_once_with(TEST_CONFIG, u'a')
+    pattern_handler.assert_called_once_with(TEST_CONFIG, u'a')
+
+
+def test_get_many_and_snapshot(huskar, config, full_path, overall_full_path):
+    huskar.client.call_client('create', overall_full_path, b'[1]',
+                              ephemeral=True)
+    huskar.client.call_client('create', full_path, b'{"a": 1}',
+                              ephemeral=True)
+    gevent.sleep(SLEEP_TIME)
+    assert config.get_many([TEST_CONFIG, 'unknown'], {'unknown': 1}) == {
+        TEST_CONFIG: {'a': 1}, 'unknown': 1}
+    assert config.snapshot() == {TEST_CONFIG: {'a': 1}}
+
+
+def test_treecache_engine(Huskar, servers, base_path):
+    huskar = Huskar(service='test_service', servers=servers,
+                    cluster='test_cluster', cache_dir=None,
+                    record_version=False, lazy=True,
+                    watch_engine='treecache')
+    config = huskar.config
+    path = combine(base_path, config.base_path)
+    huskar.client.ensure_path(config.base_path)
+    for i in range(10):
+        huskar.client.call_client('create', combine(path, 'key_%d' % i),
+                                  str(i).encode(), ephemeral=True)
+
+    assert config.get('key_1') == 1
+    assert config.get_many(['key_%d' % i for i in range(10)]) == dict(
+        ('key_%d' % i, i) for i in range(10))
+    assert set(huskar.client.watched_tree) == {
+        config.base_path, config.overall_base_path}
+
+    huskar.client.call_client('set', combine(path, 'key_1'), b'"one"')
+    huskar.client.call_client(
+        'create', combine(path, 'key_new'), b'"new"', ephemeral=True)
+    huskar.client.call_client('delete', combine(path, 'key_2'))
+    gevent.sleep(SLEEP_TIME)
+    assert config.get('key_1') == 'one'
+    assert config.get('key_new') == 'new'
+    assert config.get('key_2') is None
@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 
+import time
 import logging
 
 import gevent
+import gevent.event
 import mock
 import pytest
 
@@ -89,3 +91,83 @@ def test_stop(Huskar, servers, cache_dir):
     assert h.client.connected
     h.stop()
     assert not h.client.connected
+
+
+def test_start_concurrently(Huskar, servers, cache_dir):
+    h = Huskar(servers=servers, cluster='test', service='test',
+               cache_dir=str(cache_dir))
+    assert h.start(service_mappings={'test_service': ['test_cluster']})
+    assert h.ready.is_set()
+    assert set(h.start_timings) == {'config', 'switch', 'service_consumer'}
+    assert h.config.ready.is_set()
+    assert h.switch.ready.is_set()
+    assert 'test_service_test_cluster' in h.service_consumer.services
+    starting = list(h.starting)
+    assert h.start(timeout=0)
+    assert h.starting == starting
+    h.stop()
+    assert not h.ready.is_set()
+    assert not h.start_timings
+
+
+def test_start_component_timeout(Huskar):
+    h = Huskar(servers='host_that_not_exists', cluster='test',
+               service='test', cache_dir=None)
+    ready = gevent.event.Event()
+    with gevent.Timeout(1):
+        h._start_component(time.time() + 0.1, 'switch', lambda: None, ready)
+    assert not h.start_timings
+    ready.set()
+    h._start_component(time.time(), 'switch', lambda: None, ready)
+    assert set(h.start_timings) == {'switch'}
+
+
+def test_share_session(Huskar, servers, cache_dir):
+    def make_huskar(service):
+        return Huskar(servers=servers, cluster='test', service=service,
+                      cache_dir=str(cache_dir), share_session=True)
+
+    h1, h2 = make_huskar('test1'), make_huskar('test2')
+    assert h1.client is not h2.client
+    assert h1.client.base_client is h2.client.base_client
+    assert Huskar(servers=servers, cluster='test', service='test3',
+                  cache_dir=str(cache_dir)).client is not h1.client
+    h1.start()
+    h2.start()
+    client = h1.client.base_client
+    h1.stop()
+    assert client.connected
+    h2.stop()
+    assert not client.connected
+    assert h1.client.base_client is not client
+
+
+def test_share_session_same_service(Huskar, servers):
+    def make_huskar():
+        return Huskar(servers=servers, cluster='test_cluster',
+                      service='test_service', cache_dir=None,
+                      record_version=False, share_session=True)
+
+    h1, h2 = make_huskar(), make_huskar()
+    registry = h1.service_registry
+    registry.register(registry.build_instance('1.1.1.1', {'main': 88}))
+    try:
+        instances1 = h1.service_consumer.get_service_instance(
+            'test_service', 'test_cluster')
+        instances2 = h2.service_consumer.get_service_instance(
+            'test_service', 'test_cluster')
+        assert set(instances1) == set(instances2) == {'1.1.1.1_88'}
+
+        registry.register(registry.build_instance('2.2.2.2', {'main': 88}))
+        gevent.sleep(1)
+        assert set(instances1) == set(instances2) == {
+            '1.1.1.1_88', '2.2.2.2_88'}
+
+        # the watches are kept for the other instance
+        h1.stop()
+        registry = h2.service_registry
+        registry.register(registry.build_instance('3.3.3.3', {'main': 88}))
+        gevent.sleep(1)
+        assert set(instances2) == {'1.1.1.1_88', '2.2.2.2_88', '3.3.3.3_88'}
+    finally:
+        h2.client.delete(registry.base_path, recursive=True)
@@ -1,5 +1,7 @@
 from pytest import fixture
+import mock
 import gevent
+import gevent.event
 
 
 @fixture
@@ -58,3 +60,107 @@ def test_register_hook(service_registry, service_consumer):
     gevent.sleep(1)
 
     assert hook_fun.hook_fun_called
+
+
+def test_find_instances(service_registry, service_consumer):
+    for ip, zone in [('1.1.1.1', 'alta'), ('2.2.2.2', 'altb'),
+                     ('3.3.3.3', 'alta')]:
+        instance = service_registry.build_instance(
+            ip, {'main': 88}, meta={'zone': zone})
+        service_registry.register(instance)
+
+    service_consumer.get_service_instance(
+        'test_service', 'test_cluster', index_by=('meta.zone',))
+    assert set(service_consumer.find_instances(
+        'test_service', 'test_cluster', 'meta.zone', 'alta')) == {
+        '1.1.1.1_88', '3.3.3.3_88'}
+
+    service_registry.register(service_registry.build_instance(
+        '4.4.4.4', {'main': 88}, meta={'zone': 'alta'}))
+    service_registry.unregister('1.1.1.1_88')
+    gevent.sleep(1)
+    assert set(service_consumer.find_instances(
+        'test_service', 'test_cluster', 'meta.zone', 'alta')) == {
+        '3.3.3.3_88', '4.4.4.4_88'}
+
+
+def test_preprocess_service_mappings(service_registry, service_consumer):
+    for ip in ['1.1.1.1', '2.2.2.2']:
+        instance = service_registry.build_instance(ip, {'main': 88})
+        service_registry.register(instance)
+
+    assert service_consumer.preprocess_service_mappings({
+        'test_service': ['test_cluster', 'empty_cluster'],
+    }) == {'test_service': True}
+    assert set(service_consumer.services) == {
+        'test_service_test_cluster', 'test_service_empty_cluster'}
+    instances = service_consumer.get_service_instance(
+        'test_service', 'test_cluster')
+    assert set(instances) == {'1.1.1.1_88', '2.2.2.2_88'}
+
+    assert service_consumer.preprocess_service_mappings(
+        {'test_service': ['test_cluster']}, timeout=0) == {
+        'test_service': True}
+
+    # the cluster being loaded by another caller is not loaded yet
+    loading = service_consumer.loaded_services[
+        ('test_service', 'loading_cluster')] = gevent.event.Event()
+    mappings = {'test_service': ['test_cluster', 'loading_cluster']}
+    assert service_consumer.preprocess_service_mappings(
+        mappings, timeout=0.1) == {'test_service': False}
+    loading.set()
+    assert service_consumer.preprocess_service_mappings(
+        mappings, timeout=0) == {'test_service': True}
+
+
+def test_cluster_link_cached(huskar, service_registry, service_consumer):
+    service_registry.register(
+        service_registry.build_instance('1.1.1.1', {'main': 88}))
+    cluster_path = service_consumer.get_service_cluster_node(
+        'test_service', 'linked_cluster')
+    huskar.client.create(cluster_path, '{"link": ["test_cluster"]}',
+                         makepath=True)
+
+    instances = service_consumer.get_service_instance(
+        'test_service', 'linked_cluster')
+    assert set(instances) == {'1.1.1.1_88'}
+    assert service_consumer.linked_cluster[
+        ('test_service', 'linked_cluster')] == 'test_cluster'
+
+    with mock.patch.object(huskar.client, 'get') as get:
+        service_registry.register(
+            service_registry.build_instance('2.2.2.2', {'main': 88}))
+        gevent.sleep(1)
+        assert set(instances) == {'1.1.1.1_88', '2.2.2.2_88'}
+
+        huskar.client.set_data(cluster_path, '')
+        gevent.sleep(1)
+        assert not get.called
+    assert ('test_service', 'linked_cluster') not in \
+        service_consumer.linked_cluster
+    assert service_consumer.service_instance_path(
+        'test_service', 'linked_cluster') == cluster_path
+    huskar.client.delete(cluster_path, recursive=True)
+
+
+def test_report_call(service_registry, service_consumer):
+    for ip in ['1.1.1.1', '2.2.2.2', '3.3.3.3']:
+        instance = service_registry.build_instance(ip, {'main': 88})
+        service_registry.register(instance)
+    service_consumer.get_service_instance('test_service', 'test_cluster')
+    service_consumer.enable_outlier_ejection(
+        'test_service', 'test_cluster', min_requests=3)
+    hook = mock.Mock()
+    service_consumer.register_hook_function(
+        'test_service', 'test_cluster', hook)
+    assert hook.call_count == 1
+
+    for _ in range(3):
+        service_consumer.report_call(
+            'test_service', 'test_cluster', '1.1.1.1_88', 0.1,
+            success=False)
+    assert hook.call_count == 1
+
+    gevent.sleep(0.1)
+    assert hook.call_count == 2
+    assert set(hook.call_args[0][0]) == {'2.2.2.2_88', '3.3.3.3_88'}
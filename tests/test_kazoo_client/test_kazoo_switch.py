@@ -265,3 +265,60 @@ def test_iteritems(huskar, switch, overall_node_dir, node_dir):
         'test_config_2': {'path': 'switch/test_service/test_cluster',
                           'value': 100.0},
         }
+
+
+def test_sticky_key(switch, node_dir):
+    full_path = combine(node_dir, key)
+    switch.client.call_client('create', full_path, HALF, ephemeral=True)
+    gevent.sleep(1)
+
+    decisions = [switch.is_switched_on(key, key=i) for i in range(1000)]
+    assert 400 < sum(decisions) < 600
+    assert decisions == [
+        switch.is_switched_on(key, key=i) for i in range(1000)]
+
+
+def test_switched_on_many(switch, node_dir):
+    full_path = combine(node_dir, key)
+    switch.client.call_client('create', full_path, HALF, ephemeral=True)
+    gevent.sleep(1)
+
+    decisions = switch.is_switched_on_many(key, 1000)
+    assert 400 < sum(decisions) < 600
+    assert [bool(d) for d in switch.is_switched_on_many(key, range(100))] == [
+        switch.is_switched_on(key, key=i) for i in range(100)]
+    assert sum(switch.is_switched_on_many('unknown', 10, default=False)) == 0
+
+
+def test_bind_slot(switch, node_dir):
+    full_path = combine(node_dir, key)
+
+    @switch.bind(key)
+    def switch_func():
+        return True
+
+    slot = switch.slots[key]
+    assert switch_func()
+    assert slot.threshold == 1.0
+
+    switch.client.call_client('create', full_path, OFF, ephemeral=True)
+    gevent.sleep(1)
+    assert slot.threshold == 0.0
+    assert switch_func() is None
+
+    switch.client.call_client('delete', full_path)
+    gevent.sleep(1)
+    assert slot.threshold == 1.0
+    switch.set_default_rate(0)
+    assert slot.threshold is None
+    assert switch_func() is None
+
+
+def test_get_many_and_snapshot(switch, node_dir):
+    full_path = combine(node_dir, key)
+    switch.client.call_client('create', full_path, OFF, ephemeral=True)
+    gevent.sleep(1)
+
+    assert switch.get_many([key, 'unknown'], {'unknown': False}) == {
+        key: False, 'unknown': False}
+    assert switch.snapshot() == {key: 0.0}
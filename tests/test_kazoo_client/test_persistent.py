@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import mock
+import pytest
+from pytest import fixture
+from kazoo.client import KazooClient
+from kazoo.protocol.serialization import int_int_struct, write_string
+from kazoo.protocol.states import EventType
+
+from huskar_sdk_v2.bootstrap import persistent
+from huskar_sdk_v2.bootstrap.persistent import (
+    AddWatch, RemoveWatches, PersistentWatches)
+
+
+@fixture
+def client():
+    client = KazooClient()
+    client._stopped.clear()             # as if it is started
+    client.handler.dispatch_callback = lambda callback: callback.func(
+        *callback.args)
+    return client
+
+
+@fixture
+def watches(client):
+    if not persistent.supported:
+        pytest.skip('the installed Kazoo is not supported')
+    return PersistentWatches(client)
+
+
+def read_event(client, event_type, path):
+    buffer = bytearray(int_int_struct.pack(event_type, 3))
+    buffer.extend(write_string(path))
+    client._connection._read_watch_event(bytes(buffer), 0)
+
+
+def test_serialize():
+    assert AddWatch('/a', 1).serialize() == (
+        b'\x00\x00\x00\x02/a\x00\x00\x00\x01')
+    assert AddWatch.type == 106
+    assert RemoveWatches('/a', 5).serialize() == (
+        b'\x00\x00\x00\x02/a\x00\x00\x00\x05')
+    assert RemoveWatches.type == 18
+
+
+def test_supported_versions(client):
+    assert persistent._parse_version('2.11.0') == (2, 11)
+    assert persistent._parse_version('3.0.dev1') == (3, 0)
+    assert persistent._parse_version('unknown') == ()
+
+    with mock.patch.object(persistent, 'supported', False):
+        with pytest.raises(RuntimeError):
+            PersistentWatches(client)
+
+
+def test_add_and_remove(client, watches):
+    watcher = mock.Mock()
+    with mock.patch.object(client, '_call') as call:
+        watches.add('/a', watcher)
+        assert call.call_args[0][0] == AddWatch('/a', 1)
+        watches.add('/a', mock.Mock())
+        assert len(watches.watchers['/a']) == 2
+
+        with mock.patch.dict(persistent.EXCEPTIONS, {-121: Exception}):
+            assert watches.remove('/a', watcher) is None
+            call.reset_mock()
+            watches.remove('/a', next(iter(watches.watchers['/a'])))
+            call.assert_called_once_with(RemoveWatches('/a', 5), mock.ANY)
+        assert not watches.watchers
+
+        # the absent watch would break the connection of old Kazoo
+        watches.add('/a', watcher)
+        call.reset_mock()
+        with mock.patch.dict(persistent.EXCEPTIONS):
+            persistent.EXCEPTIONS.pop(-121, None)
+            assert watches.remove('/a', watcher) is None
+        assert not call.called
+        assert not watches.watchers
+
+        watches.add('/a', watcher)
+        watches.forget('/a', watcher)
+        assert not watches.watchers
+
+
+def test_dispatch_events(client, watches):
+    events = []
+    data_watcher = mock.Mock()
+
+    def watcher(event):
+        events.append(event)
+
+    watches.watchers['/a'] = {watcher}
+    client._data_watchers['/a/b'].add(data_watcher)
+
+    read_event(client, 1, '/a/b')
+    read_event(client, 3, '/a/b/c')
+    read_event(client, 2, '/a')
+    read_event(client, 3, '/ab')
+    assert [(e.type, e.path) for e in events] == [
+        (EventType.CREATED, '/a/b'),
+        (EventType.CHANGED, '/a/b/c'),
+        (EventType.DELETED, '/a'),
+    ]
+    # the one-shot watchers are still triggered
+    assert data_watcher.call_count == 1
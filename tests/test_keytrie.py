@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from huskar_sdk_v2.utils.keytrie import KeyTrie
+
+
+def test_prefix():
+    trie = KeyTrie()
+    assert not trie
+    trie.add_prefix('feature.', 'a')
+    trie.add_prefix('feature.payments.', 'b')
+    trie.add_prefix('', 'all')
+    assert trie
+
+    assert trie.match('feature.payments.refund') == {'a', 'b', 'all'}
+    assert trie.match('feature.search') == {'a', 'all'}
+    assert trie.match('feature') == {'all'}
+    assert trie.match('') == {'all'}
+
+    trie.remove_prefix('feature.payments.', 'b')
+    trie.remove_prefix('feature.payments.', 'b')
+    trie.remove_prefix('unknown', 'b')
+    assert trie.match('feature.payments.refund') == {'a', 'all'}
+    assert 'p' not in trie.root.children['f'].children['e'].children[
+        'a'].children['t'].children['u'].children['r'].children[
+        'e'].children['.'].children
+
+
+def test_pattern():
+    trie = KeyTrie()
+    trie.add_pattern('feature.payments.*', 'a')
+    trie.add_pattern('feature.*.enabled', 'b')
+    trie.add_pattern('*_TIMEOUT', 'c')
+    trie.add_pattern('exact', 'd')
+    trie.add_pattern(u'中文?', 'e')
+
+    assert trie.match('feature.payments.refund') == {'a'}
+    assert trie.match('feature.payments.enabled') == {'a', 'b'}
+    assert trie.match('feature.search.enabled') == {'b'}
+    assert trie.match('DB_TIMEOUT') == {'c'}
+    assert trie.match('exact') == {'d'}
+    assert trie.match('exactly') == set()
+    assert trie.match(u'中文字') == {'e'}
+    assert trie.match('Feature.payments.x') == set()
+
+    trie.remove_pattern('feature.*.enabled', 'a')
+    assert trie.match('feature.search.enabled') == {'b'}
+    trie.remove_pattern('feature.*.enabled', 'b')
+    assert trie.match('feature.search.enabled') == set()
+    for pattern, item in [('feature.payments.*', 'a'), ('*_TIMEOUT', 'c'),
+                          ('exact', 'd'), (u'中文?', 'e')]:
+        trie.remove_pattern(pattern, item)
+    assert not trie
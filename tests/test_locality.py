@@ -0,0 +1,75 @@
+from __future__ import absolute_import
+
+from huskar_sdk_v2.utils.locality import LocalitySelector
+
+
+def merge(*maps):
+    result = {}
+    for m in maps:
+        result.update(m)
+    return result
+
+
+def test_prefer_local_zone(make_instances):
+    selector = LocalitySelector('alta')
+    alta = make_instances('a1', 'a2', zone='alta')
+    altb = make_instances('b1', 'b2', 'b3', zone='altb')
+    assert selector.update(merge(alta, altb)) == alta
+    assert selector.instances == alta
+    assert not selector.spilled_over
+
+
+def test_spill_over_by_min_server_num(make_instances):
+    selector = LocalitySelector('alta', min_server_num=3)
+    alta = make_instances('a1', 'a2', zone='alta')
+    altb = make_instances('b1', zone='altb')
+    altc = make_instances('c1', 'c2', zone='altc')
+    assert selector.update(merge(alta, altb, altc)) == merge(alta, altc)
+    assert selector.spilled_over
+
+    selector.fallback_zones = ('altb',)
+    assert selector.update(merge(alta, altb, altc)) == merge(alta, altb)
+
+    alta.update(make_instances('a3', zone='alta'))
+    assert selector.update(merge(alta, altb, altc)) == alta
+    assert not selector.spilled_over
+
+
+def test_spill_over_by_ratio_and_state(make_instances):
+    selector = LocalitySelector('alta', min_local_ratio=0.5)
+    alta = make_instances('a1', 'a2', zone='alta')
+    alta_down = make_instances('a3', zone='alta', state='down')
+    altb = make_instances('b1', 'b2', zone='altb')
+    unknown = make_instances('x1')
+    assert selector.update(merge(alta, alta_down, altb)) == alta
+
+    selected = selector.update(merge(alta, alta_down, altb, unknown))
+    assert selected == merge(alta, altb)
+
+    assert selector.update(merge(alta_down, unknown)) == unknown
+    assert selector.update({}) == {}
+
+
+def test_spill_over_to_unzoned(make_instances):
+    selector = LocalitySelector('alta', min_server_num=2)
+    alta = make_instances('a1', zone='alta')
+    unknown = make_instances('x1')
+    assert selector.update(merge(alta, unknown)) == merge(alta, unknown)
+    assert selector.index.find_absent('meta.zone') == unknown
+
+    unknown.update(make_instances('x2', state='down'))
+    assert selector.update(merge(alta, unknown)) == merge(
+        alta, make_instances('x1'))
+    assert set(selector.index.find_absent('meta.zone')) == {'x1', 'x2'}
+
+    assert selector.update(alta) == alta
+    assert selector.index.find_absent('meta.zone') == {}
+
+
+def test_custom_zone_field():
+    selector = LocalitySelector('idc1', zone_field='meta.idc')
+    instances = {
+        'a': {'meta': {'idc': 'idc1'}, 'state': 'up'},
+        'b': {'meta': {'idc': 'idc2'}, 'state': 'up'},
+    }
+    assert list(selector.update(instances)) == ['a']
@@ -0,0 +1,68 @@
+from __future__ import absolute_import
+
+from huskar_sdk_v2.utils.outlier import CallStats, OutlierDetector
+
+
+class FakeTimer(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_call_stats_rolling_window():
+    stats = CallStats(3)
+    assert stats.mean_latency == 0.0
+    assert stats.failure_rate == 0.0
+    for latency, success in [(1.0, True), (2.0, False), (3.0, True)]:
+        stats.add(latency, success)
+    assert stats.mean_latency == 2.0
+    assert abs(stats.failure_rate - 1 / 3.0) < 1e-9
+
+    stats.add(10.0, True)
+    stats.add(10.0, True)
+    assert stats.count == 3
+    assert stats.mean_latency == 23 / 3.0
+    assert stats.failure_rate == 0.0
+
+
+def test_eject_by_failure_rate_and_readmit():
+    timer = FakeTimer()
+    detector = OutlierDetector(min_requests=5, ejection_time=30, timer=timer)
+    instances = {'a': {}, 'b': {}, 'c': {}}
+    assert detector.filter(instances) == instances
+
+    changed = [detector.report('a', 0.01, success=False) for _ in range(5)]
+    assert changed == [False] * 4 + [True]
+    assert detector.filter(instances) == {'b': {}, 'c': {}}
+
+    timer.now += 31
+    assert detector.report('b', 0.01)
+    assert detector.filter(instances) == instances
+
+
+def test_eject_by_latency():
+    timer = FakeTimer()
+    detector = OutlierDetector(min_requests=5, interval=10, timer=timer)
+    detector.filter(dict.fromkeys('abcd', {}))
+    for _ in range(5):
+        for name in 'abc':
+            detector.report(name, 0.01)
+        detector.report('d', 0.5)
+    assert not detector.ejected
+
+    timer.now += 10
+    assert detector.report('a', 0.01)
+    assert list(detector.ejected) == ['d']
+
+
+def test_max_ejection_ratio():
+    detector = OutlierDetector(min_requests=1, max_ejection_ratio=0.5)
+    detector.filter(dict.fromkeys('abc', {}))
+    for name in 'abc':
+        detector.report(name, 0.01, success=False)
+    assert len(detector.ejected) == 1
+
+    detector.filter(dict.fromkeys('bc', {}))
+    assert len(detector.stats) == 2
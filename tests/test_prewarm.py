@@ -0,0 +1,151 @@
+from __future__ import absolute_import
+
+import threading
+import time
+
+import gevent
+import gevent.event
+from mock import Mock
+
+from huskar_sdk_v2.utils.prewarm import Prewarmer
+
+
+def test_prewarm_new_instances(make_instances):
+    on_ready = Mock()
+    connected = []
+
+    def connector(name, instance):
+        connected.append(name)
+        return True
+
+    prewarmer = Prewarmer(connector, on_ready=on_ready, min_ready=0)
+    instances = make_instances('a', 'b')
+    assert prewarmer.filter(instances) == {}
+    assert prewarmer.filter(instances) == {}
+    gevent.sleep(0.01)
+    assert sorted(connected) == ['a', 'b']
+    assert on_ready.call_count == 1
+    assert prewarmer.filter(instances) == instances
+
+    instances.update(make_instances('c'))
+    instances.update(make_instances('a', main=9090))
+    assert prewarmer.filter(instances) == make_instances('b')
+    gevent.sleep(0.01)
+    assert sorted(connected) == ['a', 'a', 'b', 'c']
+    assert on_ready.call_count == 2
+    assert prewarmer.filter(instances) == instances
+
+    assert prewarmer.filter(make_instances('c')) == make_instances('c')
+    assert sorted(prewarmer.ready) == ['c']
+
+
+def test_prewarm_failures_are_retried(make_instances):
+    results = {'a': [False, False, True], 'b': [Exception('error'), True]}
+    connected = []
+
+    def connector(name, instance):
+        connected.append(name)
+        result = results[name].pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    prewarmer = Prewarmer(connector, min_ready=0, retry_delay=0.05)
+    instances = make_instances('a', 'b')
+    assert prewarmer.filter(instances) == {}
+    gevent.sleep(0.01)
+    assert prewarmer.filter(instances) == {}
+    assert sorted(connected) == ['a', 'b']
+    gevent.sleep(0.07)
+    assert prewarmer.filter(instances) == make_instances('b')
+    assert prewarmer.failures == {'a': 2}
+    gevent.sleep(0.1)
+    assert prewarmer.filter(instances) == instances
+    assert sorted(connected) == ['a', 'a', 'a', 'b', 'b']
+    assert prewarmer.failures == {}
+
+
+def test_prewarm_retry_cancelled(make_instances):
+    connector = Mock(return_value=False)
+    prewarmer = Prewarmer(connector, retry_delay=0.01)
+    prewarmer.filter(make_instances('a'))
+    gevent.sleep(0.001)
+    assert connector.call_count == 1
+    prewarmer.filter({})
+    gevent.sleep(0.02)
+    assert connector.call_count == 1
+    assert prewarmer.pending == {}
+    assert prewarmer.failures == {}
+
+
+def test_prewarm_min_ready(make_instances):
+    event = gevent.event.Event()
+
+    def connector(name, instance):
+        if name == 'b':
+            event.wait()
+        return True
+
+    prewarmer = Prewarmer(connector, min_ready=2)
+    instances = make_instances('a', 'b', 'c')
+    assert prewarmer.filter(instances) == instances
+    gevent.sleep(0.01)
+    assert sorted(prewarmer.ready) == ['a', 'c']
+    assert prewarmer.filter(instances) == make_instances('a', 'c')
+    assert prewarmer.filter(make_instances('a', 'b')) == make_instances(
+        'a', 'b')
+    event.set()
+    gevent.sleep(0.01)
+    assert prewarmer.filter(make_instances('a', 'b')) == make_instances(
+        'a', 'b')
+
+
+def test_prewarm_concurrency(make_instances):
+    event = gevent.event.Event()
+    running = []
+
+    def connector(name, instance):
+        running.append(name)
+        event.wait()
+        return True
+
+    prewarmer = Prewarmer(connector, concurrency=2, min_ready=0)
+    prewarmer.filter(make_instances('a', 'b', 'c', 'd'))
+    gevent.sleep(0.01)
+    assert len(running) == 2
+
+    prewarmer.filter(make_instances('a', 'b'))
+    event.set()
+    gevent.sleep(0.01)
+    assert sorted(running) == ['a', 'b']
+    assert sorted(prewarmer.ready) == ['a', 'b']
+
+
+def test_prewarm_threading(make_instances):
+    on_ready = Mock()
+    threads = []
+
+    def spawn(func, *args):
+        thread = threading.Thread(target=func, args=args)
+        threads.append(thread)
+        thread.start()
+        return thread
+
+    prewarmer = Prewarmer(
+        lambda name, instance: True, concurrency=4, on_ready=on_ready,
+        spawn=spawn, semaphore=threading.BoundedSemaphore, min_ready=0,
+        sleep=time.sleep)
+    names = ['i%d' % i for i in range(50)]
+    callers = [threading.Thread(target=prewarmer.filter,
+                                args=(make_instances(*names[i:]),))
+               for i in range(10)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    prewarmer.filter(make_instances(*names[9:]))
+    while threads:
+        threads.pop().join()
+    assert sorted(prewarmer.ready) == sorted(names[9:])
+    assert prewarmer.pending == {}
+    assert on_ready.called
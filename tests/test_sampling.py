@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import random
+from array import array
+
+from huskar_sdk_v2.utils import sampling
+from huskar_sdk_v2.utils.sampling import (
+    BUCKETS, SwitchSlot, key_bucket, is_key_sampled, sample_many)
+
+
+def test_key_bucket_is_stable():
+    assert key_bucket('switch', 42) == key_bucket('switch', '42')
+    assert key_bucket('switch', u'用户') == key_bucket(u'switch', u'用户')
+    assert key_bucket('switch', b'42') == key_bucket('switch', u'42')
+    assert 0 <= key_bucket('switch', 42) < BUCKETS
+    # crc32(b'switch\x0042') % 10000
+    assert key_bucket('switch', 42) == 6576
+
+
+def test_is_key_sampled():
+    keys = range(10000)
+    assert all(is_key_sampled('s', k, 100) for k in keys)
+    assert not any(is_key_sampled('s', k, 0) for k in keys)
+
+    passed_10 = set(k for k in keys if is_key_sampled('s', k, 10))
+    passed_30 = set(k for k in keys if is_key_sampled('s', k, 30))
+    assert 800 < len(passed_10) < 1200
+    assert 2700 < len(passed_30) < 3300
+    assert passed_10 < passed_30
+
+    other = set(k for k in keys if is_key_sampled('other', k, 10))
+    assert other != passed_10
+
+
+def test_sample_many():
+    assert list(sample_many('s', 3, 100)) == [True] * 3
+    assert list(sample_many('s', 3, 0)) == [False] * 3
+    assert len(sample_many('s', 0, 50)) == 0
+
+    passed = sample_many('s', 10000, 30, random.Random(1))
+    assert len(passed) == 10000
+    assert 2700 < sum(passed) < 3300
+
+
+def test_sample_many_with_keys():
+    keys = list(range(1000)) + ['a', u'用户']
+    passed = sample_many('s', iter(keys), 30)
+    assert len(passed) == len(keys)
+    assert [bool(p) for p in passed] == [
+        is_key_sampled('s', k, 30) for k in keys]
+
+
+def test_sample_many_without_numpy(monkeypatch):
+    monkeypatch.setattr(sampling, 'has_numpy', False)
+    passed = sample_many('s', 1000, 50)
+    assert isinstance(passed, array)
+    assert 400 < sum(passed) < 600
+    assert list(sample_many('s', 2, 100)) == [1, 1]
+    assert list(sample_many('s', ['x'], 0)) == [0]
+
+
+def test_sample_many_seeded(monkeypatch):
+    seeded = [bool(p) for p in sample_many('s', 1000, 30, random.Random(7))]
+    monkeypatch.setattr(sampling, 'has_numpy', False)
+    assert [bool(p) for p in sample_many(
+        's', 1000, 30, random.Random(7))] == seeded
+
+    rand = random.Random(7)
+    assert [rand.getrandbits(32) < 0.3 * (1 << 32)
+            for _ in range(1000)] == seeded
+
+
+def test_switch_slot():
+    rates = {'s': 0}
+    slot = SwitchSlot('s', rates.get, random.Random(1))
+    assert slot.threshold is None
+    assert not any(slot.is_on() for _ in range(100))
+    assert slot.threshold == 0.0
+
+    rates['s'] = 100
+    assert not slot.is_on()
+    slot.invalidate()
+    assert all(slot.is_on() for _ in range(100))
+
+    slot.update(30)
+    assert 2700 < sum(slot.is_on() for _ in range(10000)) < 3300
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import gevent
+from mock import Mock
+
+from huskar_sdk_v2.utils.scope import (
+    RequestScopeMiddleware, current_scope, request_cached, request_scope)
+
+
+class Component(object):
+    def __init__(self):
+        self.calls = 0
+
+    @request_cached
+    def get(self, name, default=None):
+        self.calls += 1
+        return [name, self.calls]
+
+
+def test_request_cached():
+    c = Component()
+    assert c.get('a') == ['a', 1]
+    assert c.get('a') == ['a', 2]
+
+    with request_scope() as cache:
+        assert c.get('a') == ['a', 3]
+        assert c.get('a') == ['a', 3]
+        assert c.get('a', default=1) == ['a', 4]
+        assert c.get('b') == ['b', 5]
+        assert Component().get('a') == ['a', 1]
+        with request_scope() as nested:
+            assert nested is cache
+            assert c.get('a') == ['a', 3]
+        assert current_scope() is cache
+        assert c.get(['unhashable']) == [['unhashable'], 6]
+        assert c.get(['unhashable']) == [['unhashable'], 7]
+
+    assert current_scope() is None
+    assert c.get('a') == ['a', 8]
+
+
+def test_request_scope_is_greenlet_local():
+    c = Component()
+
+    def request():
+        with request_scope():
+            first = c.get('a')
+            gevent.sleep(0.01)
+            return first, c.get('a')
+
+    results = [g.get() for g in [gevent.spawn(request) for _ in range(3)]]
+    assert sorted(r[0][1] for r in results) == [1, 2, 3]
+    assert all(first == second for first, second in results)
+
+
+def test_middleware():
+    c = Component()
+
+    def app(environ, start_response):
+        start_response('200 OK', [])
+        return [c.get('a'), c.get('a')]
+
+    start_response = Mock()
+    middleware = RequestScopeMiddleware(app)
+    assert middleware({}, start_response) == [['a', 1], ['a', 1]]
+    assert middleware({}, start_response) == [['a', 2], ['a', 2]]
+    assert start_response.call_count == 2
+    assert current_scope() is None
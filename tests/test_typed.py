@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import pytest
+
+from huskar_sdk_v2.utils.typed import DerivedValue, TypedValue, parse_bool
+
+
+@pytest.mark.parametrize('value,result', [
+    (True, True), (False, False), (1, True), (0, False),
+    (u'true', True), (u' Off ', False), (b'yes', True), (u'', False),
+])
+def test_parse_bool(value, result):
+    assert parse_bool(value) is result
+
+
+@pytest.mark.parametrize('value', [2, u'maybe', None, [], {}])
+def test_parse_bool_failed(value):
+    with pytest.raises(ValueError):
+        parse_bool(value)
+
+
+def test_typed_value():
+    value = TypedValue('timeout', int, default=3)
+    assert value.get() == 3
+    assert value.update(u'5')
+    assert value.get() == 5
+    assert not value.update(u'five')
+    assert value.get() == 5
+    assert value.update(None)
+    assert value.get() == 3
+
+    flag = TypedValue('flag', bool, default=False)
+    assert flag.update(u'false')
+    assert flag.get() is False
+    assert flag.update(u'on')
+    assert flag.get() is True
+
+
+def test_typed_value_with_schema():
+    class Schema(object):
+        def validate(self, value):
+            if not isinstance(value, dict) or 'host' not in value:
+                raise ValueError('host is required')
+            return dict(value, port=value.get('port', 80))
+
+    value = TypedValue('upstream', Schema())
+    assert value.get() is None
+    assert value.update({'host': 'a'})
+    assert value.get() == {'host': 'a', 'port': 80}
+    assert not value.update({'port': 8080})
+    assert value.get() == {'host': 'a', 'port': 80}
+
+
+def test_derived_value():
+    configs = {'a': 1, 'b': 2}
+    calls = []
+
+    def fn(a, b):
+        calls.append((a, b))
+        if a is None:
+            raise ValueError('a is required')
+        return a + b
+
+    value = DerivedValue(fn, ['a', 'b'], configs.get)
+    assert value.get() == 3
+    assert value.get() == 3
+    assert calls == [(1, 2)]
+
+    configs['a'] = 10
+    assert value.get() == 3
+    value.invalidate(10)
+    assert value.get() == 12
+    assert calls == [(1, 2), (10, 2)]
+
+    del configs['a']
+    value.invalidate()
+    with pytest.raises(ValueError):
+        value.get()
+    configs['a'] = 0
+    assert value.get() == 2
+    assert len(calls) == 4
@@ -1,9 +1,13 @@
 from __future__ import absolute_import
 
+import json
+import pickle
+
 import pytest
 
 from huskar_sdk_v2.six import unicode
 from huskar_sdk_v2.utils import Counter, join_url
+from huskar_sdk_v2.utils.frozen import FrozenDict, freeze
 
 
 def test_counter():
@@ -52,3 +56,25 @@ def test_counter():
 ])
 def test_join_url(input, output):
     assert join_url(*input) == output
+
+
+def test_freeze():
+    value = freeze({'a': [1, {'b': 2}], 'c': u'd'})
+    assert value == {'a': (1, {'b': 2}), 'c': u'd'}
+    assert isinstance(value, FrozenDict)
+    assert isinstance(value['a'][1], FrozenDict)
+    assert json.loads(json.dumps(value)) == {'a': [1, {'b': 2}], 'c': u'd'}
+    assert pickle.loads(pickle.dumps(value)) == value
+
+    for mutate in [lambda: value.update(a=1), lambda: value.pop('a'),
+                   lambda: value.setdefault('e', 1), value.clear,
+                   value.popitem, lambda: value.__setitem__('a', 1),
+                   lambda: value.__delitem__('a')]:
+        with pytest.raises(TypeError):
+            mutate()
+    assert value == {'a': (1, {'b': 2}), 'c': u'd'}
+
+    copied = value.copy()
+    copied['a'] = 1
+    assert copied == {'a': 1, 'c': u'd'}
+    assert freeze(u'a') == u'a'